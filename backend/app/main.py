@@ -1,6 +1,11 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import health, presign, analyze, recipes, plan
+from app.routes import health, presign, analyze, recipes, plan, metrics, debug, households
+from app.utils.metrics import timing_middleware
+from app.utils.profiling import profiling_middleware
+from app.utils.body_limit import BodyLimitMiddleware
+from app.utils.loop_monitor import start_loop_monitor, stop_loop_monitor
+from app.services.preprocess import image_preprocessor
 from dotenv import load_dotenv
 import os
 
@@ -22,12 +27,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request latency histogram and Server-Timing header
+app.middleware("http")(timing_middleware)
+
+# Opt-in request profiling (PROFILE_TOKEN / PROFILE_SAMPLE_RATE)
+app.middleware("http")(profiling_middleware)
+
+# Cap upload bodies while they stream in, before multipart parsing spools them
+app.add_middleware(BodyLimitMiddleware, limits={"/api/analyze/upload": analyze.MAX_UPLOAD_BODY})
+
 # Include routers
 app.include_router(health.router, prefix="/api", tags=["health"])
 app.include_router(presign.router, prefix="/api", tags=["upload"])
 app.include_router(analyze.router, prefix="/api", tags=["analysis"])
 app.include_router(recipes.router, prefix="/api", tags=["recipes"])
 app.include_router(plan.router, prefix="/api", tags=["planning"])
+app.include_router(households.router, prefix="/api", tags=["households"])
+app.include_router(metrics.router, tags=["metrics"])
+app.include_router(debug.router, prefix="/api", tags=["debug"])
+
+# Heavy models load lazily on first use; PRELOAD_MODELS=1 loads them at boot
+def preload_models():
+    if os.getenv("PRELOAD_MODELS", "0") == "1":
+        plan.warm_up()
+
+app.router.add_event_handler("startup", preload_models)
+
+# Event-loop lag monitor (LOOP_MONITOR=0 disables)
+app.router.add_event_handler("startup", start_loop_monitor)
+app.router.add_event_handler("shutdown", stop_loop_monitor)
+
+# Image downscaling process pool (started on first upload)
+app.router.add_event_handler("shutdown", image_preprocessor.shutdown)
 
 @app.get("/")
 async def root():
@@ -0,0 +1,95 @@
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional
+
+
+class VisionDetectRequest(BaseModel):
+    keys: List[str] = Field(..., description="List of S3 object keys to analyze")
+    bucket: str = Field(default="smart-fridge-images", description="S3 bucket name")
+
+
+class DetectedItem(BaseModel):
+    name: str
+    count: int
+    confidence: float
+    raw_name: str
+
+
+class RawDetection(BaseModel):
+    name: str
+    confidence: float
+    count: int
+
+
+class ProcessingStats(BaseModel):
+    images_processed: int
+    raw_detections: int
+    normalized_items: int
+    normalization_rate: float
+    avg_confidence: float
+
+
+class VisionDetectResponse(BaseModel):
+    items: List[DetectedItem] = Field(..., description="Normalized food items with counts and confidence")
+    raw_detections: Optional[List[RawDetection]] = Field(None, description="Raw Rekognition results for debugging")
+    processing_stats: ProcessingStats = Field(..., description="Processing statistics")
+
+
+class AnalyzeRequest(BaseModel):
+    imageKeys: List[str]
+    peopleCount: int
+    inventory: Optional[List[Dict[str, Any]]] = None
+
+
+class InventoryEntry(BaseModel):
+    id: str
+    name: str
+    category: str
+    quantity: str
+    carbonImpact: str
+    confidence: float
+
+
+class RecipeCard(BaseModel):
+    id: str
+    title: str
+    description: str
+    ingredients: List[str]
+    instructions: List[str]
+    carbonImpact: str
+    prepTime: int
+    servings: int
+    imageUrl: str
+
+
+class SwapTip(BaseModel):
+    id: str
+    original: str
+    suggestion: str
+    reason: str
+    carbonSavings: float | None
+
+
+class ImagePreprocessStats(BaseModel):
+    name: str
+    originalBytes: int
+    bytes: int
+    bytesSaved: int
+    width: int
+    height: int
+    cpuMs: float
+
+
+class DegradedStage(BaseModel):
+    stage: str
+    reason: str
+
+
+class AnalyzeResponse(BaseModel):
+    inventory: List[InventoryEntry]
+    recipes: List[RecipeCard]
+    swapTips: List[SwapTip]
+    totalCarbonImpact: float
+    analysisTime: float
+    imageKeys: Optional[List[str]] = None  # S3 keys the uploaded images are archived under
+    preprocessing: Optional[List[ImagePreprocessStats]] = None  # per-image downscaling (uploads only)
+    degraded: List[DegradedStage] = []  # stages that took a cheaper path to meet the deadline
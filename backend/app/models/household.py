@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from .analyze import AnalyzeResponse
+from .plan import SwapSuggestion
+
+
+class HouseholdAnalyzeResponse(AnalyzeResponse):
+    householdId: str
+    version: int
+    newImages: int            # images detected in this call
+    skippedImages: int        # already analyzed for this household
+    changedItems: List[str]   # inventory entries added or updated in this call
+
+
+class HouseholdItem(BaseModel):
+    name: str
+    version: int
+    count: int
+    confidence: float
+    source: str
+    category: Optional[str] = None
+    impact: Optional[str] = None
+    co2e_100g: Optional[float] = None
+    penalty: int = 0          # points this item takes off the score
+    swap: Optional[SwapSuggestion] = None
+    removed: bool = False
+
+
+class HouseholdInventory(BaseModel):
+    householdId: str
+    version: int
+    score: int
+    items: List[HouseholdItem]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 
 class InventoryItem(BaseModel):
@@ -27,4 +27,35 @@ class PlanResponse(BaseModel):
     inventory: List[InventoryItem]
     swaps: List[SwapSuggestion]
     llm_context: LLMContext
-    score: int
\ No newline at end of file
+    score: int
+
+
+class PlanBatchHousehold(BaseModel):
+    items: List[str]
+    people: int = 2
+    flags: List[str] = []
+
+
+class PlanBatchRequest(BaseModel):
+    households: List[PlanBatchHousehold]
+
+
+class PlanBatchResponse(BaseModel):
+    results: List[PlanResponse]
+
+
+class PlanSessionRequest(BaseModel):
+    items: List[str]
+    people: int = 2
+    flags: List[str] = []
+
+
+class PlanDiff(BaseModel):
+    add: List[str] = []
+    remove: List[str] = []   # one occurrence per name, like list.remove
+    people: Optional[int] = None
+    flags: Optional[List[str]] = None
+
+
+class PlanSessionResponse(PlanResponse):
+    plan_id: str
@@ -1,24 +1,34 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, BackgroundTasks, File, Form, Header, UploadFile
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import json
 import logging
+import math
 import os
 import time
 from app.services.rekog import rekognition_service, DetectionResult
 from app.services.normalize import food_normalizer, NormalizedItem
+from app.services.preprocess import image_preprocessor
+from app.models.analyze import (
+    VisionDetectRequest, VisionDetectResponse, AnalyzeRequest, AnalyzeResponse
+)
+from app.utils.fastjson import FastJSONResponse
+from app.utils.metrics import stage, FALLBACKS
+from app.utils.s3 import archive_uploads, upload_key
+from app.utils.deadline import deadline_scope, request_budget
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-class VisionDetectRequest(BaseModel):
-    keys: List[str] = Field(..., description="List of S3 object keys to analyze")
-    bucket: str = Field(default="smart-fridge-images", description="S3 bucket name")
-
-class VisionDetectResponse(BaseModel):
-    items: List[Dict[str, Any]] = Field(..., description="Normalized food items with counts and confidence")
-    raw_detections: Optional[List[Dict[str, Any]]] = Field(None, description="Raw Rekognition results for debugging")
-    processing_stats: Dict[str, Any] = Field(..., description="Processing statistics")
+# Uploads are downscaled before detection; Rekognition accepts JPEG/PNG up to 5 MB as Image.Bytes
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 15 * 1024 * 1024))
+REKOGNITION_MAX_BYTES = 5 * 1024 * 1024
+MAX_UPLOAD_FILES = int(os.getenv("MAX_UPLOAD_FILES", "10"))
+# whole multipart body, enforced by BodyLimitMiddleware before FastAPI parses it
+MAX_UPLOAD_BODY = MAX_UPLOAD_FILES * (MAX_UPLOAD_BYTES + 4096) + 64 * 1024
+UPLOAD_CONTENT_TYPES = {"image/jpeg", "image/jpg", "image/png"}
+UPLOAD_CHUNK = 64 * 1024
 
 @router.post("/vision/detect", response_model=VisionDetectResponse)
 async def detect_food_items(request: VisionDetectRequest):
@@ -31,6 +41,10 @@ async def detect_food_items(request: VisionDetectRequest):
     3. Merges duplicate items and aggregates counts
     4. Returns structured results for downstream processing
     """
+    return FastJSONResponse(await run_vision_detection(request))
+
+async def run_vision_detection(request: VisionDetectRequest) -> Dict[str, Any]:
+    """Vision detection pipeline; returns the VisionDetectResponse payload as a dict"""
     try:
         logger.info(f"Processing {len(request.keys)} images from bucket {request.bucket}")
         
@@ -41,69 +55,7 @@ async def detect_food_items(request: VisionDetectRequest):
             bucket=request.bucket
         )
         
-        if raw_results is None:
-            logger.warning("Rekognition returned None, using empty results")
-            raw_results = []
-        
-        logger.info(f"Rekognition returned {len(raw_results)} raw detections")
-        
-        # Step 2: Normalize raw results
-        raw_items = [
-            {
-                'name': result.name,
-                'confidence': result.confidence,
-                'count': result.count
-            }
-            for result in raw_results
-        ]
-        
-        normalized_items = food_normalizer.normalize_items(raw_items)
-        
-        logger.info(f"Normalization produced {len(normalized_items)} canonical items")
-        
-        # Step 3: Format response
-        formatted_items = []
-        for item in normalized_items:
-            formatted_items.append({
-                "name": item.canonical_name,
-                "count": item.count,
-                "confidence": round(item.confidence, 3),
-                "raw_name": item.raw_name
-            })
-        
-        # Calculate processing stats
-        total_raw = len(raw_results)
-        total_normalized = len(normalized_items)
-        normalization_rate = (total_normalized / total_raw * 100) if total_raw > 0 else 0
-        
-        processing_stats = {
-            "images_processed": len(request.keys),
-            "raw_detections": total_raw,
-            "normalized_items": total_normalized,
-            "normalization_rate": round(normalization_rate, 1),
-            "avg_confidence": round(
-                sum(item.confidence for item in normalized_items) / len(normalized_items), 3
-            ) if normalized_items else 0
-        }
-        
-        # Prepare raw detections for debugging (optional)
-        raw_detections = [
-            {
-                "name": result.name,
-                "confidence": round(result.confidence, 3),
-                "count": result.count
-            }
-            for result in raw_results
-        ]
-        
-        response = VisionDetectResponse(
-            items=formatted_items,
-            raw_detections=raw_detections,
-            processing_stats=processing_stats
-        )
-        
-        logger.info(f"Successfully processed vision detection: {processing_stats}")
-        return response
+        return vision_payload(raw_results, images_processed=len(request.keys))
         
     except Exception as e:
         logger.error(f"Error in vision detection: {str(e)}", exc_info=True)
@@ -112,187 +64,393 @@ async def detect_food_items(request: VisionDetectRequest):
             detail=f"Vision detection failed: {str(e)}"
         )
 
-# Simple analyze endpoint for frontend compatibility
-class AnalyzeRequest(BaseModel):
-    imageKeys: List[str]
-    peopleCount: int
-    inventory: Optional[List[Dict[str, Any]]] = None
-
-class AnalyzeResponse(BaseModel):
-    inventory: List[Dict[str, Any]]
-    recipes: List[Dict[str, Any]]
-    swapTips: List[Dict[str, Any]]
-    totalCarbonImpact: float
-    analysisTime: float
+def vision_payload(raw_results: List[DetectionResult], images_processed: int) -> Dict[str, Any]:
+    """Normalize raw detections into the VisionDetectResponse payload"""
+    if raw_results is None:
+        logger.warning("Rekognition returned None, using empty results")
+        raw_results = []
+    
+    logger.info(f"Rekognition returned {len(raw_results)} raw detections")
+    
+    # Step 2: Normalize raw results
+    raw_items = [
+        {
+            'name': result.name,
+            'confidence': result.confidence,
+            'count': result.count
+        }
+        for result in raw_results
+    ]
+    
+    with stage("normalize"):
+        normalized_items = food_normalizer.normalize_items(raw_items)
+    
+    logger.info(f"Normalization produced {len(normalized_items)} canonical items")
+    
+    # Step 3: Format response
+    formatted_items = []
+    for item in normalized_items:
+        formatted_items.append({
+            "name": item.canonical_name,
+            "count": item.count,
+            "confidence": round(item.confidence, 3),
+            "raw_name": item.raw_name
+        })
+    
+    # Calculate processing stats
+    total_raw = len(raw_results)
+    total_normalized = len(normalized_items)
+    normalization_rate = (total_normalized / total_raw * 100) if total_raw > 0 else 0
+    
+    processing_stats = {
+        "images_processed": images_processed,
+        "raw_detections": total_raw,
+        "normalized_items": total_normalized,
+        "normalization_rate": round(normalization_rate, 1),
+        "avg_confidence": round(
+            sum(item.confidence for item in normalized_items) / len(normalized_items), 3
+        ) if normalized_items else 0
+    }
+    
+    # Prepare raw detections for debugging (optional)
+    raw_detections = [
+        {
+            "name": result.name,
+            "confidence": round(result.confidence, 3),
+            "count": result.count
+        }
+        for result in raw_results
+    ]
+    
+    response = {
+        "items": formatted_items,
+        "raw_detections": raw_detections,
+        "processing_stats": processing_stats
+    }
+    
+    logger.info(f"Successfully processed vision detection: {processing_stats}")
+    return response
 
-@router.post("/analyze", response_model=AnalyzeResponse)
-async def analyze_images(request: AnalyzeRequest):
-    """Full analysis pipeline using real AWS Rekognition and recipe generation"""
+def build_analysis(
+    vision_response: Dict[str, Any],
+    people_count: int,
+    manual_inventory: Optional[List[Dict[str, Any]]],
+    started: float,
+) -> Dict[str, Any]:
+    """Inventory, carbon plan, swaps and recipes for detected items; the AnalyzeResponse payload"""
+    # Step 2: Convert vision results to inventory format and combine with manual inventory
+    inventory = []
+    
+    # Add detected items from vision
+    for item in vision_response['items']:
+        inventory.append({
+            "id": f"detected-{item['name']}-{int(time.time())}",
+            "name": item['name'],
+            "category": "Detected",
+            "quantity": f"{item['count']} piece(s)",
+            "carbonImpact": "medium",  # Default, will be updated by planner
+            "confidence": item['confidence']
+        })
+    
+    # Add manually added items from frontend
+    if manual_inventory:
+        logger.info(f"Adding {len(manual_inventory)} manually added items to inventory")
+        for item in manual_inventory:
+            # Skip items that might be duplicates of detected items
+            is_duplicate = any(
+                detected['name'].lower() == item['name'].lower() 
+                for detected in vision_response['items']
+            )
+            if not is_duplicate:
+                inventory.append({
+                    "id": item.get('id', f"manual-{item['name']}-{int(time.time())}"),
+                    "name": item['name'],
+                    "category": item.get('category', 'Manual'),
+                    "quantity": item.get('quantity', '1 piece(s)'),
+                    "carbonImpact": item.get('carbonImpact', 'medium'),
+                    "confidence": item.get('confidence', 1.0)  # Manual items have high confidence
+                })
+                logger.info(f"Added manual item: {item['name']}")
+    
+    logger.info(f"Final inventory has {len(inventory)} items total")
+    
+    # Step 3: Get carbon impact and swap suggestions from planner
+    detected_food_names = [item['name'] for item in inventory]
+    
     try:
-        logger.info(f"Starting full analysis for {len(request.imageKeys)} images, {request.peopleCount} people")
-        
-        # Step 1: Vision Detection using AWS Rekognition
-        vision_request = VisionDetectRequest(
-            keys=request.imageKeys,
-            bucket="smart-fridge-images-nayana"
+        # Import plan logic
+        from app.routes.plan import plan as plan_logic
+        plan_response = plan_logic(
+            items=detected_food_names,
+            people=people_count,
+            flags=[],
+            demo=False
         )
         
-        vision_response = await detect_food_items(vision_request)
-        logger.info(f"Vision detection found {len(vision_response.items)} items")
-        
-        # Step 2: Convert vision results to inventory format and combine with manual inventory
-        inventory = []
+        # Update inventory with carbon impact data
+        for i, inventory_item in enumerate(inventory):
+            if i < len(plan_response.inventory):
+                plan_item = plan_response.inventory[i]
+                inventory_item["carbonImpact"] = plan_item.impact
+                inventory_item["category"] = plan_item.category
         
-        # Add detected items from vision
-        for item in vision_response.items:
-            inventory.append({
-                "id": f"detected-{item['name']}-{int(time.time())}",
-                "name": item['name'],
-                "category": "Detected",
-                "quantity": f"{item['count']} piece(s)",
-                "carbonImpact": "medium",  # Default, will be updated by planner
-                "confidence": item['confidence']
+        # Convert swap suggestions
+        swap_tips = []
+        for swap in plan_response.swaps:
+            swap_tips.append({
+                "id": f"swap-{swap.from_item}",
+                "original": swap.from_item,
+                "suggestion": swap.to,
+                "reason": swap.why,
+                "carbonSavings": swap.reduction
             })
         
-        # Add manually added items from frontend
-        if request.inventory:
-            logger.info(f"Adding {len(request.inventory)} manually added items to inventory")
-            for item in request.inventory:
-                # Skip items that might be duplicates of detected items
-                is_duplicate = any(
-                    detected['name'].lower() == item['name'].lower() 
-                    for detected in vision_response.items
-                )
-                if not is_duplicate:
-                    inventory.append({
-                        "id": item.get('id', f"manual-{item['name']}-{int(time.time())}"),
-                        "name": item['name'],
-                        "category": item.get('category', 'Manual'),
-                        "quantity": item.get('quantity', '1 piece(s)'),
-                        "carbonImpact": item.get('carbonImpact', 'medium'),
-                        "confidence": item.get('confidence', 1.0)  # Manual items have high confidence
-                    })
-                    logger.info(f"Added manual item: {item['name']}")
-        
-        logger.info(f"Final inventory has {len(inventory)} items total")
-        
-        # Step 3: Get carbon impact and swap suggestions from planner
-        detected_food_names = [item['name'] for item in inventory]
+        total_carbon_impact = plan_response.score
         
+    except Exception as e:
+        logger.warning(f"Planner failed, using defaults: {e}")
+        FALLBACKS.inc(component="planner")
+        swap_tips = []
+        total_carbon_impact = 50  # Default score
+    
+    # Step 4: Generate recipes using LLM
+    recipes = recipe_cards(detected_food_names, people_count)
+    
+    return {
+        "inventory": inventory,
+        "recipes": recipes,
+        "swapTips": swap_tips,
+        "totalCarbonImpact": total_carbon_impact,
+        "analysisTime": round(time.perf_counter() - started, 3)
+    }
+
+def recipe_cards(detected_food_names: List[str], people_count: int) -> List[Dict[str, Any]]:
+    """Recipe cards for the pantry (LLM, cache or fallback) in the frontend format"""
+    recipes = []
+    if detected_food_names:  # Only generate recipes if we have detected items
         try:
-            # Import plan logic
-            from app.routes.plan import plan as plan_logic
-            plan_response = plan_logic(
-                items=detected_food_names,
-                people=request.peopleCount,
-                flags=[],
-                demo=False
-            )
-            
-            # Update inventory with carbon impact data
-            for i, inventory_item in enumerate(inventory):
-                if i < len(plan_response.inventory):
-                    plan_item = plan_response.inventory[i]
-                    inventory_item["carbonImpact"] = plan_item.impact
-                    inventory_item["category"] = plan_item.category
+            from app.services.recipes_llm import generate as generate_recipes_llm
+            from app.shared.models.recipe import LLMContext
             
-            # Convert swap suggestions
-            swap_tips = []
-            for swap in plan_response.swaps:
-                swap_tips.append({
-                    "id": f"swap-{swap.from_item}",
-                    "original": swap.from_item,
-                    "suggestion": swap.to,
-                    "reason": swap.why,
-                    "carbonSavings": swap.reduction
-                })
+            llm_context = LLMContext(
+                pantry=detected_food_names,
+                people=people_count,
+                flags=[]
+            )
             
-            total_carbon_impact = plan_response.score
+            generated_recipes = generate_recipes_llm(llm_context, demo=False)
             
-        except Exception as e:
-            logger.warning(f"Planner failed, using defaults: {e}")
-            swap_tips = []
-            total_carbon_impact = 50  # Default score
-        
-        # Step 4: Generate recipes using LLM
-        recipes = []
-        if detected_food_names:  # Only generate recipes if we have detected items
-            try:
-                from app.services.recipes_llm import generate as generate_recipes_llm
-                from app.shared.models.recipe import LLMContext
-                
-                llm_context = LLMContext(
-                    pantry=detected_food_names,
-                    people=request.peopleCount,
-                    flags=[]
-                )
-                
-                generated_recipes = generate_recipes_llm(llm_context, demo=False)
-                
-                # Convert to frontend format
-                for recipe in generated_recipes:
-                    recipes.append({
-                        "id": f"recipe-{recipe.title.lower().replace(' ', '-')}",
-                        "title": recipe.title,
-                        "description": f"Generated recipe using {', '.join(detected_food_names[:3])}",
-                        "ingredients": [ing.name for ing in recipe.ingredients],
-                        "instructions": [step.text for step in recipe.steps],
-                        "carbonImpact": "medium",
-                        "prepTime": 30,
-                        "servings": request.peopleCount,
-                        "imageUrl": "/api/placeholder/400/300"
-                    })
-                    
-            except Exception as e:
-                logger.warning(f"Recipe generation failed: {e}")
-                # Fallback to simple recipes
-                recipes = [{
-                    "id": "recipe-fallback",
-                    "title": f"Simple {detected_food_names[0]} Recipe",
-                    "description": f"Quick recipe using {detected_food_names[0]}",
-                    "ingredients": detected_food_names[:3],
-                    "instructions": [
-                        f"Prepare {detected_food_names[0]}",
-                        "Cook according to your preference",
-                        "Season and serve"
-                    ],
+            # Convert to frontend format
+            for recipe in generated_recipes:
+                recipes.append({
+                    "id": f"recipe-{recipe.title.lower().replace(' ', '-')}",
+                    "title": recipe.title,
+                    "description": f"Generated recipe using {', '.join(detected_food_names[:3])}",
+                    "ingredients": [ing.name for ing in recipe.ingredients],
+                    "instructions": [step.text for step in recipe.steps],
                     "carbonImpact": "medium",
-                    "prepTime": 15,
-                    "servings": request.peopleCount,
+                    "prepTime": 30,
+                    "servings": people_count,
                     "imageUrl": "/api/placeholder/400/300"
-                }]
-        else:
-            # No items detected - provide helpful message
-            logger.info("No food items detected in the uploaded images")
+                })
+                
+        except Exception as e:
+            logger.warning(f"Recipe generation failed: {e}")
+            FALLBACKS.inc(component="recipes")
+            # Fallback to simple recipes
             recipes = [{
-                "id": "no-items-detected",
-                "title": "No Items Detected",
-                "description": "We couldn't detect any food items in your images. Try uploading clearer images with visible food items.",
-                "ingredients": [],
+                "id": "recipe-fallback",
+                "title": f"Simple {detected_food_names[0]} Recipe",
+                "description": f"Quick recipe using {detected_food_names[0]}",
+                "ingredients": detected_food_names[:3],
                 "instructions": [
-                    "Make sure your images show food items clearly",
-                    "Ensure good lighting in your photos",
-                    "Try taking photos from different angles",
-                    "Upload images in JPEG format for best results"
+                    f"Prepare {detected_food_names[0]}",
+                    "Cook according to your preference",
+                    "Season and serve"
                 ],
-                "carbonImpact": "low",
-                "prepTime": 0,
-                "servings": request.peopleCount,
+                "carbonImpact": "medium",
+                "prepTime": 15,
+                "servings": people_count,
                 "imageUrl": "/api/placeholder/400/300"
             }]
-        
-        return AnalyzeResponse(
-            inventory=inventory,
-            recipes=recipes,
-            swapTips=swap_tips,
-            totalCarbonImpact=total_carbon_impact,
-            analysisTime=time.time()
+    else:
+        # No items detected - provide helpful message
+        logger.info("No food items detected in the uploaded images")
+        recipes = [{
+            "id": "no-items-detected",
+            "title": "No Items Detected",
+            "description": "We couldn't detect any food items in your images. Try uploading clearer images with visible food items.",
+            "ingredients": [],
+            "instructions": [
+                "Make sure your images show food items clearly",
+                "Ensure good lighting in your photos",
+                "Try taking photos from different angles",
+                "Upload images in JPEG format for best results"
+            ],
+            "carbonImpact": "low",
+            "prepTime": 0,
+            "servings": people_count,
+            "imageUrl": "/api/placeholder/400/300"
+        }]
+    return recipes
+
+@router.post("/analyze", response_model=AnalyzeResponse)
+async def analyze_images(request: AnalyzeRequest, x_deadline_ms: Optional[str] = Header(None)):
+    """
+    Full analysis pipeline using real AWS Rekognition and recipe generation.
+    Runs within ANALYZE_DEADLINE (or a shorter X-Deadline-Ms); stages that
+    had to cut corners to make it are listed in `degraded`.
+    """
+    started = time.perf_counter()
+    manual_inventory = validate_inventory(request.inventory)
+    with deadline_scope(request_budget(x_deadline_ms)) as degraded:
+        try:
+            logger.info(f"Starting full analysis for {len(request.imageKeys)} images, {request.peopleCount} people")
+            
+            # Step 1: Vision Detection using AWS Rekognition
+            vision_request = VisionDetectRequest(
+                keys=request.imageKeys,
+                bucket="smart-fridge-images-nayana"
+            )
+            
+            vision_response = await run_vision_detection(vision_request)
+            logger.info(f"Vision detection found {len(vision_response['items'])} items")
+            # planning and recipe generation block; keep them off the event loop
+            result = await asyncio.to_thread(
+                build_analysis, vision_response, request.peopleCount, manual_inventory, started
+            )
+            
+        except Exception as e:
+            logger.error(f"Error in analyze endpoint: {str(e)}", exc_info=True)
+            raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+    result["degraded"] = degraded
+    return FastJSONResponse(result)
+
+def validate_inventory(items: Any) -> Optional[List[Dict[str, Any]]]:
+    """
+    Manually added inventory: a list of objects, each with a non-empty name.
+    `category` must be a string when given and `confidence` a number (it is
+    coerced to float); anything else is a 422.
+    """
+    if items is None:
+        return None
+    if not isinstance(items, list) or not all(
+        isinstance(item, dict) and isinstance(item.get("name"), str) and item["name"].strip() for item in items
+    ):
+        raise HTTPException(status_code=422, detail="inventory must be a JSON list of objects with a name")
+    validated = []
+    for item in items:
+        if not isinstance(item.get("category", ""), str):
+            raise HTTPException(status_code=422, detail=f"inventory item {item['name']!r}: category must be a string")
+        if "confidence" in item:
+            try:
+                confidence = float(item["confidence"])
+            except (TypeError, ValueError):
+                confidence = math.nan
+            if not math.isfinite(confidence):
+                raise HTTPException(status_code=422, detail=f"inventory item {item['name']!r}: confidence must be a number")
+            item = {**item, "confidence": confidence}
+        validated.append(item)
+    return validated
+
+def _manual_inventory(inventory: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+    """The `inventory` form field: a JSON list of objects, each with a name"""
+    if not inventory:
+        return None
+    try:
+        items = json.loads(inventory)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="inventory must be a JSON list of objects with a name")
+    return validate_inventory(items)
+
+async def _read_upload(upload: UploadFile) -> bytes:
+    """Read an uploaded file in chunks, failing fast once it exceeds MAX_UPLOAD_BYTES"""
+    if upload.content_type not in UPLOAD_CONTENT_TYPES:
+        raise HTTPException(status_code=415, detail=f"{upload.filename}: only JPEG and PNG images are supported")
+    data = bytearray()
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"{upload.filename} is larger than {MAX_UPLOAD_BYTES} bytes")
+    if not data:
+        raise HTTPException(status_code=400, detail=f"{upload.filename} is empty")
+    return bytes(data)
+
+@router.post("/analyze/upload", response_model=AnalyzeResponse)
+async def analyze_uploaded_images(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    peopleCount: int = Form(2),
+    inventory: Optional[str] = Form(None),  # JSON list of manually added items
+    archive: bool = Form(True),
+    x_deadline_ms: Optional[str] = Header(None),
+):
+    """
+    Full analysis for images uploaded directly as multipart form data.
+    Images are downscaled in a process pool and the bytes go straight to
+    Rekognition (no presign / S3 PUT / S3 read); the originals are
+    archived to S3 in the background after responding.
+    """
+    started = time.perf_counter()
+    with deadline_scope(request_budget(x_deadline_ms)) as degraded:
+        result, images = await _analyze_upload(files, peopleCount, inventory, started)
+    result["degraded"] = degraded
+    # originals are archived at full resolution
+    if archive:
+        objects = [(upload_key(name), data, content_type) for name, data, content_type in images]
+        background_tasks.add_task(archive_uploads, objects)
+        result["imageKeys"] = [key for key, _, _ in objects]
+    return FastJSONResponse(result)
+
+async def _analyze_upload(files: List[UploadFile], peopleCount: int, inventory: Optional[str],
+                          started: float) -> Tuple[Dict[str, Any], List[Tuple[str, bytes, str]]]:
+    """Read, downscale and analyze the uploads; returns the AnalyzeResponse payload and the originals"""
+    # the body as a whole is capped at MAX_UPLOAD_BODY by BodyLimitMiddleware
+    # while it streams in; by now it is spooled, so only per-file limits are left
+    if len(files) > MAX_UPLOAD_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_UPLOAD_FILES} images per upload")
+    manual_inventory = _manual_inventory(inventory)
+
+    images: List[Tuple[str, bytes, str]] = []
+    with stage("upload"):
+        for upload in files:
+            images.append((upload.filename or "image.jpg", await _read_upload(upload), upload.content_type))
+
+    with stage("preprocess"):
+        processed = await image_preprocessor.process([(name, data) for name, data, _ in images])
+    for image in processed:
+        if len(image.data) > REKOGNITION_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"{image.name} is larger than {REKOGNITION_MAX_BYTES} bytes")
+
+    try:
+        logger.info(f"Starting upload analysis for {len(images)} images, {peopleCount} people")
+        raw_results = await rekognition_service.detect_food_items_from_bytes(
+            [(image.name, image.data) for image in processed]
         )
-        
+        vision_response = vision_payload(raw_results, images_processed=len(images))
+        logger.info(f"Vision detection found {len(vision_response['items'])} items")
+        result = await asyncio.to_thread(build_analysis, vision_response, peopleCount, manual_inventory, started)
     except Exception as e:
-        logger.error(f"Error in analyze endpoint: {str(e)}", exc_info=True)
+        logger.error(f"Error in upload analyze endpoint: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+    result["preprocessing"] = [
+        {
+            "name": image.name,
+            "originalBytes": image.original_bytes,
+            "bytes": len(image.data),
+            "bytesSaved": image.bytes_saved,
+            "width": image.width,
+            "height": image.height,
+            "cpuMs": round(image.cpu_seconds * 1000, 2),
+        }
+        for image in processed
+    ]
+    return result, images
+
 # Health check for vision service
 @router.get("/vision/health")
 async def vision_health():
@@ -304,6 +462,7 @@ async def vision_health():
             "rekognition_mode": "aws",
             "normalizer_loaded": len(food_normalizer.canonical_items) > 0,
             "canonical_items_count": len(food_normalizer.canonical_items),
+            "matcher_tiers": food_normalizer.matcher.stats(),
             "aws_configured": True
         }
     except Exception as e:
@@ -0,0 +1,52 @@
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+from app.utils.profiling import list_profiles, profile_path, token_ok
+from app.utils.loop_monitor import loop_monitor
+from app.utils.resilience import dependencies
+
+router = APIRouter()
+
+def _authorize(header_token: Optional[str], query_token: Optional[str]):
+    if not token_ok(header_token or query_token):
+        raise HTTPException(status_code=403, detail="Profiling token required")
+
+@router.get("/debug/profiles")
+async def get_profiles(
+    x_profile_token: Optional[str] = Header(None),
+    profile: Optional[str] = Query(None),
+):
+    """Stored request profiles, newest first"""
+    _authorize(x_profile_token, profile)
+    return {"profiles": list_profiles()}
+
+@router.get("/debug/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    x_profile_token: Optional[str] = Header(None),
+    profile: Optional[str] = Query(None),
+):
+    """Download one profile (.collapsed for flamegraphs, .pstats for pstats/snakeviz)"""
+    _authorize(x_profile_token, profile)
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=path.rsplit("/", 1)[-1])
+
+@router.get("/debug/loop")
+async def event_loop_lag(
+    x_profile_token: Optional[str] = Header(None),
+    profile: Optional[str] = Query(None),
+):
+    """Event-loop lag monitor state and the stacks of recent stalls"""
+    _authorize(x_profile_token, profile)
+    return loop_monitor.snapshot()
+
+@router.get("/debug/dependencies")
+async def dependency_health(
+    x_profile_token: Optional[str] = Header(None),
+    profile: Optional[str] = Query(None),
+):
+    """Circuit breaker state, recent latency and hedging per external dependency"""
+    _authorize(x_profile_token, profile)
+    return {name: dep.snapshot() for name, dep in dependencies().items()}
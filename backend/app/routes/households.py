@@ -0,0 +1,174 @@
+# Household inventory routes
+from fastapi import APIRouter, Header, HTTPException, Query
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import time
+from app.models.analyze import AnalyzeRequest
+from app.models.household import HouseholdAnalyzeResponse, HouseholdInventory
+from app.routes.analyze import recipe_cards, validate_inventory
+from app.routes.plan import plan as plan_logic
+from app.services.carbon_table import TAG_CODE, TAG_PENALTY, UNKNOWN_TAG
+from app.services.inventory_store import inventory_store, StoredItem
+from app.services.normalize import food_normalizer
+from app.services.rekog import rekognition_service
+from app.utils.deadline import deadline_scope, request_budget
+from app.utils.fastjson import FastJSONResponse
+from app.utils.metrics import stage, FALLBACKS
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+BUCKET = "smart-fridge-images-nayana"
+
+
+async def _detect_new_images(keys: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Detect and normalize each new image on its own; failed images are left out and retried next call"""
+    if not keys:
+        return {}
+    per_image = await rekognition_service.detect_food_items_per_image(keys, bucket=BUCKET)
+    images = {}
+    for key, detections in zip(keys, per_image):
+        if detections is None:
+            continue
+        with stage("normalize"):
+            normalized = food_normalizer.normalize_items(
+                [{'name': d.name, 'confidence': d.confidence, 'count': d.count} for d in detections]
+            )
+        images[key] = [
+            {"name": n.canonical_name, "count": n.count, "confidence": round(n.confidence, 3)} for n in normalized
+        ]
+    return images
+
+
+def _candidates(images: Dict[str, List[Dict[str, Any]]], manual: Optional[List[Dict[str, Any]]]) -> Dict[str, StoredItem]:
+    """Items from the new images (max over images) and manual entries, keyed by name, without plan data"""
+    items: Dict[str, StoredItem] = {}
+    for image_items in images.values():
+        for d in image_items:
+            item = items.get(d["name"])
+            if item is None:
+                items[d["name"]] = StoredItem(d["name"], 0, d["count"], d["confidence"], "detected")
+            else:
+                item.count = max(item.count, d["count"])
+                item.confidence = max(item.confidence, d["confidence"])
+    for m in manual or []:
+        name = m["name"].strip().lower()
+        if name and name not in items:
+            items[name] = StoredItem(name, 0, 1, m.get("confidence", 1.0), "manual", category=m.get("category"))
+    return items
+
+
+def _plan_new(items: List[StoredItem], people: int) -> None:
+    """Fill in impact, category, swap and score penalty for items the household does not have yet"""
+    try:
+        response = plan_logic(items=[i.name for i in items], people=people, flags=[], demo=False)
+    except Exception as e:
+        logger.warning(f"Planner failed for {len(items)} new items, storing them unplanned: {e}")
+        FALLBACKS.inc(component="planner")
+        return
+    swaps = {s.from_item: s for s in response.swaps}
+    for item, planned in zip(items, response.inventory):
+        item.impact = planned.impact
+        item.category = planned.category
+        item.co2e_100g = planned.co2e_100g
+        item.penalty = int(TAG_PENALTY[TAG_CODE.get(planned.impact, UNKNOWN_TAG)])
+        swap = swaps.get(item.name)
+        item.swap = swap.model_dump() if swap else None
+
+
+def _inventory_entry(item: StoredItem) -> Dict[str, Any]:
+    return {
+        "id": f"{item.source}-{item.name}",
+        "name": item.name,
+        "category": item.category or item.source.capitalize(),
+        "quantity": f"{item.count} piece(s)",
+        "carbonImpact": item.impact or "medium",
+        "confidence": item.confidence,
+    }
+
+
+def _merge(household_id: str, request: AnalyzeRequest, manual: Optional[List[Dict[str, Any]]],
+           images: Dict[str, List[Dict[str, Any]]], skipped: int, started: float) -> Dict[str, Any]:
+    """Plan only the new items, merge everything into the stored inventory and build the response"""
+    live = {i.name: i for i in inventory_store.items(household_id)}
+    candidates = _candidates(images, manual)
+    to_plan = [c for name, c in candidates.items() if name not in live or live[name].impact is None]
+    if to_plan:
+        _plan_new(to_plan, request.peopleCount)
+    household, changed = inventory_store.apply(
+        household_id, people=request.peopleCount, images=images, upserts=candidates.values()
+    )
+    logger.info(f"Household {household_id} v{household.version}: {len(images)} new images, "
+                f"{len(to_plan)} items planned, {len(changed)} changed")
+
+    items = inventory_store.items(household_id)
+    return {
+        "inventory": [_inventory_entry(i) for i in items],
+        "recipes": recipe_cards([i.name for i in items], household.people),
+        "swapTips": [
+            {
+                "id": f"swap-{i.swap['from_item']}",
+                "original": i.swap["from_item"],
+                "suggestion": i.swap["to"],
+                "reason": i.swap["why"],
+                "carbonSavings": i.swap["reduction"],
+            }
+            for i in items if i.swap
+        ],
+        "totalCarbonImpact": household.score,
+        "analysisTime": round(time.perf_counter() - started, 3),
+        "householdId": household_id,
+        "version": household.version,
+        "newImages": len(images),
+        "skippedImages": skipped,
+        "changedItems": changed,
+    }
+
+
+@router.post("/households/{household_id}/analyze", response_model=HouseholdAnalyzeResponse)
+async def analyze_household(household_id: str, request: AnalyzeRequest, x_deadline_ms: Optional[str] = Header(None)):
+    """
+    Incremental analysis against the household's stored inventory: only
+    images not seen before are detected, only items the household does not
+    have yet are planned, and the score is adjusted by their penalties.
+    """
+    started = time.perf_counter()
+    # checked up front: entries are stored, and the fast response skips the model check
+    manual = validate_inventory(request.inventory)
+    with deadline_scope(request_budget(x_deadline_ms)) as degraded:
+        new_keys = await asyncio.to_thread(inventory_store.new_images, household_id, request.imageKeys)
+        images = await _detect_new_images(new_keys)
+        result = await asyncio.to_thread(
+            _merge, household_id, request, manual, images, len(set(request.imageKeys)) - len(new_keys), started
+        )
+    result["degraded"] = degraded
+    return FastJSONResponse(result)
+
+
+@router.get("/households/{household_id}/inventory", response_model=HouseholdInventory)
+def household_inventory(household_id: str, since: Optional[int] = Query(None, ge=0)):
+    """Stored inventory; with `since`, only the items (removed ones included) changed after that version"""
+    household = inventory_store.household(household_id)
+    return FastJSONResponse({
+        "householdId": household_id,
+        "version": household.version,
+        "score": household.score,
+        "items": [asdict(i) for i in inventory_store.items(household_id, since=since)],
+    })
+
+
+@router.delete("/households/{household_id}/items/{name}", response_model=HouseholdInventory)
+def remove_household_item(household_id: str, name: str):
+    """Remove one item; the score drops its penalty and the change shows up in `since` queries"""
+    household, changed = inventory_store.apply(household_id, removals=[name.strip().lower()])
+    if not changed:
+        raise HTTPException(status_code=404, detail=f"{name} is not in household {household_id}")
+    return FastJSONResponse({
+        "householdId": household_id,
+        "version": household.version,
+        "score": household.score,
+        "items": [asdict(i) for i in inventory_store.items(household_id, since=household.version - 1)],
+    })
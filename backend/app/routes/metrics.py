@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.utils.metrics import render_all
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text-format metrics (all prefork workers merged)"""
+    return PlainTextResponse(render_all(), media_type="text/plain; version=0.0.4")
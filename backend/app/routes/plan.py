@@ -1,52 +1,174 @@
-from fastapi import APIRouter, Query
-from ..models.plan import PlanResponse, InventoryItem, SwapSuggestion, LLMContext
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from ..models.plan import (
+    PlanResponse, InventoryItem, SwapSuggestion, LLMContext, PlanBatchRequest, PlanBatchResponse,
+    PlanSessionRequest, PlanDiff, PlanSessionResponse
+)
 from ..utils.llm_swaps import suggest_swap
-from sentence_transformers import SentenceTransformer, util
-import json, os
+from ..utils.swap_table import build_swap_table
+from ..utils.fastjson import FastJSONResponse, dumps
+from ..services.carbon_table import carbon_table, score_tags, TAG_CODE, TAG_PENALTY, UNKNOWN_TAG
+from ..services.data_bundle import get_bundle, EMBEDDING_MODEL
+from ..services.matcher import TieredMatcher, carbon_vocabulary
+from ..services.normalize import food_normalizer
+from ..utils.metrics import stage
+from ..utils.deadline import degrade, has_budget
+from collections import Counter
+import os
+import threading
+import time
+import uuid
+import numpy as np
 
 
 router = APIRouter()
 
 
-# Load your carbon dataset
-CARBON_LIST = json.load(open(os.path.join(os.path.dirname(__file__), "../../../data","carbon_impact.json")))
-CARBON = {entry["name"].lower(): {
-            "tag": entry["tag"],
-            "co2e_100g": entry["co2e_kg_per_kg"]/10,  # kg -> 100gs
-            "category": entry["category"]
-          } for entry in CARBON_LIST}
+# Columnar carbon dataset shared with services.carbon and utils.scoring
+CARBON_TABLE = carbon_table
 
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+KEYS = CARBON_TABLE.keys
 
+# The sentence-transformer (and torch with it) is only imported when a
+# lookup first reaches the embedding tier, or at startup with PRELOAD_MODELS=1
+_model = None
+_embeddings = None
+_swap_table = None
+_load_lock = threading.Lock()
 
-KEYS = list(CARBON.keys())
-EMBEDDINGS = model.encode(KEYS, convert_to_tensor=True)
+# time budget the embedding tier needs; less than this left and lookups stay lexical
+EMBED_BUDGET = float(os.getenv("PLAN_EMBED_BUDGET", "0.5"))
+MODEL_LOAD_BUDGET = float(os.getenv("PLAN_MODEL_LOAD_BUDGET", "5.0"))
+
+def get_model():
+    global _model
+    if _model is None:
+        with _load_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(EMBEDDING_MODEL)
+    return _model
+
+def _load_embeddings():
+    global _embeddings, _swap_table
+    bundle = get_bundle()
+    if bundle is not None and bundle.embedding_model == EMBEDDING_MODEL:
+        # memory-mapped, precomputed at build time
+        embeddings, swap_table = bundle.embeddings, bundle.swap_table(KEYS)
+    else:
+        # Unit-normalised, so a dot product is the cosine similarity
+        embeddings = get_model().encode(KEYS, normalize_embeddings=True)
+        # Best same-category lower-carbon substitutes per entry, computed once
+        swap_table = build_swap_table(CARBON_TABLE, embeddings)
+    with _load_lock:
+        if _embeddings is None:
+            _embeddings, _swap_table = embeddings, swap_table
+
+def get_embeddings():
+    if _embeddings is None:
+        _load_embeddings()
+    return _embeddings
+
+def get_swap_table():
+    if _swap_table is None:
+        _load_embeddings()
+    return _swap_table
+
+def warm_up():
+    """Load the model, embeddings and swap table now instead of on first request"""
+    get_model()
+    get_swap_table()
 
 def compute_score(inventory):
-    base = 100
-    for item in inventory:
-        if item.impact == "high":
-            base -= 10
-        elif item.impact == "medium":
-            base -= 5
-    return max(base, 0)
+    return score_tags([TAG_CODE.get(item.impact, UNKNOWN_TAG) for item in inventory])
 
 def normalize_name(name: str):
     return name.lower().replace("origin unknown", "").strip()
 
+def _embed_lookup(queries: list[str]):
+    """Embedding tier of the carbon matcher: best key and cosine score per query"""
+    with stage("embedding"):
+        query_embs = get_model().encode(queries, normalize_embeddings=True)
+        scores = query_embs @ get_embeddings().T
+    best_idx = scores.argmax(axis=1)
+    return [(KEYS[i], float(scores[row, i])) for row, i in enumerate(best_idx.tolist())]
+
+# Exact alias/name hash -> character n-grams -> sentence embeddings; the
+# transformer only runs for names the cheap tiers cannot place
+carbon_matcher = TieredMatcher(
+    "carbon",
+    carbon_vocabulary(KEYS, food_normalizer.aliases),
+    embed_lookup=_embed_lookup,
+    embed_threshold=0.6,
+)
+
+def lookup_key(query: str):
+    """Carbon table key for `query`, or None when no tier is confident"""
+    return carbon_matcher.match(query).target
+
+def lookup_keys(queries: list[str], use_embedding: bool = True):
+    """Batched lookup_key; leftovers share one embedding pass"""
+    return [r.target for r in carbon_matcher.match_many(queries, use_embedding=use_embedding)]
+
+def _embedding_fits_budget() -> bool:
+    """Whether the request deadline leaves time for the embedding tier (and loading the model if needed)"""
+    return has_budget(EMBED_BUDGET if _model is not None else MODEL_LOAD_BUDGET)
+
+def _resolve(items: list[str]):
+    """Carbon keys for `items`, lexical only when the deadline is too close for the embedding tier"""
+    with stage("lookup"):
+        use_embedding = _embedding_fits_budget()
+        matches = carbon_matcher.match_many(items, use_embedding=use_embedding)
+    if not use_embedding and any(m.target is None for m in matches):
+        degrade("plan", "lexical lookups only, out of time budget")
+    return [m.target for m in matches]
+
+def _swap_table_in_budget():
+    """The swap table, or None when building it now (model load, encoding) would not fit the deadline"""
+    if _swap_table is None and not _embedding_fits_budget():
+        degrade("plan", "precomputed swaps skipped, out of time budget")
+        return None
+    return get_swap_table()
+
 def semantic_lookup(query: str):
-    query_emb = model.encode(query.lower(), convert_to_tensor=True)
-    scores = util.cos_sim(query_emb, EMBEDDINGS)[0]
-    best_idx = scores.argmax().item()
-    best_score = scores[best_idx].item()
+    return CARBON_TABLE.entry(CARBON_TABLE.row(lookup_key(query)))
 
-    # Add threshold (e.g., 0.6 = 60% similarity)
-    if best_score < 0.6:
-        return {"tag": "unknown", "co2e_100g": None, "category": "other"}
+def _reduction(co2e_100g, to_item: str):
+    """Percent co2e saved by swapping to `to_item`, when both values are known"""
+    [to_key] = lookup_keys([normalize_name(to_item)], use_embedding=_embedding_fits_budget())
+    to_co2e = CARBON_TABLE.co2e(CARBON_TABLE.row(to_key))
+    if to_co2e is None or not co2e_100g:
+        return None
+    return 100 * (1 - to_co2e / co2e_100g)
 
-    best_key = KEYS[best_idx]
-    return CARBON[best_key]
+def plan_item(item: str, key):
+    """InventoryItem and optional SwapSuggestion for one resolved item"""
+    row = CARBON_TABLE.row(key)
+    impact = CARBON_TABLE.tag(row)
+    category = CARBON_TABLE.category(row)
+    co2e_100g = CARBON_TABLE.co2e(row)
+
+    inventory_item = InventoryItem(
+        name=item, count=1, impact=impact, category=category, co2e_100g=co2e_100g
+    )
+
+    # Generate intelligent swaps for medium/high impact items
+    swap = None
+    if impact in ["medium", "high"]:
+        table = _swap_table_in_budget()
+        best = table.get(key) if table is not None else None
+        if best:
+            swap = SwapSuggestion(
+                from_item=item, to=best[0].to_item, why=best[0].why, reduction=best[0].reduction
+            )
+        else:
+            to_item, why = suggest_swap(item, category, co2e_100g)
+            if to_item:
+                swap = SwapSuggestion(
+                    from_item=item, to=to_item, why=why, reduction=_reduction(co2e_100g, to_item)
+                )
+    return inventory_item, swap
 
 
 @router.post("/plan", response_model=PlanResponse)
@@ -61,28 +183,198 @@ def plan(
     inventory = []
     swaps = []
 
-    for item in items:
-        entry = semantic_lookup(item)
-        impact = entry["tag"]
-        category = entry.get("category", "other")
-        co2e_100g = entry["co2e_100g"]
+    keys = _resolve(items)
 
-        inventory.append(InventoryItem(
-            name=item, count=1, impact=impact, category=category, co2e_100g=co2e_100g
-        ))
-
-        # Generate intelligent swaps for medium/high impact items
-        if impact in ["medium", "high"]:
-            to_item, why = suggest_swap(item, category, co2e_100g)
-            if to_item:
-                t_data = semantic_lookup(normalize_name(to_item))
-                reduction = None
-                if t_data is not None and t_data.get("co2e_100g") is not None and co2e_100g is not None and co2e_100g != 0:
-                    reduction = 100 * (1 - (t_data["co2e_100g"] / co2e_100g))
-                swaps.append(SwapSuggestion(
-                    from_item=item, to=to_item, why=why, reduction=reduction
-                ))
+    with stage("swaps"):
+        for item, key in zip(items, keys):
+            inventory_item, swap = plan_item(item, key)
+            inventory.append(inventory_item)
+            if swap is not None:
+                swaps.append(swap)
 
     llm_context = LLMContext(pantry=items, people=people, flags=flags)
     score = compute_score(inventory)
-    return PlanResponse(inventory=inventory, swaps=swaps, llm_context=llm_context, score = score)
\ No newline at end of file
+    return PlanResponse(inventory=inventory, swaps=swaps, llm_context=llm_context, score = score)
+
+
+def _plan_batch(households):
+    """
+    Yield one PlanResponse-shaped dict per household, in input order.
+
+    Item names are deduplicated across the whole batch and resolved with a
+    single embedding pass; each distinct item is planned once, and scores
+    for all households come from one bincount over the impact penalties.
+    """
+    unique = list(dict.fromkeys(item for h in households for item in h.items))
+    position = {item: i for i, item in enumerate(unique)}
+    keys = lookup_keys(unique)
+
+    planned = [plan_item(item, key) for item, key in zip(unique, keys)]
+    planned = [(inv.model_dump(), swap.model_dump() if swap else None) for inv, swap in planned]
+    rows = np.fromiter((CARBON_TABLE.row(k) for k in keys), dtype=np.int64, count=len(keys))
+    penalties = TAG_PENALTY[CARBON_TABLE.tag_codes[rows]]
+
+    owner = np.repeat(np.arange(len(households)), [len(h.items) for h in households])
+    item_idx = np.fromiter((position[item] for h in households for item in h.items), dtype=np.int64, count=owner.size)
+    totals = np.bincount(owner, weights=penalties[item_idx], minlength=len(households))
+    scores = np.maximum(100 - totals, 0).astype(int)
+
+    for h, score in zip(households, scores.tolist()):
+        rows = [planned[position[item]] for item in h.items]
+        yield {
+            "inventory": [inv for inv, _ in rows],
+            "swaps": [swap for _, swap in rows if swap is not None],
+            "llm_context": {"pantry": h.items, "people": h.people, "flags": h.flags},
+            "score": score,
+        }
+
+
+@router.post("/plan/batch", response_model=PlanBatchResponse)
+def plan_batch(request: PlanBatchRequest, stream: bool = Query(False)):
+    """Plan many households in one call; `stream=true` returns NDJSON lines"""
+    results = _plan_batch(request.households)
+    if stream:
+        return StreamingResponse(
+            (dumps(r) + b"\n" for r in results), media_type="application/x-ndjson"
+        )
+    return FastJSONResponse({"results": list(results)})
+
+
+# Plan sessions: plan_id -> (last use, PlanSession). Only the latest plan id
+# of a session can be edited; each edit retires it and issues a new one.
+_SESSIONS = {}
+_sessions_lock = threading.Lock()
+SESSION_TTL_SECONDS = int(os.getenv("PLAN_SESSION_TTL", "1800"))
+MAX_SESSIONS = int(os.getenv("PLAN_MAX_SESSIONS", "10000"))
+
+
+class PlanSession:
+    """
+    A plan kept in memory between edits. Each planned item is stored with
+    its swap and score penalty, so adding or removing items only plans (or
+    drops) those items and adjusts the running penalty total.
+    """
+
+    def __init__(self, people: int = 2, flags: list[str] = ()):
+        self.people = people
+        self.flags = list(flags)
+        self.penalty = 0
+        self._entries = {}   # entry id -> (item, inventory dict, swap dict or None, penalty)
+        self._by_name = {}   # item -> entry ids, oldest first
+        self._next_id = 0
+
+    @property
+    def score(self) -> int:
+        return max(100 - self.penalty, 0)
+
+    def add(self, items: list[str]) -> None:
+        """Plan `items` and append them; nothing is added if planning fails"""
+        planned = [plan_item(item, key) for item, key in zip(items, _resolve(items))]
+        for item, (inventory_item, swap) in zip(items, planned):
+            penalty = int(TAG_PENALTY[TAG_CODE.get(inventory_item.impact, UNKNOWN_TAG)])
+            self._entries[self._next_id] = (
+                item, inventory_item.model_dump(), swap.model_dump() if swap else None, penalty
+            )
+            self._by_name.setdefault(item, []).append(self._next_id)
+            self._next_id += 1
+            self.penalty += penalty
+
+    def missing(self, items: list[str]) -> list[str]:
+        """Names in `items` the plan does not hold as many times as listed"""
+        return [
+            item for item, n in Counter(items).items() if len(self._by_name.get(item, ())) < n
+        ]
+
+    def remove(self, items: list[str]) -> None:
+        """Drop one occurrence (the earliest, like list.remove) per name; check `missing` first"""
+        for item in items:
+            ids = self._by_name[item]
+            self.penalty -= self._entries.pop(ids.pop(0))[3]
+            if not ids:
+                del self._by_name[item]
+
+    def response(self, plan_id: str) -> dict:
+        entries = self._entries.values()
+        return {
+            "plan_id": plan_id,
+            "inventory": [inv for _, inv, _, _ in entries],
+            "swaps": [swap for _, _, swap, _ in entries if swap is not None],
+            "llm_context": {"pantry": [item for item, _, _, _ in entries], "people": self.people, "flags": self.flags},
+            "score": self.score,
+        }
+
+
+def _store_session(session: PlanSession) -> str:
+    plan_id = uuid.uuid4().hex
+    now = time.time()
+    with _sessions_lock:
+        _SESSIONS[plan_id] = (now, session)
+        # dicts keep insertion order, and every use re-inserts, so the front is least recently used
+        while len(_SESSIONS) > MAX_SESSIONS:
+            del _SESSIONS[next(iter(_SESSIONS))]
+        cutoff = now - SESSION_TTL_SECONDS
+        while _SESSIONS:
+            oldest = next(iter(_SESSIONS))
+            if _SESSIONS[oldest][0] >= cutoff:
+                break
+            del _SESSIONS[oldest]
+    return plan_id
+
+
+def _restore_session(plan_id: str, session: PlanSession) -> None:
+    with _sessions_lock:
+        _SESSIONS[plan_id] = (time.time(), session)
+
+
+def _session(plan_id: str, claim: bool = False) -> PlanSession:
+    """
+    The session behind `plan_id`; with `claim`, also retire the id so no
+    concurrent edit can use it. Otherwise the read counts as a use and
+    restarts the session's TTL.
+    """
+    now = time.time()
+    with _sessions_lock:
+        entry = _SESSIONS.pop(plan_id, None)
+        if entry is None or now - entry[0] > SESSION_TTL_SECONDS:
+            raise HTTPException(status_code=404, detail="Unknown, expired or superseded plan id")
+        if not claim:
+            _SESSIONS[plan_id] = (now, entry[1])
+    return entry[1]
+
+
+@router.post("/plan/sessions", response_model=PlanSessionResponse)
+def create_plan_session(request: PlanSessionRequest):
+    """Plan `items` like /plan and keep the result so later edits can be sent as diffs"""
+    session = PlanSession(request.people, request.flags)
+    session.add(request.items)
+    return FastJSONResponse(session.response(_store_session(session)))
+
+
+@router.get("/plan/sessions/{plan_id}", response_model=PlanSessionResponse)
+def get_plan_session(plan_id: str):
+    return FastJSONResponse(_session(plan_id).response(plan_id))
+
+
+@router.patch("/plan/sessions/{plan_id}", response_model=PlanSessionResponse)
+def edit_plan_session(plan_id: str, diff: PlanDiff):
+    """
+    Apply a diff to the plan and return it under a new plan id, retiring the
+    old one. Only the items in the diff are looked up and planned, and the
+    score moves by their penalties. Removed items must already be in the
+    plan; otherwise nothing changes and the old id stays valid.
+    """
+    session = _session(plan_id, claim=True)
+    try:
+        missing = session.missing(diff.remove)
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Not in plan: {', '.join(missing)}")
+        session.add(diff.add)
+    except Exception:
+        _restore_session(plan_id, session)
+        raise
+    session.remove(diff.remove)
+    if diff.people is not None:
+        session.people = diff.people
+    if diff.flags is not None:
+        session.flags = list(diff.flags)
+    return FastJSONResponse(session.response(_store_session(session)))
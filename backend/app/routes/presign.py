@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from app.utils.s3 import generate_presigned_url
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+from app.utils.s3 import generate_presigned_url, generate_presigned_urls, generate_presigned_post, upload_key
 import uuid
 from datetime import datetime
 
@@ -15,14 +16,28 @@ class PresignResponse(BaseModel):
     key: str
     expiresIn: int
 
+class PresignBatchRequest(BaseModel):
+    files: List[PresignRequest] = Field(min_length=1, max_length=20)
+    # "put": one presigned PUT URL per file; "post": one POST policy for a prefix
+    mode: Literal["put", "post"] = "put"
+
+class PresignPost(BaseModel):
+    url: str
+    fields: Dict[str, str]
+
+class PresignBatchResponse(BaseModel):
+    uploads: List[PresignResponse]  # request order; uploadUrl is "" in post mode
+    post: Optional[PresignPost] = None
+    expiresIn: int
+
+EXPIRES_IN = 3600  # 1 hour
+
 @router.post("/presign", response_model=PresignResponse)
 async def get_presigned_upload_url(request: PresignRequest):
     """Generate presigned URL for S3 upload"""
     try:
         # Generate unique key for the file
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        unique_id = str(uuid.uuid4())[:8]
-        key = f"uploads/{timestamp}_{unique_id}_{request.fileName}"
+        key = upload_key(request.fileName)
         
         # Generate presigned URL
         upload_url = generate_presigned_url(key, request.fileType)
@@ -30,7 +45,38 @@ async def get_presigned_upload_url(request: PresignRequest):
         return PresignResponse(
             uploadUrl=upload_url,
             key=key,
-            expiresIn=3600  # 1 hour
+            expiresIn=EXPIRES_IN
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate presigned URL: {str(e)}")
+
+@router.post("/presign/batch", response_model=PresignBatchResponse)
+async def get_presigned_upload_urls(request: PresignBatchRequest):
+    """
+    Presign a whole multi-image upload in one round trip. Keys come back in
+    request order. In "post" mode every key shares one prefix, and a single
+    POST policy (form `url` + `fields`, plus the file's `key` and
+    `Content-Type`) accepts uploads to any of them.
+    """
+    try:
+        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        if request.mode == "post":
+            prefix = f"uploads/{timestamp}_{str(uuid.uuid4())[:8]}/"
+            keys = [upload_key(f.fileName, timestamp, prefix=prefix) for f in request.files]
+            policy = generate_presigned_post(prefix, expiration=EXPIRES_IN)
+            return PresignBatchResponse(
+                uploads=[PresignResponse(uploadUrl="", key=k, expiresIn=EXPIRES_IN) for k in keys],
+                post=PresignPost(url=policy["url"], fields=policy["fields"]),
+                expiresIn=EXPIRES_IN,
+            )
+
+        keys = [upload_key(f.fileName, timestamp) for f in request.files]
+        urls = generate_presigned_urls(
+            [(k, f.fileType) for k, f in zip(keys, request.files)], expiration=EXPIRES_IN
+        )
+        return PresignBatchResponse(
+            uploads=[PresignResponse(uploadUrl=u, key=k, expiresIn=EXPIRES_IN) for u, k in zip(urls, keys)],
+            expiresIn=EXPIRES_IN,
         )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to generate presigned URL: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to generate presigned URLs: {str(e)}")
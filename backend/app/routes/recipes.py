@@ -1,21 +1,23 @@
 # backend/api/recipes.py
-from fastapi import APIRouter, Query
-import json
-from pathlib import Path
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import List
 from app.shared.models.recipe import Recipe, LLMContext
-from app.services.recipes_llm import generate
+from app.services.recipes_llm import generate, generate_stream
+from app.utils.demo import demo_recipe
 
 router = APIRouter()
 
-APP_DIR = Path(__file__).resolve().parents[1]
-
 @router.get("/recipes", response_model=Recipe)
-def get_recipe_demo():
-    p = APP_DIR / "dev" / "fixtures" / "recipe_demo.json"
-    data = json.loads(p.read_text())
-    return Recipe(**data)
+def get_recipe_demo(request: Request):
+    return demo_recipe.response(request)
 
 @router.post("/recipes", response_model=List[Recipe])
 def post_recipes(ctx: LLMContext, demo: bool = Query(False)):
-    return generate(ctx, demo=demo)
\ No newline at end of file
+    return generate(ctx, demo=demo)
+
+@router.post("/recipes/stream")
+def post_recipes_stream(ctx: LLMContext, demo: bool = Query(False)):
+    """Stream recipes as NDJSON, one line per recipe as soon as it is ready"""
+    lines = (r.model_dump_json() + "\n" for r in generate_stream(ctx, demo=demo))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
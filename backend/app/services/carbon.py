@@ -1,33 +1,24 @@
 from typing import List, Dict, Any
+import numpy as np
+from app.services.carbon_table import inventory_columns, TAG_CODE
 
 def calculate_carbon_impact(inventory: List[Dict[str, Any]]) -> Dict[str, Any]:
     """Calculate carbon impact for inventory items"""
     
-    total_carbon = 0
-    high_impact_items = []
-    medium_impact_items = []
-    low_impact_items = []
-    
-    for item in inventory:
-        carbon_value = item.get('carbonValue', 1.0)
-        total_carbon += carbon_value
-        
-        if item.get('carbonImpact') == 'high':
-            high_impact_items.append(item)
-        elif item.get('carbonImpact') == 'medium':
-            medium_impact_items.append(item)
-        else:
-            low_impact_items.append(item)
+    cols = inventory_columns(inventory)
+    high = np.flatnonzero(cols.impact == TAG_CODE['high'])
+    medium = np.flatnonzero(cols.impact == TAG_CODE['medium'])
+    low = np.flatnonzero((cols.impact != TAG_CODE['high']) & (cols.impact != TAG_CODE['medium']))
     
     return {
-        'totalCarbon': round(total_carbon, 2),
-        'highImpactItems': high_impact_items,
-        'mediumImpactItems': medium_impact_items,
-        'lowImpactItems': low_impact_items,
+        'totalCarbon': round(float(cols.carbon.sum()), 2),
+        'highImpactItems': [inventory[i] for i in high],
+        'mediumImpactItems': [inventory[i] for i in medium],
+        'lowImpactItems': [inventory[i] for i in low],
         'impactBreakdown': {
-            'high': len(high_impact_items),
-            'medium': len(medium_impact_items),
-            'low': len(low_impact_items)
+            'high': int(high.size),
+            'medium': int(medium.size),
+            'low': int(low.size)
         }
     }
 
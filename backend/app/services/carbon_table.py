@@ -0,0 +1,139 @@
+import json
+import os
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TAGS = ["low", "medium", "high", "unknown"]
+TAG_CODE = {tag: i for i, tag in enumerate(TAGS)}
+UNKNOWN_TAG = TAG_CODE["unknown"]
+
+# Points taken off the 100-point plan score per item, indexed by tag code
+TAG_PENALTY = np.array([0, 5, 10, 0], dtype=np.int64)
+
+
+class CarbonTable:
+    """
+    Columnar view of carbon_impact.json.
+
+    Row i describes `keys[i]`: `co2e_100g[i]` (kg CO2e per 100 g, NaN when
+    unknown), `tag_codes[i]` (index into TAGS) and `category_codes[i]`
+    (index into `categories`). One extra trailing row, `UNKNOWN_ROW`, stands
+    for "no match" so lookups can always return a row index.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self.keys: List[str] = [e["name"].lower() for e in entries]
+        self.index: Dict[str, int] = {k: i for i, k in enumerate(self.keys)}
+        self.categories: List[str] = sorted({e["category"] for e in entries}) + ["other"]
+        category_code = {c: i for i, c in enumerate(self.categories)}
+
+        self.UNKNOWN_ROW = len(entries)
+        self.co2e_100g = np.array(
+            [e["co2e_kg_per_kg"] / 10 for e in entries] + [np.nan],  # kg -> 100gs
+            dtype=np.float64,
+        )
+        self.tag_codes = np.array(
+            [TAG_CODE.get(e["tag"], UNKNOWN_TAG) for e in entries] + [UNKNOWN_TAG],
+            dtype=np.int8,
+        )
+        self.category_codes = np.array(
+            [category_code[e["category"]] for e in entries] + [category_code["other"]],
+            dtype=np.int16,
+        )
+
+    @classmethod
+    def from_columns(cls, keys, categories, co2e_100g, tag_codes, category_codes) -> "CarbonTable":
+        """Wrap prebuilt columns (e.g. from the data bundle) without copying"""
+        table = cls.__new__(cls)
+        table.keys = list(keys)
+        table.index = {k: i for i, k in enumerate(table.keys)}
+        table.categories = list(categories)
+        table.UNKNOWN_ROW = len(table.keys)
+        table.co2e_100g = co2e_100g
+        table.tag_codes = tag_codes
+        table.category_codes = category_codes
+        return table
+
+    @classmethod
+    def from_json(cls, file_path: str = None) -> "CarbonTable":
+        if file_path is None:
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            file_path = os.path.join(current_dir, "../../../data/carbon_impact.json")
+        with open(file_path, "r") as f:
+            return cls(json.load(f))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def row(self, key: Optional[str]) -> int:
+        """Row index for a table key; UNKNOWN_ROW when missing"""
+        if key is None:
+            return self.UNKNOWN_ROW
+        return self.index.get(key, self.UNKNOWN_ROW)
+
+    def tag(self, row: int) -> str:
+        return TAGS[self.tag_codes[row]]
+
+    def category(self, row: int) -> str:
+        return self.categories[self.category_codes[row]]
+
+    def co2e(self, row: int) -> Optional[float]:
+        value = self.co2e_100g[row]
+        return None if np.isnan(value) else float(value)
+
+    def entry(self, row: int) -> Dict[str, Any]:
+        """Row as the legacy {"tag", "co2e_100g", "category"} dict"""
+        return {"tag": self.tag(row), "co2e_100g": self.co2e(row), "category": self.category(row)}
+
+    def score_rows(self, rows) -> int:
+        """Plan score (100 minus impact penalties, floored at 0) for table rows"""
+        return score_tags(self.tag_codes[np.asarray(rows, dtype=np.int64)])
+
+
+def score_tags(tag_codes) -> int:
+    """Plan score for an array of tag codes"""
+    return int(max(100 - TAG_PENALTY[np.asarray(tag_codes, dtype=np.int64)].sum(), 0))
+
+
+@dataclass
+class InventoryColumns:
+    """Frontend inventory dicts unpacked into parallel arrays"""
+    carbon: np.ndarray       # carbonValue, default 1.0
+    impact: np.ndarray       # tag codes from carbonImpact
+    confidence: np.ndarray   # confidence, default 0
+    category: List[str]
+
+    def __len__(self) -> int:
+        return len(self.category)
+
+
+def inventory_columns(inventory: List[Dict[str, Any]]) -> InventoryColumns:
+    """Single pass over the inventory dicts; everything else works on arrays"""
+    n = len(inventory)
+    carbon = np.empty(n, dtype=np.float64)
+    impact = np.empty(n, dtype=np.int8)
+    confidence = np.empty(n, dtype=np.float64)
+    category = []
+    for i, item in enumerate(inventory):
+        carbon[i] = item.get('carbonValue', 1.0)
+        impact[i] = TAG_CODE.get(item.get('carbonImpact'), UNKNOWN_TAG)
+        confidence[i] = item.get('confidence', 0)
+        category.append(item.get('category', 'Other'))
+    return InventoryColumns(carbon=carbon, impact=impact, confidence=confidence, category=category)
+
+
+def load_carbon_table() -> CarbonTable:
+    """Carbon table from the compiled data bundle when present, else the JSON"""
+    from app.services.data_bundle import get_bundle
+    bundle = get_bundle()
+    if bundle is not None:
+        return bundle.carbon_table()
+    return CarbonTable.from_json()
+
+
+# Global instance
+carbon_table = load_carbon_table()
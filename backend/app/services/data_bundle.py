@@ -0,0 +1,250 @@
+"""
+Compiled binary data bundle.
+
+`ingredient_aliases.json` and `carbon_impact.json` are compiled, together
+with the carbon-name embeddings and the swap table derived from them, into
+one versioned file of aligned arrays. At startup the file is memory-mapped
+read-only, so arrays are views onto the page cache: nothing is parsed or
+encoded per process and preforked workers share the same pages.
+
+Build (needs sentence-transformers for the embeddings):
+
+    cd backend && python -m app.services.data_bundle build
+
+Layout: MAGIC | u32 version | u32 header length | JSON header | sections.
+Every section starts on a 64-byte boundary; the header records its dtype,
+shape and offset relative to the end of the header block.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Dict, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SFBUNDLE"
+VERSION = 2  # 2: dropped the alias hash index (the normalizer's exact tier is a dict)
+ALIGN = 64
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../data"))
+ALIASES_JSON = os.path.join(DATA_DIR, "ingredient_aliases.json")
+CARBON_JSON = os.path.join(DATA_DIR, "carbon_impact.json")
+DEFAULT_PATH = os.path.join(DATA_DIR, "smart_fridge.bundle")
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+
+def _sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _align(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _json_section(obj) -> np.ndarray:
+    return np.frombuffer(json.dumps(obj, separators=(",", ":")).encode("utf-8"), dtype=np.uint8)
+
+
+def write_bundle(path: str, sections: Dict[str, np.ndarray], meta: dict) -> None:
+    """Write named arrays plus metadata in the bundle layout"""
+    layout = {}
+    offset = 0
+    for name, arr in sections.items():
+        arr = np.ascontiguousarray(arr)
+        sections[name] = arr
+        layout[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset = _align(offset + arr.nbytes)
+
+    header = json.dumps({"version": VERSION, "meta": meta, "sections": layout}).encode("utf-8")
+    start = _align(len(MAGIC) + 8 + len(header))
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<II", VERSION, len(header)) + header)
+        for name, arr in sections.items():
+            f.seek(start + layout[name]["offset"])
+            f.write(arr.tobytes())
+        f.truncate(start + offset)
+    os.replace(tmp, path)
+
+
+def compile_bundle(out_path: str = DEFAULT_PATH, model=None) -> str:
+    """Compile the JSON sources, embeddings and swap table into `out_path`"""
+    from app.services.carbon_table import CarbonTable
+    from app.utils.swap_table import build_swap_table
+
+    with open(ALIASES_JSON, "r") as f:
+        aliases: Dict[str, List[str]] = json.load(f)
+    with open(CARBON_JSON, "r") as f:
+        table = CarbonTable(json.load(f))
+
+    if model is None:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(EMBEDDING_MODEL)
+    embeddings = np.asarray(model.encode(table.keys, normalize_embeddings=True), dtype=np.float32)
+
+    # swap table in CSR form: row i's swaps are swap_to[offsets[i]:offsets[i+1]]
+    swaps = build_swap_table(table, embeddings)
+    offsets, swap_to, swap_reduction = [0], [], []
+    for key in table.keys:
+        for cand in swaps.get(key, []):
+            swap_to.append(table.index[cand.to_key])
+            swap_reduction.append(cand.reduction)
+        offsets.append(len(swap_to))
+
+    n = len(table)
+    sections = {
+        "aliases_json": _json_section(aliases),
+        "carbon_keys_json": _json_section(table.keys),
+        "carbon_categories_json": _json_section(table.categories),
+        "co2e_100g": table.co2e_100g,
+        "tag_codes": table.tag_codes,
+        "category_codes": table.category_codes,
+        "embeddings": embeddings[:n],
+        "swap_offsets": np.array(offsets, dtype=np.int32),
+        "swap_to": np.array(swap_to, dtype=np.int32),
+        "swap_reduction": np.array(swap_reduction, dtype=np.float64),
+    }
+    meta = {
+        "sources": {"aliases": _sha256(ALIASES_JSON), "carbon": _sha256(CARBON_JSON)},
+        "embedding_model": EMBEDDING_MODEL,
+        "built_at": int(time.time()),
+    }
+    write_bundle(out_path, sections, meta)
+    return out_path
+
+
+class DataBundle:
+    """Read-only memory-mapped view of a compiled bundle"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a data bundle")
+        version, header_len = struct.unpack_from("<II", self._mm, len(MAGIC))
+        if version != VERSION:
+            raise ValueError(f"{path} has bundle version {version}, expected {VERSION}")
+        pos = len(MAGIC) + 8
+        header = json.loads(self._mm[pos:pos + header_len])
+        self._start = _align(pos + header_len)
+        self._sections = header["sections"]
+        self.meta = header["meta"]
+
+    def array(self, name: str) -> np.ndarray:
+        spec = self._sections[name]
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"])) if spec["shape"] else 1
+        arr = np.frombuffer(self._mm, dtype=dtype, count=count, offset=self._start + spec["offset"])
+        return arr.reshape(spec["shape"])
+
+    def json(self, name: str):
+        return json.loads(self.array(name).tobytes())
+
+    def is_fresh(self) -> bool:
+        """True when the JSON sources still match what the bundle was built from"""
+        sources = self.meta.get("sources", {})
+        try:
+            return (sources.get("aliases") == _sha256(ALIASES_JSON)
+                    and sources.get("carbon") == _sha256(CARBON_JSON))
+        except FileNotFoundError:
+            # deployed without the JSON sources: the bundle is the source of truth
+            return True
+
+    @property
+    def embedding_model(self) -> str:
+        return self.meta.get("embedding_model")
+
+    @property
+    def aliases(self) -> Dict[str, List[str]]:
+        return self.json("aliases_json")
+
+    def carbon_table(self):
+        from app.services.carbon_table import CarbonTable
+        return CarbonTable.from_columns(
+            keys=self.json("carbon_keys_json"),
+            categories=self.json("carbon_categories_json"),
+            co2e_100g=self.array("co2e_100g"),
+            tag_codes=self.array("tag_codes"),
+            category_codes=self.array("category_codes"),
+        )
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Unit-normalised float32 embeddings, one row per carbon key"""
+        return self.array("embeddings")
+
+    def swap_table(self, keys: List[str] = None):
+        from app.utils.swap_table import swap_candidate
+        keys = keys if keys is not None else self.json("carbon_keys_json")
+        offsets = self.array("swap_offsets")
+        swap_to = self.array("swap_to")
+        reduction = self.array("swap_reduction")
+        table = {}
+        for i, key in enumerate(keys):
+            lo, hi = offsets[i], offsets[i + 1]
+            if hi > lo:
+                table[key] = [swap_candidate(keys, i, int(j), r) for j, r in zip(swap_to[lo:hi], reduction[lo:hi])]
+        return table
+
+
+_BUNDLE: Optional[DataBundle] = None
+_BUNDLE_CHECKED = False
+
+
+def get_bundle() -> Optional[DataBundle]:
+    """
+    The process-wide bundle, or None when it is missing, disabled
+    (DATA_BUNDLE=0), unreadable or stale; callers then load the JSON sources.
+    """
+    global _BUNDLE, _BUNDLE_CHECKED
+    if _BUNDLE_CHECKED:
+        return _BUNDLE
+    _BUNDLE_CHECKED = True
+
+    if os.getenv("DATA_BUNDLE", "1") == "0":
+        return None
+    path = os.getenv("DATA_BUNDLE_PATH", DEFAULT_PATH)
+    if not os.path.exists(path):
+        return None
+    try:
+        bundle = DataBundle(path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring data bundle {path}: {e}")
+        return None
+    if not bundle.is_fresh():
+        logger.warning(f"Data bundle {path} is stale, rebuild it; using JSON sources")
+        return None
+    logger.info(f"Using data bundle {path}")
+    _BUNDLE = bundle
+    return _BUNDLE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart Fridge data bundle tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="compile the JSON sources into a bundle")
+    build.add_argument("--out", default=os.getenv("DATA_BUNDLE_PATH", DEFAULT_PATH))
+    info = sub.add_parser("info", help="print a bundle's header")
+    info.add_argument("path", nargs="?", default=os.getenv("DATA_BUNDLE_PATH", DEFAULT_PATH))
+    args = parser.parse_args()
+
+    if args.command == "build":
+        path = compile_bundle(args.out)
+        print(f"Wrote {path} ({os.path.getsize(path)} bytes)")
+    else:
+        bundle = DataBundle(args.path)
+        print(json.dumps({"meta": bundle.meta, "sections": bundle._sections, "fresh": bundle.is_fresh()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
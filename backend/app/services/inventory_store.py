@@ -0,0 +1,236 @@
+"""
+Persistent per-household inventory (SQLite).
+
+Each household has a version that goes up by one with every change. Item
+rows record the version that last touched them, and removed items stay as
+tombstones, so `items(household, since=v)` returns exactly what changed
+after version v. The store also remembers which images have been analyzed
+and keeps the household's running carbon penalty, which lets adding or
+removing an item update the score without re-planning everything else.
+
+The database is INVENTORY_DB (default data/inventory.sqlite3). WAL mode
+lets prefork workers and threads share it; writes to one household are
+serialized by `BEGIN IMMEDIATE`.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.services.data_bundle import DATA_DIR
+
+INVENTORY_DB = os.getenv("INVENTORY_DB", os.path.join(DATA_DIR, "inventory.sqlite3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS households (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    penalty INTEGER NOT NULL DEFAULT 0,
+    people INTEGER NOT NULL DEFAULT 2,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    household_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    confidence REAL NOT NULL,
+    source TEXT NOT NULL,
+    category TEXT,
+    impact TEXT,
+    co2e_100g REAL,
+    penalty INTEGER NOT NULL DEFAULT 0,
+    swap TEXT,
+    removed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (household_id, name)
+);
+CREATE INDEX IF NOT EXISTS items_by_version ON items (household_id, version);
+CREATE TABLE IF NOT EXISTS images (
+    household_id TEXT NOT NULL,
+    image_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    items TEXT NOT NULL,
+    PRIMARY KEY (household_id, image_id)
+);
+"""
+
+ITEM_COLUMNS = "name, version, count, confidence, source, category, impact, co2e_100g, penalty, swap, removed"
+
+
+@dataclass
+class StoredItem:
+    name: str
+    version: int
+    count: int
+    confidence: float
+    source: str  # "detected" or "manual"
+    category: Optional[str] = None
+    impact: Optional[str] = None
+    co2e_100g: Optional[float] = None
+    penalty: int = 0
+    swap: Optional[Dict[str, Any]] = None  # SwapSuggestion fields
+    removed: bool = False
+
+    @classmethod
+    def from_row(cls, row: Tuple) -> "StoredItem":
+        name, version, count, confidence, source, category, impact, co2e, penalty, swap, removed = row
+        return cls(name, version, count, confidence, source, category, impact, co2e, penalty,
+                   json.loads(swap) if swap else None, bool(removed))
+
+
+@dataclass
+class Household:
+    id: str
+    version: int = 0
+    penalty: int = 0
+    people: int = 2
+
+    @property
+    def score(self) -> int:
+        return max(100 - self.penalty, 0)
+
+
+class InventoryStore:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or INVENTORY_DB
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (and per process, after a fork)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # -- reads -------------------------------------------------------------
+
+    def household(self, household_id: str) -> Household:
+        row = self._conn().execute(
+            "SELECT version, penalty, people FROM households WHERE id = ?", (household_id,)
+        ).fetchone()
+        return Household(household_id, *row) if row else Household(household_id)
+
+    def items(self, household_id: str, since: Optional[int] = None) -> List[StoredItem]:
+        """Live items, or with `since` every item (removed included) changed after that version"""
+        if since is None:
+            sql, args = f"SELECT {ITEM_COLUMNS} FROM items WHERE household_id = ? AND removed = 0", (household_id,)
+        else:
+            sql, args = f"SELECT {ITEM_COLUMNS} FROM items WHERE household_id = ? AND version > ?", (household_id, since)
+        rows = self._conn().execute(sql + " ORDER BY version, rowid", args).fetchall()
+        return [StoredItem.from_row(r) for r in rows]
+
+    def new_images(self, household_id: str, image_ids: Iterable[str]) -> List[str]:
+        """The ids (in order, deduplicated) that have not been analyzed for this household yet"""
+        image_ids = list(dict.fromkeys(image_ids))
+        if not image_ids:
+            return []
+        seen = {
+            row[0] for row in self._conn().execute(
+                f"SELECT image_id FROM images WHERE household_id = ? AND image_id IN ({','.join('?' * len(image_ids))})",
+                (household_id, *image_ids),
+            )
+        }
+        return [i for i in image_ids if i not in seen]
+
+    # -- writes ------------------------------------------------------------
+
+    def apply(self, household_id: str, people: Optional[int] = None,
+              images: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+              upserts: Iterable[StoredItem] = (), removals: Iterable[str] = ()) -> Tuple[Household, List[str]]:
+        """
+        Merge analyzed images and item changes in one transaction.
+
+        New items (or removed ones coming back) are inserted with their plan
+        data and penalty; for items already live only count and confidence
+        are merged (max), so a re-photographed item is not double counted.
+        Returns the updated household and the names that changed.
+        """
+        with self._write() as conn:
+            row = conn.execute("SELECT version, penalty, people FROM households WHERE id = ?", (household_id,)).fetchone()
+            household = Household(household_id, *row) if row else Household(household_id)
+            version = household.version + 1
+            changed: List[str] = []
+
+            for image_id, image_items in (images or {}).items():
+                conn.execute(
+                    "INSERT OR IGNORE INTO images (household_id, image_id, version, items) VALUES (?, ?, ?, ?)",
+                    (household_id, image_id, version, json.dumps(image_items)),
+                )
+
+            for item in upserts:
+                current = conn.execute(
+                    f"SELECT {ITEM_COLUMNS} FROM items WHERE household_id = ? AND name = ?", (household_id, item.name)
+                ).fetchone()
+                current = StoredItem.from_row(current) if current else None
+                if current is None or current.removed:
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO items (household_id, {ITEM_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                        (household_id, item.name, version, item.count, item.confidence, item.source, item.category,
+                         item.impact, item.co2e_100g, item.penalty, json.dumps(item.swap) if item.swap else None),
+                    )
+                    household.penalty += item.penalty
+                    changed.append(item.name)
+                elif current.impact is None and item.impact is not None:
+                    # stored while the planner was down; fill in the plan data now
+                    conn.execute(
+                        "UPDATE items SET count = ?, confidence = ?, category = ?, impact = ?, co2e_100g = ?, "
+                        "penalty = ?, swap = ?, version = ? WHERE household_id = ? AND name = ?",
+                        (max(item.count, current.count), max(item.confidence, current.confidence), item.category,
+                         item.impact, item.co2e_100g, item.penalty, json.dumps(item.swap) if item.swap else None,
+                         version, household_id, item.name),
+                    )
+                    household.penalty += item.penalty - current.penalty
+                    changed.append(item.name)
+                elif item.count > current.count or item.confidence > current.confidence:
+                    conn.execute(
+                        "UPDATE items SET count = ?, confidence = ?, version = ? WHERE household_id = ? AND name = ?",
+                        (max(item.count, current.count), max(item.confidence, current.confidence), version,
+                         household_id, item.name),
+                    )
+                    changed.append(item.name)
+
+            for name in removals:
+                current = conn.execute(
+                    "SELECT penalty FROM items WHERE household_id = ? AND name = ? AND removed = 0", (household_id, name)
+                ).fetchone()
+                if current is not None:
+                    conn.execute(
+                        "UPDATE items SET removed = 1, version = ? WHERE household_id = ? AND name = ?",
+                        (version, household_id, name),
+                    )
+                    household.penalty -= current[0]
+                    changed.append(name)
+
+            if changed or images or (people is not None and people != household.people):
+                household.version = version
+                household.people = household.people if people is None else people
+                conn.execute(
+                    "INSERT INTO households (id, version, penalty, people, updated_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET version = excluded.version, penalty = excluded.penalty, "
+                    "people = excluded.people, updated_at = excluded.updated_at",
+                    (household_id, household.version, household.penalty, household.people, time.time()),
+                )
+            return household, changed
+
+
+# Global instance
+inventory_store = InventoryStore()
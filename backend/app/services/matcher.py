@@ -0,0 +1,186 @@
+import math
+import threading
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+TIERS = ("exact", "ngram", "embedding", "none")
+
+MATCHER_ANSWERS = registry.counter(
+    "smart_fridge_matcher_answers_total", "Name lookups by matcher and answering tier"
+)
+
+# (queries) -> [(target or None, score)] for the expensive last tier
+EmbedLookup = Callable[[List[str]], List[Tuple[Optional[str], float]]]
+
+@dataclass
+class MatchResult:
+    query: str
+    target: Optional[str]
+    score: float
+    tier: str
+
+def _ngrams(text: str, n: int = 3) -> List[str]:
+    padded = f" {text} "
+    return list({padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))})
+
+class TieredMatcher:
+    """
+    Name resolution in cost order.
+
+    1. exact: hash lookup of the normalised query in `vocabulary`
+    2. ngram: cosine similarity of character trigram TF-IDF vectors against
+       every vocabulary term; accepted at or above `ngram_threshold`
+    3. embedding: `embed_lookup` (e.g. a sentence-transformer) for whatever
+       the cheap tiers could not place, accepted at `embed_threshold`
+
+    `vocabulary` maps surface terms (aliases, dataset names) to targets.
+    The tier that answered each query is counted in `stats`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        vocabulary: Dict[str, str],
+        embed_lookup: Optional[EmbedLookup] = None,
+        ngram_threshold: float = 0.75,
+        embed_threshold: float = 0.6,
+    ):
+        self.name = name
+        self.exact = {self.normalize(k): v for k, v in vocabulary.items()}
+        self.embed_lookup = embed_lookup
+        self.ngram_threshold = ngram_threshold
+        self.embed_threshold = embed_threshold
+        self._stats = {tier: 0 for tier in TIERS}
+        self._lock = threading.Lock()
+        self._build_ngram_index()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.lower().replace("origin unknown", "").split())
+
+    def _build_ngram_index(self) -> None:
+        self._terms = list(self.exact)
+        self._targets = [self.exact[t] for t in self._terms]
+        grams_per_term = [_ngrams(t) for t in self._terms]
+
+        self._gram_col: Dict[str, int] = {}
+        for grams in grams_per_term:
+            for g in grams:
+                self._gram_col.setdefault(g, len(self._gram_col))
+
+        df = np.zeros(len(self._gram_col))
+        for grams in grams_per_term:
+            for g in grams:
+                df[self._gram_col[g]] += 1
+        n = max(len(self._terms), 1)
+        self._idf = np.log((1 + n) / (1 + df)) + 1
+        self._unseen_idf = math.log(1 + n) + 1
+
+        matrix = np.zeros((len(self._terms), len(self._gram_col)), dtype=np.float32)
+        for row, grams in enumerate(grams_per_term):
+            cols = [self._gram_col[g] for g in grams]
+            matrix[row, cols] = self._idf[cols]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self._matrix = matrix / np.where(norms == 0, 1, norms)
+
+    def _ngram_best(self, query: str) -> Tuple[Optional[str], float]:
+        if not self._terms:
+            return None, 0.0
+        cols, weights, unseen = [], [], 0
+        for g in _ngrams(query):
+            col = self._gram_col.get(g)
+            if col is None:
+                unseen += 1
+            else:
+                cols.append(col)
+                weights.append(self._idf[col])
+        if not cols:
+            return None, 0.0
+        weights = np.array(weights, dtype=np.float32)
+        norm = math.sqrt(float(weights @ weights) + unseen * self._unseen_idf ** 2)
+        scores = self._matrix[:, cols] @ weights / norm
+        best = int(scores.argmax())
+        return self._targets[best], float(scores[best])
+
+    def _count(self, tier: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[tier] += n
+        MATCHER_ANSWERS.inc(n, matcher=self.name, tier=tier)
+
+    def match(self, query: str, use_embedding: bool = True) -> MatchResult:
+        return self.match_many([query], use_embedding=use_embedding)[0]
+
+    def match_many(self, queries: Sequence[str], use_embedding: bool = True) -> List[MatchResult]:
+        """Resolve many queries; the embedding tier runs once for all leftovers"""
+        results: List[Optional[MatchResult]] = [None] * len(queries)
+        pending: List[int] = []
+        for i, query in enumerate(queries):
+            q = self.normalize(query)
+            target = self.exact.get(q)
+            if target is not None:
+                results[i] = MatchResult(query, target, 1.0, "exact")
+                continue
+            target, score = self._ngram_best(q)
+            if target is not None and score >= self.ngram_threshold:
+                results[i] = MatchResult(query, target, score, "ngram")
+                continue
+            pending.append(i)
+
+        if pending and use_embedding and self.embed_lookup is not None:
+            found = self.embed_lookup([self.normalize(queries[i]) for i in pending])
+            still = []
+            for i, (target, score) in zip(pending, found):
+                if target is not None and score >= self.embed_threshold:
+                    results[i] = MatchResult(queries[i], target, score, "embedding")
+                else:
+                    still.append(i)
+            pending = still
+
+        for i in pending:
+            results[i] = MatchResult(queries[i], None, 0.0, "none")
+        for tier in TIERS:
+            n = sum(1 for r in results if r.tier == tier)
+            if n:
+                self._count(tier, n)
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+def _singular(term: str) -> str:
+    if term.endswith("oes") or term.endswith("ches"):
+        return term[:-2]
+    if term.endswith("s") and not term.endswith("ss"):
+        return term[:-1]
+    return term
+
+def carbon_vocabulary(keys: Sequence[str], aliases: Dict[str, List[str]]) -> Dict[str, str]:
+    """
+    Surface terms for the carbon table: every key, its head term ("carrot"
+    for "carrot, raw") in singular and plural form, and every ingredient
+    alias whose canonical name matches a head term.
+    """
+    vocab: Dict[str, str] = {}
+    heads: Dict[str, str] = {}
+    for key in keys:
+        vocab[key] = key
+        head = key.split(",")[0].strip()
+        for form in (head, _singular(head)):
+            heads.setdefault(form, key)
+    for form, key in heads.items():
+        vocab.setdefault(form, key)
+        vocab.setdefault(form + "s", key)
+
+    for canonical, names in aliases.items():
+        key = heads.get(canonical) or heads.get(_singular(canonical))
+        if key is None:
+            continue
+        for name in [canonical] + list(names):
+            vocab.setdefault(name.lower(), key)
+    return vocab
@@ -2,8 +2,9 @@ import json
 import os
 import logging
 from typing import List, Dict, Optional, Tuple
-from rapidfuzz import fuzz, process
+from rapidfuzz import fuzz
 from dataclasses import dataclass
+from app.services.matcher import TieredMatcher
 
 logger = logging.getLogger(__name__)
 
@@ -16,13 +17,25 @@ class NormalizedItem:
 
 class FoodNormalizer:
     def __init__(self, aliases_file_path: str = None):
+        bundle = None
         if aliases_file_path is None:
+            from app.services.data_bundle import get_bundle
+            bundle = get_bundle()
             # Default path relative to this file
             current_dir = os.path.dirname(os.path.abspath(__file__))
             aliases_file_path = os.path.join(current_dir, "../../../data/ingredient_aliases.json")
         
-        self.aliases = self._load_aliases(aliases_file_path)
+        self.aliases = bundle.aliases if bundle is not None else self._load_aliases(aliases_file_path)
         self.canonical_items = list(self.aliases.keys())
+        self.matcher = TieredMatcher("alias", self._alias_vocabulary())
+
+    def _alias_vocabulary(self) -> Dict[str, str]:
+        """alias -> canonical; the first canonical listing an alias wins"""
+        vocab = {}
+        for canonical, aliases in self.aliases.items():
+            for alias in [canonical] + aliases:
+                vocab.setdefault(alias.lower(), canonical)
+        return vocab
     
     def _load_aliases(self, file_path: str) -> Dict[str, List[str]]:
         """Load ingredient aliases from JSON file"""
@@ -99,33 +112,22 @@ class FoodNormalizer:
         """
         raw_name = raw_name.lower().strip()
         
-        # First try exact match in aliases
-        for canonical, aliases in self.aliases.items():
-            if raw_name in aliases:
-                return NormalizedItem(
-                    canonical_name=canonical,
-                    raw_name=raw_name,
-                    confidence=confidence,
-                    count=count
-                )
-        
-        # Try fuzzy matching with high threshold
-        best_match = process.extractOne(
-            raw_name,
-            self.canonical_items,
-            scorer=fuzz.token_sort_ratio,
-            score_cutoff=75  # Require 75% similarity
-        )
+        # Exact alias hash lookup, then character n-gram similarity
+        match = self.matcher.match(raw_name, use_embedding=False)
+        if match.tier == "exact":
+            return NormalizedItem(
+                canonical_name=match.target,
+                raw_name=raw_name,
+                confidence=confidence,
+                count=count
+            )
         
-        if best_match:
-            canonical_name, score, _ = best_match
-            # Adjust confidence based on fuzzy match quality
-            adjusted_confidence = confidence * (score / 100.0)
-            
+        if match.tier == "ngram":
+            # Adjust confidence based on match quality
             return NormalizedItem(
-                canonical_name=canonical_name,
+                canonical_name=match.target,
                 raw_name=raw_name,
-                confidence=adjusted_confidence,
+                confidence=confidence * match.score,
                 count=count
             )
         
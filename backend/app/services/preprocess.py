@@ -0,0 +1,159 @@
+"""
+Image downscaling before detection.
+
+Phone photos arrive at 4-12 MB, but Rekognition finds fridge labels just as
+well at ~1600px. `ImagePreprocessor.process` decodes each image, applies its
+EXIF orientation, shrinks it so the longer side is at most IMAGE_MAX_DIM and
+re-encodes it as JPEG at IMAGE_JPEG_QUALITY. Decoding and resampling run in a
+process pool, so they never hold the GIL on the event loop or request
+threads. The bytes saved and the CPU time spent on each image are logged and
+exported as metrics.
+
+Pillow is optional. Without it (or with IMAGE_PREPROCESS=0), images pass
+through unchanged.
+"""
+import asyncio
+import importlib.util
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from app.utils.metrics import registry, FALLBACKS
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MAX_DIM = int(os.getenv("IMAGE_MAX_DIM", "1600"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_PREPROCESS_WORKERS = int(os.getenv("IMAGE_PREPROCESS_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+IMAGE_BYTES_SAVED = registry.counter(
+    "smart_fridge_image_bytes_saved_total", "Bytes removed from images by downscaling before detection"
+)
+IMAGE_PREPROCESS_CPU = registry.histogram(
+    "smart_fridge_image_preprocess_cpu_seconds", "CPU time to decode, resize and re-encode one image"
+)
+
+
+@dataclass
+class PreprocessedImage:
+    name: str
+    data: bytes
+    original_bytes: int
+    width: int = 0
+    height: int = 0
+    cpu_seconds: float = 0.0
+    resized: bool = False
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - len(self.data)
+
+
+def downscale(data: bytes, max_dim: int, quality: int) -> Tuple[bytes, Dict[str, Any]]:
+    """Decode, orient, resize and re-encode one image; runs in a pool process"""
+    cpu = time.process_time()
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as img:
+        original_size = img.size
+        # JPEG decoders can scale by 1/2..1/8 while decoding, far cheaper than resampling
+        img.draft("RGB", (max_dim, max_dim))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.thumbnail((max_dim, max_dim), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=quality, optimize=True)
+        size = img.size
+
+    encoded = out.getvalue()
+    resized = max(original_size) > max_dim
+    if not resized and len(encoded) >= len(data):
+        # already small enough; re-encoding would only cost quality
+        encoded, size = data, original_size
+    return encoded, {
+        "width": size[0],
+        "height": size[1],
+        "resized": resized,
+        "cpu_seconds": time.process_time() - cpu,
+    }
+
+
+class ImagePreprocessor:
+    def __init__(self, max_dim: int = IMAGE_MAX_DIM, quality: int = IMAGE_JPEG_QUALITY,
+                 workers: int = IMAGE_PREPROCESS_WORKERS, enabled: Optional[bool] = None):
+        self.max_dim = max_dim
+        self.quality = quality
+        self.workers = workers
+        self.enabled = os.getenv("IMAGE_PREPROCESS", "1") == "1" if enabled is None else enabled
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._warned = False
+
+    @property
+    def available(self) -> bool:
+        if not self.enabled:
+            return False
+        if importlib.util.find_spec("PIL") is None:
+            if not self._warned:
+                logger.warning("Pillow is not installed; images are sent to Rekognition as uploaded")
+                self._warned = True
+            return False
+        return True
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs the event loop and thread pools is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    async def process(self, images: List[Tuple[str, bytes]]) -> List[PreprocessedImage]:
+        """Downscale [(name, data)] concurrently in the pool; failures fall back to the original bytes"""
+        if not self.available:
+            return [PreprocessedImage(name, data, len(data)) for name, data in images]
+
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(pool, downscale, data, self.max_dim, self.quality) for _, data in images),
+            return_exceptions=True,
+        )
+
+        processed = []
+        for (name, data), result in zip(images, results):
+            if isinstance(result, BaseException):
+                if isinstance(result, BrokenProcessPool):
+                    self.shutdown()
+                logger.warning(f"Preprocessing {name} failed, sending the original: {result}")
+                FALLBACKS.inc(component="preprocess")
+                processed.append(PreprocessedImage(name, data, len(data)))
+                continue
+            encoded, info = result
+            image = PreprocessedImage(name, encoded, len(data), **info)
+            IMAGE_BYTES_SAVED.inc(image.bytes_saved)
+            IMAGE_PREPROCESS_CPU.observe(image.cpu_seconds)
+            logger.info(
+                f"Preprocessed {name}: {image.original_bytes} -> {len(encoded)} bytes "
+                f"({image.width}x{image.height}), {image.cpu_seconds * 1000:.1f} ms CPU"
+            )
+            processed.append(image)
+        return processed
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Global instance
+image_preprocessor = ImagePreprocessor()
@@ -0,0 +1,144 @@
+import json
+import os
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from app.shared.models.recipe import Recipe
+
+logger = logging.getLogger(__name__)
+
+# Items recipes may use on top of the pantry (mirrors the LLM prompt)
+STAPLES = {"water", "salt", "pepper", "black pepper", "oil", "olive oil", "vegetable oil"}
+
+@dataclass
+class CuratedMatch:
+    recipe: Recipe
+    coverage: float        # share of the recipe's ingredients the pantry has
+    missing: List[str]     # canonical ingredients the pantry lacks
+
+class RecipeIndex:
+    """
+    Local curated recipe corpus with an inverted ingredient index.
+
+    Ingredients are mapped to canonical names (via the alias table) and
+    given a bit position; every recipe keeps a bitmask of what it needs and
+    every ingredient keeps a bitmask of the recipes using it. A pantry query
+    is then a handful of integer ANDs/ORs and popcounts.
+    """
+
+    def __init__(self, corpus_path: str = None, aliases: Dict[str, List[str]] = None):
+        if corpus_path is None:
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            corpus_path = os.path.join(current_dir, "../../../data/curated_recipes.json")
+        if aliases is None:
+            from app.services.normalize import food_normalizer
+            aliases = food_normalizer.aliases
+
+        # alias -> canonical; canonical names win over aliases they share
+        self._canonical: Dict[str, str] = {}
+        for canonical, names in aliases.items():
+            for name in names:
+                self._canonical.setdefault(name.lower(), canonical)
+        for canonical in aliases:
+            self._canonical[canonical.lower()] = canonical
+
+        self.recipes: List[Recipe] = []
+        self._flags: List[frozenset] = []
+        self._carbon: List[float] = []
+        self._bit: Dict[str, int] = {}        # ingredient -> bit position
+        self._names: List[str] = []           # bit position -> ingredient
+        self._needs: List[int] = []           # recipe -> ingredient bitmask
+        self._postings: Dict[int, int] = {}   # ingredient bit -> recipe bitmask
+
+        for entry in self._load(corpus_path):
+            self._add(entry)
+        logger.info(f"Curated recipe index loaded {len(self.recipes)} recipes")
+
+    def _load(self, path: str) -> List[dict]:
+        """Load the corpus from a JSON list or a JSONL file"""
+        try:
+            with open(path, "r") as f:
+                if path.endswith(".jsonl"):
+                    return [json.loads(line) for line in f if line.strip()]
+                return json.load(f)
+        except FileNotFoundError:
+            logger.warning(f"Curated recipe corpus not found at {path}, index is empty")
+            return []
+
+    def canonical(self, name: str) -> str:
+        name = name.lower().strip()
+        return self._canonical.get(name, name)
+
+    def _add(self, entry: dict) -> None:
+        recipe = Recipe(**entry)
+        i = len(self.recipes)
+        mask = 0
+        for ing in recipe.ingredients:
+            name = self.canonical(ing.name)
+            if name in STAPLES:
+                continue
+            if name not in self._bit:
+                self._bit[name] = len(self._names)
+                self._names.append(name)
+            bit = self._bit[name]
+            mask |= 1 << bit
+            self._postings[bit] = self._postings.get(bit, 0) | (1 << i)
+
+        notes = recipe.sustainability_notes
+        self.recipes.append(recipe)
+        self._needs.append(mask)
+        self._flags.append(frozenset(f.lower() for f in entry.get("flags", [])))
+        self._carbon.append(notes.carbon_score_0_100 if notes and notes.carbon_score_0_100 is not None else 50.0)
+
+    def _pantry_mask(self, pantry: List[str]) -> int:
+        mask = 0
+        for name in pantry:
+            bit = self._bit.get(self.canonical(name))
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def search(
+        self,
+        pantry: List[str],
+        flags: Optional[List[str]] = None,
+        limit: int = 3,
+        min_coverage: float = 1.0,
+    ) -> List[CuratedMatch]:
+        """
+        Rank recipes by pantry coverage, then by carbon score (greener first).
+
+        Only recipes sharing at least one ingredient with the pantry are
+        considered, and every requested flag must be present on the recipe.
+        """
+        have = self._pantry_mask(pantry)
+        candidates = 0
+        rest = have
+        while rest:
+            low = rest & -rest
+            candidates |= self._postings.get(low.bit_length() - 1, 0)
+            rest ^= low
+
+        wanted = frozenset(f.lower() for f in (flags or []))
+        ranked = []
+        while candidates:
+            low = candidates & -candidates
+            i = low.bit_length() - 1
+            candidates ^= low
+            if not wanted <= self._flags[i]:
+                continue
+            need = self._needs[i]
+            coverage = (need & have).bit_count() / need.bit_count()
+            if coverage >= min_coverage:
+                ranked.append((coverage, self._carbon[i], i))
+
+        ranked.sort(key=lambda t: (-t[0], -t[1], t[2]))
+        out = []
+        for coverage, _, i in ranked[:limit]:
+            missing_mask = self._needs[i] & ~have
+            missing = [self._names[b] for b in range(missing_mask.bit_length()) if missing_mask >> b & 1]
+            out.append(CuratedMatch(recipe=self.recipes[i], coverage=coverage, missing=missing))
+        return out
+
+# Global instance
+recipe_index = RecipeIndex()
@@ -1,34 +1,142 @@
-import hashlib, json, os, time
-from typing import List
+import contextvars, hashlib, json, os, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Tuple
 from app.shared.models.recipe import Recipe
 from app.shared.models.recipe import Ingredient, Step
 from app.shared.models.recipe import SustainabilityNotes
 from app.shared.models.recipe import Swap
 from app.shared.models.recipe import LLMContext
-from openai import OpenAI  # pip install openai
+from app.services.recipe_index import recipe_index, STAPLES
+from app.utils.metrics import stage, RECIPE_SOURCES
+from app.utils.resilience import dependency
+from app.utils.deadline import degrade, expired, has_budget, remaining
+if TYPE_CHECKING:
+    from openai import OpenAI  # pip install openai
 
 _CACHE = {}  # key -> (ts, [Recipe])
 
+# Near-match index over cached LLM answers:
+#   _NEAR_ENTRIES: key -> (ingredients used, flags, people)
+#   _NEAR_BY_INGREDIENT: ingredient -> {keys whose recipes use it}
+_NEAR_ENTRIES = {}
+_NEAR_BY_INGREDIENT = {}
+
+# Fully covered curated recipes needed to skip the LLM entirely
+CURATED_MIN_MATCHES = int(os.getenv("CURATED_MIN_MATCHES", "2"))
+
 def _cache_get(k: str):
     ts_rec = _CACHE.get(k)
     if not ts_rec: return None
     ts, recipes = ts_rec
     if time.time() - ts > TTL_SECONDS:
         _CACHE.pop(k, None)
+        _near_drop(k)
         return None
     return recipes
 
-def _cache_set(k: str, recipes: List[Recipe]):
+def _cache_set(k: str, recipes: List[Recipe], ctx: LLMContext = None):
     _CACHE[k] = (time.time(), recipes)
+    if ctx is not None:
+        _near_add(k, ctx, recipes)
 
 
 def _cache_clear() -> None:
     """Clear the in-memory recipe cache."""
     _CACHE.clear()
+    _NEAR_ENTRIES.clear()
+    _NEAR_BY_INGREDIENT.clear()
+
+def _norm(name: str) -> str:
+    return name.lower().strip()
+
+def _near_add(k: str, ctx: LLMContext, recipes: List[Recipe]) -> None:
+    """Index a cached answer by the (non-staple) ingredients its recipes use."""
+    used = frozenset(
+        _norm(ing.name) for r in recipes for ing in r.ingredients
+    ) - STAPLES
+    if not used:
+        return
+    _near_drop(k)
+    flags = frozenset(_norm(f) for f in (ctx.flags or []))
+    _NEAR_ENTRIES[k] = (used, flags, ctx.people)
+    for ing in used:
+        _NEAR_BY_INGREDIENT.setdefault(ing, set()).add(k)
+
+def _near_drop(k: str) -> None:
+    entry = _NEAR_ENTRIES.pop(k, None)
+    if entry is None:
+        return
+    for ing in entry[0]:
+        keys = _NEAR_BY_INGREDIENT.get(ing)
+        if keys is not None:
+            keys.discard(k)
+            if not keys:
+                _NEAR_BY_INGREDIENT.pop(ing, None)
+
+def _rescale(recipe: Recipe, people: int, source: str = "near-cache") -> Recipe:
+    factor = people / recipe.servings
+    ingredients = [
+        ing if ing.quantity is None
+        else ing.model_copy(update={"quantity": round(ing.quantity * factor, 2)})
+        for ing in recipe.ingredients
+    ]
+    return recipe.model_copy(update={
+        "servings": people,
+        "ingredients": ingredients,
+        "source": source,
+    })
+
+def _near_cache_get(ctx: LLMContext):
+    """
+    Find a cached answer whose recipes only use ingredients this pantry has.
+
+    Cached flags must include every requested flag (a "vegan" answer is fine
+    for a request without flags, not the other way round). Among candidates
+    the one covering the most ingredients wins. Servings are rescaled to
+    `ctx.people` and the recipes are marked with source="near-cache".
+    """
+    pantry = {_norm(x) for x in ctx.pantry}
+    flags = {_norm(f) for f in (ctx.flags or [])}
+
+    # count, per cached entry, how many of its ingredients the pantry covers
+    covered = {}
+    for ing in pantry:
+        for k in _NEAR_BY_INGREDIENT.get(ing, ()):
+            covered[k] = covered.get(k, 0) + 1
+
+    best, best_size = None, 0
+    for k, n in covered.items():
+        used, cached_flags, _ = _NEAR_ENTRIES[k]
+        if n == len(used) and flags <= cached_flags and n > best_size:
+            # expired entries are evicted here, so a smaller live one can still win
+            recipes = _cache_get(k)
+            if recipes is not None:
+                best, best_size = recipes, n
+    if best is None:
+        return None
+    return [_rescale(r, ctx.people) for r in best]
 
 TTL_SECONDS = 1800  # 30 min
 
-def _build_prompt(ctx: LLMContext) -> str:
+# parallel completions run here rather than on the hedge pool, which
+# OPENAI.call uses for its own duplicate attempts
+_llm_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_PARALLEL_THREADS", "16")), thread_name_prefix="llm"
+)
+
+# LLM_PARALLEL_RECIPES > 1 asks that many concurrent completions for one
+# recipe each (steered apart by these hints) instead of one for up to three
+LLM_PARALLEL_RECIPES = int(os.getenv("LLM_PARALLEL_RECIPES", "0"))
+DIVERSITY_HINTS = [
+    "a quick stovetop or one-pan dish",
+    "a soup, stew or curry",
+    "a salad, bowl or other no-cook dish",
+    "a baked or roasted dish",
+    "a breakfast or brunch dish",
+]
+
+def _build_prompt(ctx: LLMContext, hint: str = None) -> str:
+    count = f"Exactly 1 recipe, {hint}." if hint else "Max 3 recipes."
     return f"""
 You are a sustainability-aware chef.
 Use ONLY these pantry items (plus water/salt/pepper/oil): {ctx.pantry}
@@ -48,12 +156,37 @@ Return STRICT JSON ONLY:
    }}
  ]
 }}
-No extra text. No markdown. Max 3 recipes. Steps <= 8.
+No extra text. No markdown. {count} Steps <= 8.
 """.strip()
 
-def _call_llm_strict_json(ctx):
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    prompt = _build_prompt(ctx)
+_CLIENTS = {}  # (api key, base url) -> OpenAI
+
+# hedging + circuit breaker for completions (OPENAI_HEDGE_*, OPENAI_BREAKER_*)
+OPENAI = dependency("openai", hedge_min_delay=2.0)
+
+# the LLM is only tried when the request deadline leaves at least this much
+# (or the recent median completion time, if longer)
+LLM_MIN_BUDGET = float(os.getenv("LLM_MIN_BUDGET", "1.5"))
+
+def _openai_client() -> "OpenAI":
+    """
+    Shared client, so completions reuse pooled connections. OPENAI_BASE_URL
+    points it at any OpenAI-compatible server (e.g. benchmarks.stub_server).
+    """
+    k = (os.getenv("OPENAI_API_KEY"), os.getenv("OPENAI_BASE_URL"))
+    client = _CLIENTS.get(k)
+    if client is None:
+        from openai import OpenAI  # imported on first use; it is slow to import
+        client = _CLIENTS[k] = OpenAI(api_key=k[0], base_url=k[1])
+    return client
+
+def _call_llm_strict_json(ctx, hint: str = None):
+    client = _openai_client()
+    left = remaining()
+    if left is not None:
+        # one attempt, bounded by the request deadline
+        client = client.with_options(timeout=max(left, 0.1), max_retries=0)
+    prompt = _build_prompt(ctx, hint)
     resp = client.chat.completions.create(
         model="gpt-4o-mini",
         messages=[
@@ -65,6 +198,146 @@ def _call_llm_strict_json(ctx):
     )
     return resp.choices[0].message.content
 
+def _stream_llm_chunks(ctx: LLMContext) -> Iterator[str]:
+    """Yield content deltas of a streamed completion for the recipe prompt."""
+    client = _openai_client()
+    prompt = _build_prompt(ctx)
+    stream = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "You are a sustainability-minded chef that always replies with strict JSON recipes."},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=0.7,
+        response_format={"type": "json_object"},
+        stream=True,
+    )
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+class _RecipeStreamParser:
+    """
+    Incremental scanner for the streamed `{"recipes": [...]}` reply.
+
+    Text is fed in arbitrary chunks; every object that closes directly inside
+    the recipes array is returned from `feed` as soon as its closing brace
+    arrives, so callers never wait for the rest of the document.
+    """
+
+    def __init__(self):
+        self._stack: List[str] = []  # open containers: "{" or "["
+        self._in_str = False
+        self._escape = False
+        self._capture: List[str] = []
+        self._capturing = False
+
+    def _is_item_parent(self) -> bool:
+        # recipes live in an array that is either the document itself or a
+        # value of the top-level object
+        return self._stack in (["["], ["{", "["])
+
+    def feed(self, text: str) -> List[dict]:
+        done = []
+        for ch in text:
+            if self._capturing:
+                self._capture.append(ch)
+
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_str = False
+                continue
+
+            if ch == '"':
+                self._in_str = True
+            elif ch in "{[":
+                if ch == "{" and not self._capturing and self._is_item_parent():
+                    self._capturing = True
+                    self._capture = [ch]
+                self._stack.append(ch)
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if ch == "}" and self._capturing and self._is_item_parent():
+                    self._capturing = False
+                    done.append(json.loads("".join(self._capture)))
+                    self._capture = []
+        return done
+
+
+def _iter_stream_recipes(chunks) -> Iterator[Recipe]:
+    """Parse streamed chunks and validate each recipe as soon as it closes."""
+    parser = _RecipeStreamParser()
+    for chunk in chunks:
+        for obj in parser.feed(chunk):
+            try:
+                yield Recipe(**obj)
+            except Exception as e:
+                # one malformed recipe should not cost us the others
+                print("recipes_llm: skipping invalid streamed recipe:", repr(e))
+
+def _valid_recipes(raw: str) -> List[Recipe]:
+    """Recipes in one completion's reply; invalid entries are skipped"""
+    out = []
+    for obj in json.loads(raw).get("recipes", []):
+        try:
+            out.append(Recipe(**obj))
+        except Exception as e:
+            print("recipes_llm: skipping invalid recipe:", repr(e))
+    return out
+
+def _merge_recipes(batches: Iterable[List[Recipe]]) -> List[Recipe]:
+    """Concatenate recipes from several completions, dropping repeated titles or ingredient sets."""
+    titles, ingredient_sets, ids = set(), set(), set()
+    out = []
+    for recipes in batches:
+        for r in recipes:
+            title = " ".join(_norm(r.title).split())
+            ingredients = frozenset(_norm(ing.name) for ing in r.ingredients)
+            if title in titles or ingredients in ingredient_sets:
+                continue
+            titles.add(title)
+            ingredient_sets.add(ingredients)
+            if r.id in ids:
+                # independent completions often reuse the example id
+                r = r.model_copy(update={"id": f"{r.id}-{len(out) + 1}"})
+            ids.add(r.id)
+            out.append(r)
+    return out
+
+def _generate_parallel(ctx: LLMContext, n: int) -> Tuple[List[Recipe], int]:
+    """
+    Ask up to `n` concurrent completions for one recipe each, one diversity
+    hint apiece, validate each reply on its own and merge them. Returns the
+    recipes and how many completions failed; raises only if none produced
+    a valid recipe.
+    """
+    def one(hint: str) -> List[Recipe]:
+        return _valid_recipes(OPENAI.call(lambda: _call_llm_strict_json(ctx, hint)))
+
+    futures = [
+        _llm_executor.submit(contextvars.copy_context().run, one, hint) for hint in DIVERSITY_HINTS[:n]
+    ]
+    batches, error = [], None
+    for future in futures:
+        try:
+            batches.append(future.result())
+        except Exception as e:
+            print("recipes_llm: parallel completion failed:", repr(e))
+            error = e
+    out = _merge_recipes(batches)
+    if not out:
+        raise error or ValueError("no valid recipe in any completion")
+    return out, len(futures) - len(batches)
+
 def _key(ctx: LLMContext) -> str:
     norm = {
         "pantry": sorted([x.lower() for x in ctx.pantry]),
@@ -88,35 +361,143 @@ def _fallback(ctx: LLMContext) -> List[Recipe]:
     return [base, base.model_copy(update={"id": base.id.replace("-1","-2"), "title":"Quick Skillet"}),
             base.model_copy(update={"id": base.id.replace("-1","-3"), "title":"Hearty Stir-fry"})]
 
+def _curated(ctx: LLMContext) -> List[Recipe]:
+    """Curated recipes fully covered by the pantry, scaled to `ctx.people`."""
+    matches = recipe_index.search(ctx.pantry, flags=ctx.flags, limit=3)
+    return [_rescale(m.recipe, ctx.people, source="curated") for m in matches]
+
+def _lookup_cache(k: str):
+    with stage("recipe_cache", cache="exact") as s:
+        hit = _cache_get(k)
+        s.labels["result"] = "miss" if hit is None else "hit"
+    return hit
+
+def _lookup_near_cache(ctx: LLMContext):
+    with stage("recipe_cache", cache="near") as s:
+        near = _near_cache_get(ctx)
+        s.labels["result"] = "miss" if near is None else "hit"
+    return near
+
+class _OutOfBudget(Exception):
+    """Not enough of the request deadline left to call the LLM"""
+
+def _answered(source: str, out: List[Recipe]) -> List[Recipe]:
+    RECIPE_SOURCES.inc(source=source)
+    return out
+
 def generate(ctx: LLMContext, demo: bool = False) -> List[Recipe]:
     k = _key(ctx)
-    hit = _cache_get(k)
+    hit = _lookup_cache(k)
     if hit is not None:
-        return hit
+        return _answered("cache", hit)
 
     if demo:
-        from pathlib import Path
-        APP_DIR = Path(__file__).resolve().parents[1]  # backend/app
-        data = json.loads((APP_DIR / "dev" / "fixtures" / "recipe_demo.json").read_text())
-        out = [Recipe(**data)]
-        _cache_set(k, out)
-        return out
+        from app.utils.demo import demo_recipe
+        # a copy: the cached payload is shared with GET /recipes
+        return _answered("demo", [demo_recipe.get().value.model_copy(deep=True)])
+
+    near = _lookup_near_cache(ctx)
+    if near is not None:
+        print("recipes_llm: reused near-match cache entry")
+        _cache_set(k, near)
+        return _answered("near-cache", near)
+
+    curated = _curated(ctx)
+    if len(curated) >= CURATED_MIN_MATCHES:
+        print("recipes_llm: used curated index")
+        _cache_set(k, curated)
+        return _answered("curated", curated)
 
     try:
         if not os.getenv("OPENAI_API_KEY"):
             print("recipes_llm: no OPENAI_API_KEY, using fallback")
             raise RuntimeError("no OPENAI_API_KEY")
 
-        raw = _call_llm_strict_json(ctx)
-        obj = json.loads(raw)
-        out = [Recipe(**r) for r in obj["recipes"]]
-        _cache_set(k, out)
+        needed = LLM_MIN_BUDGET
+        if len(OPENAI.latency):
+            needed = max(needed, OPENAI.latency.quantile(0.5))
+        if not has_budget(needed):
+            raise _OutOfBudget("llm skipped, out of time budget")
+
+        with stage("llm") as s:
+            s.labels["outcome"] = "error"
+            if LLM_PARALLEL_RECIPES > 1:
+                out, failed = _generate_parallel(ctx, LLM_PARALLEL_RECIPES)
+            else:
+                raw = OPENAI.call(lambda: _call_llm_strict_json(ctx))
+                obj = json.loads(raw)
+                out, failed = [Recipe(**r) for r in obj["recipes"]], 0
+            s.labels["outcome"] = "partial" if failed else "ok"
+        if failed:
+            # some completions failed; serve the rest, but don't cache a partial answer
+            print(f"recipes_llm: used LLM path, {failed} parallel completions failed")
+            return _answered("llm-partial", out)
+        _cache_set(k, out, ctx)
         print("recipes_llm: used LLM path")
-        return out
+        return _answered("llm", out)
     except Exception as e:
         print("recipes_llm: falling back due to:", repr(e))
-        out = _fallback(ctx)
+        out = curated or _fallback(ctx)
+        if isinstance(e, _OutOfBudget) or expired():
+            degrade("recipes", str(e) if isinstance(e, _OutOfBudget) else "llm timed out")
+            # a deadline miss says nothing about this pantry; let the next request try the LLM
+            return _answered("curated" if curated else "fallback", out)
         _cache_set(k, out)
-        return out
+        return _answered("curated" if curated else "fallback", out)
 
+def generate_stream(ctx: LLMContext, demo: bool = False) -> Iterator[Recipe]:
+    """
+    Streaming variant of `generate`: yields each recipe as soon as the model
+    finishes writing it. Cache, demo and fallback behave like `generate`.
+    """
+    k = _key(ctx)
+    hit = _lookup_cache(k)
+    if hit is not None:
+        yield from _answered("cache", hit)
+        return
+
+    if demo:
+        yield from generate(ctx, demo=True)
+        return
 
+    near = _lookup_near_cache(ctx)
+    if near is not None:
+        _cache_set(k, near)
+        yield from _answered("near-cache", near)
+        return
+
+    curated = _curated(ctx)
+    if len(curated) >= CURATED_MIN_MATCHES:
+        _cache_set(k, curated)
+        yield from _answered("curated", curated)
+        return
+
+    if not os.getenv("OPENAI_API_KEY"):
+        yield from generate(ctx)
+        return
+
+    out: List[Recipe] = []
+    try:
+        with stage("llm", mode="stream") as s:
+            s.labels["outcome"] = "error"
+            with OPENAI.guard():
+                for recipe in _iter_stream_recipes(_stream_llm_chunks(ctx)):
+                    out.append(recipe)
+                    yield recipe
+            s.labels["outcome"] = "ok" if out else "empty"
+    except Exception as e:
+        print("recipes_llm: stream interrupted:", repr(e))
+        if out:
+            # the client already has these; don't cache a partial answer
+            RECIPE_SOURCES.inc(source="llm-partial")
+            return
+
+    if not out:
+        print("recipes_llm: stream produced no recipes, using fallback")
+        out = curated or _fallback(ctx)
+        yield from _answered("curated" if curated else "fallback", out)
+        _cache_set(k, out)
+    else:
+        print("recipes_llm: used LLM streaming path")
+        RECIPE_SOURCES.inc(source="llm")
+        _cache_set(k, out, ctx)
@@ -1,14 +1,26 @@
-import boto3
 import asyncio
+import os
 import time
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 import logging
 from botocore.exceptions import ClientError, BotoCoreError
 import json
+from app.utils.metrics import stage
+from app.utils.resilience import dependency, is_failure
+from app.utils.deadline import degrade, has_budget, remaining
 
 logger = logging.getLogger(__name__)
 
+# hedging + circuit breaker for detect_labels (REKOGNITION_HEDGE_*, REKOGNITION_BREAKER_*)
+REKOGNITION = dependency("rekognition", hedge_min_delay=0.25)
+
+# seconds of the request deadline left for planning and recipes after detection
+DETECTION_RESERVE = float(os.getenv("REKOGNITION_DEADLINE_RESERVE", "2.0"))
+# share of the remaining budget detection always gets, even when the
+# deadline is shorter than the reserve
+DETECTION_MIN_SHARE = float(os.getenv("REKOGNITION_DEADLINE_MIN_SHARE", "0.5"))
+
 @dataclass
 class DetectionResult:
     name: str
@@ -17,19 +29,32 @@ class DetectionResult:
 
 class RekognitionService:
     def __init__(self, region_name: str = "us-east-2"):
-        # Use environment variables or default credential chain
-        import os
-        self.rekognition = boto3.client(
-            'rekognition',
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-            region_name=region_name
-        )
+        self.region_name = region_name
+        self._rekognition = None
         self.rate_limit_tokens = 10  # Simple token bucket
         self.max_tokens = 10
         self.last_refill = time.time()
         self.refill_rate = 1.0  # tokens per second
         
+    @property
+    def rekognition(self):
+        """boto3 client, created on first use"""
+        if self._rekognition is None:
+            # Use environment variables or default credential chain
+            import os
+            import boto3
+            self._rekognition = boto3.client(
+                'rekognition',
+                aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+                region_name=self.region_name
+            )
+        return self._rekognition
+
+    @rekognition.setter
+    def rekognition(self, client):
+        self._rekognition = client
+
     async def _acquire_token(self):
         """Simple token bucket rate limiting"""
         current_time = time.time()
@@ -53,31 +78,37 @@ class RekognitionService:
     
     async def _detect_labels_with_retry(self, bucket: str, key: str, max_retries: int = 3) -> List[Dict[str, Any]]:
         """Detect labels from S3 image with exponential backoff retry"""
+        image = {'S3Object': {'Bucket': bucket, 'Name': key}}
+        return await self._detect_image_with_retry(image, key, max_retries)
+
+    async def _detect_image_with_retry(self, image: Dict[str, Any], key: str, max_retries: int = 3) -> List[Dict[str, Any]]:
+        """detect_labels for an `Image` (S3Object or raw Bytes) with exponential backoff retry"""
         for attempt in range(max_retries):
             try:
                 await self._acquire_token()
                 
-                response = self.rekognition.detect_labels(
-                    Image={
-                        'S3Object': {
-                            'Bucket': bucket,
-                            'Name': key
-                        }
-                    },
-                    MaxLabels=10,  # Even more focused on top detections
-                    MinConfidence=0.80  # Much higher threshold for accuracy
-                )
+                client = self.rekognition
+                with stage("rekognition", source="bytes" if "Bytes" in image else "s3"):
+                    # runs in a thread, hedged when slow; CircuitOpenError is not retried
+                    response = await REKOGNITION.acall(lambda: client.detect_labels(
+                        Image=image,
+                        MaxLabels=10,  # Even more focused on top detections
+                        MinConfidence=0.80  # Much higher threshold for accuracy
+                    ))
                 
                 return response.get('Labels', [])
                 
             except (ClientError, BotoCoreError) as e:
-                if attempt == max_retries - 1:
+                if attempt == max_retries - 1 or not is_failure(e):
                     logger.error(f"Failed to detect labels for {key} after {max_retries} attempts: {e}")
                     logger.error(f"Error type: {type(e).__name__}")
                     raise
                 
                 # Exponential backoff
                 wait_time = 2 ** attempt
+                if not has_budget(wait_time + DETECTION_RESERVE):
+                    degrade("rekognition", "retry skipped, out of time budget")
+                    raise
                 logger.warning(f"Attempt {attempt + 1} failed for {key}, retrying in {wait_time}s: {e}")
                 await asyncio.sleep(wait_time)
         
@@ -90,7 +121,6 @@ class RekognitionService:
         """
         logger.info(f"Starting detect_food_items for {len(s3_keys)} images in bucket {bucket}")
         logger.info(f"Image keys: {s3_keys}")
-        all_labels = []
         
         # Process images concurrently but with rate limiting
         tasks = []
@@ -99,8 +129,60 @@ class RekognitionService:
             tasks.append(task)
         
         # Execute all detection tasks
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        results = await self._gather_within_deadline(tasks)
         logger.info(f"Got {len(results)} results from AWS Rekognition")
+        return self._to_detections(results, s3_keys)
+
+    async def detect_food_items_per_image(self, s3_keys: List[str], bucket: str = "smart-fridge-images-nayana") -> List[Optional[List[DetectionResult]]]:
+        """
+        Like detect_food_items, but keeps each image's detections separate;
+        None for an image that failed or timed out, so callers can retry it later.
+        """
+        tasks = [self._detect_labels_with_retry(bucket, key) for key in s3_keys]
+        results = await self._gather_within_deadline(tasks)
+        return [
+            None if isinstance(result, BaseException) else self._to_detections([result], [key])
+            for key, result in zip(s3_keys, results)
+        ]
+
+    async def detect_food_items_from_bytes(self, images: List[Tuple[str, bytes]]) -> List[DetectionResult]:
+        """
+        Detect food items from uploaded image bytes (Image.Bytes, up to 5 MB
+        each), skipping the S3 round trip. `images` is [(name, data)].
+        """
+        names = [name for name, _ in images]
+        logger.info(f"Starting detect_food_items_from_bytes for {len(images)} images")
+        tasks = [self._detect_image_with_retry({'Bytes': data}, name) for name, data in images]
+        results = await self._gather_within_deadline(tasks)
+        return self._to_detections(results, names)
+
+    async def _gather_within_deadline(self, coros: List[Any]) -> List[Any]:
+        """
+        Like gather(return_exceptions=True), but stops waiting when only
+        DETECTION_RESERVE of the request deadline is left; unfinished images
+        are dropped (as TimeoutError) so the rest of the pipeline still runs.
+        Detection always gets DETECTION_MIN_SHARE of the time left, so a
+        budget under the reserve does not cancel every image up front.
+        """
+        if not coros:
+            return []
+        tasks = [asyncio.ensure_future(c) for c in coros]
+        timeout = None
+        if remaining() is not None:
+            timeout = max(remaining(DETECTION_RESERVE), remaining() * DETECTION_MIN_SHARE)
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            degrade("rekognition", f"{len(pending)} of {len(tasks)} images timed out")
+        return [
+            (task.exception() or task.result()) if task in done else asyncio.TimeoutError("deadline")
+            for task in tasks
+        ]
+
+    def _to_detections(self, results: List[Any], s3_keys: List[str]) -> List[DetectionResult]:
+        """Merge per-image label lists into filtered, thresholded detections"""
+        all_labels = []
         
         # Process results
         for i, result in enumerate(results):
@@ -0,0 +1,148 @@
+# backend/app/tests/test_analyze_upload.py
+import json
+import sys
+import threading
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.app.routes import analyze
+from backend.app.utils.body_limit import BodyLimitMiddleware
+from backend.benchmarks.stub_server import build_parser, make_server
+
+# the s3 module the route uses (imported as app.utils.s3)
+s3 = sys.modules[analyze.archive_uploads.__module__]
+
+app = FastAPI()
+app.include_router(analyze.router, prefix="/api")
+client = TestClient(app)
+
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 2048
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """Local Rekognition + S3 stand-in; the analysis after vision is stubbed out"""
+    args = build_parser().parse_args(["--rekognition-latency", "fixed:0", "--labels", "4"])
+    server = make_server(args, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "stub")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "stub")
+    monkeypatch.setenv("AWS_ENDPOINT_URL_REKOGNITION", url)
+    monkeypatch.setenv("AWS_ENDPOINT_URL_S3", url)
+    monkeypatch.setattr(analyze.rekognition_service, "_rekognition", None)
+    monkeypatch.setattr(s3, "_s3_client", None)
+
+    calls = []
+
+    def fake_build_analysis(vision_response, people_count, manual_inventory, started):
+        calls.append((vision_response, people_count, manual_inventory))
+        return {"inventory": [{"id": i["name"], "name": i["name"], "category": "Detected",
+                               "quantity": "1", "carbonImpact": "medium"} for i in vision_response["items"]],
+                "recipes": [], "swapTips": [], "totalCarbonImpact": 0, "analysisTime": 0.0}
+
+    monkeypatch.setattr(analyze, "build_analysis", fake_build_analysis)
+    yield url, calls
+    server.shutdown()
+    server.server_close()
+    monkeypatch.setattr(analyze.rekognition_service, "_rekognition", None)
+    monkeypatch.setattr(s3, "_s3_client", None)
+
+
+def test_upload_sends_bytes_to_rekognition_and_archives(stub):
+    url, calls = stub
+    files = [("files", (f"fridge{i}.jpg", JPEG, "image/jpeg")) for i in range(2)]
+    r = client.post("/api/analyze/upload", files=files,
+                    data={"peopleCount": "3", "inventory": json.dumps([{"name": "tofu"}])})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["inventory"]
+    vision, people, manual = calls[0]
+    assert vision["processing_stats"]["images_processed"] == 2
+    assert people == 3 and manual == [{"name": "tofu"}]
+    assert [p["originalBytes"] for p in body["preprocessing"]] == [len(JPEG)] * 2
+
+    stats = httpx.get(f"{url}/stats").json()
+    assert stats["detect_labels_bytes"] == 2
+    # archived after the response, under the keys it returned
+    assert len(body["imageKeys"]) == 2
+    archived = {f"{s3.BUCKET_NAME}/{key}": len(JPEG) for key in body["imageKeys"]}
+    assert stats["objects"] == archived
+
+
+def test_archive_continues_past_failed_objects(monkeypatch):
+    from botocore.exceptions import EndpointConnectionError
+    stored = []
+
+    class FlakyClient:
+        def put_object(self, Bucket, Key, Body, ContentType):
+            if Key == "b":
+                raise EndpointConnectionError(endpoint_url="http://s3")
+            stored.append(Key)
+
+    monkeypatch.setattr(s3, "_s3_client", FlakyClient())
+    objects = [(key, JPEG, "image/jpeg") for key in ("a", "b", "c")]
+    assert s3.archive_uploads(objects) == 2
+    assert stored == ["a", "c"]
+
+
+def test_upload_without_archive(stub):
+    url, _ = stub
+    r = client.post("/api/analyze/upload", files=[("files", ("a.png", JPEG, "image/png"))],
+                    data={"archive": "false"})
+    assert r.status_code == 200
+    assert r.json().get("imageKeys") is None
+    assert httpx.get(f"{url}/stats").json()["objects"] == {}
+
+
+def test_upload_limits(stub, monkeypatch):
+    url, calls = stub
+    monkeypatch.setattr(analyze, "MAX_UPLOAD_BYTES", 1024)
+    r = client.post("/api/analyze/upload", files=[("files", ("big.jpg", JPEG, "image/jpeg"))])
+    assert r.status_code == 413
+
+    r = client.post("/api/analyze/upload", files=[("files", ("notes.txt", b"hello", "text/plain"))])
+    assert r.status_code == 415
+
+    monkeypatch.setattr(analyze, "MAX_UPLOAD_FILES", 1)
+    monkeypatch.setattr(analyze, "MAX_UPLOAD_BYTES", 10 * 1024)
+    files = [("files", (f"p{i}.jpg", b"\xff\xd8\xff", "image/jpeg")) for i in range(2)]
+    r = client.post("/api/analyze/upload", files=files)
+    assert r.status_code == 413
+
+    assert not calls
+    assert "detect_labels" not in httpx.get(f"{url}/stats").json()
+
+
+def test_body_limit_rejects_before_parsing(monkeypatch):
+    parsed = []
+    monkeypatch.setattr(analyze, "_analyze_upload", lambda *a: parsed.append(a))
+    limited = FastAPI()
+    limited.include_router(analyze.router, prefix="/api")
+    limited.add_middleware(BodyLimitMiddleware, limits={"/api/analyze/upload": 4096})
+    limited_client = TestClient(limited)
+
+    # declared too large: rejected from the header alone
+    r = limited_client.post("/api/analyze/upload", files=[("files", ("big.jpg", JPEG * 3, "image/jpeg"))])
+    assert r.status_code == 413
+
+    # chunked, no Content-Length: rejected once the counted bytes pass the limit
+    def chunks():
+        for _ in range(8):
+            yield b"x" * 1024
+    r = limited_client.post("/api/analyze/upload", content=chunks(),
+                            headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert r.status_code == 413
+    assert not parsed
+
+    # other paths are not limited
+    assert limited_client.post("/api/analyze", content=b"x" * 8192).status_code == 422
+
+
+@pytest.mark.parametrize("inventory", ['{"name": "tofu"}', '[{"qty": 1}]', '["tofu"]', "not json"])
+def test_bad_inventory_is_422(stub, inventory):
+    r = client.post("/api/analyze/upload", files=[("files", ("a.jpg", JPEG, "image/jpeg"))],
+                    data={"inventory": inventory, "archive": "false"})
+    assert r.status_code == 422
@@ -0,0 +1,40 @@
+# backend/app/tests/test_carbon_table.py
+import pytest
+from backend.app.services.carbon_table import carbon_table, score_tags, TAG_CODE
+from backend.app.services.carbon import calculate_carbon_impact
+from backend.app.utils.scoring import get_overall_health_score
+
+INVENTORY = [
+    {"name": "beef", "carbonImpact": "high", "carbonValue": 6.4, "category": "Meat", "confidence": 0.9},
+    {"name": "spinach", "carbonImpact": "low", "category": "Vegetables", "confidence": 0.8},
+    {"name": "cheese", "carbonImpact": "medium", "carbonValue": 0.4, "category": "Dairy"},
+    {"name": "mystery", "carbonImpact": "unknown", "category": "Detected", "confidence": 0.5},
+]
+
+
+def test_table_columns_and_unknown_row():
+    row = carbon_table.row("spinach, raw")
+    assert carbon_table.entry(row) == {"tag": "low", "co2e_100g": pytest.approx(0.0617, abs=1e-4), "category": "vegetables"}
+    unknown = carbon_table.row("not in table")
+    assert unknown == carbon_table.UNKNOWN_ROW
+    assert carbon_table.entry(unknown) == {"tag": "unknown", "co2e_100g": None, "category": "other"}
+    assert score_tags([TAG_CODE["high"], TAG_CODE["medium"], TAG_CODE["low"]]) == 85
+    assert score_tags([TAG_CODE["high"]] * 12) == 0
+
+
+def test_carbon_impact_aggregates():
+    out = calculate_carbon_impact(INVENTORY)
+    assert out["totalCarbon"] == 8.8
+    assert out["impactBreakdown"] == {"high": 1, "medium": 1, "low": 2}
+    assert [i["name"] for i in out["lowImpactItems"]] == ["spinach", "mystery"]
+
+
+def test_overall_health_score():
+    out = get_overall_health_score(INVENTORY)
+    assert out["confidence"] == pytest.approx(min(2.2 / 4 + 0.2, 1.0))
+    assert out["sustainability"] == pytest.approx(0.5 + 0.3 / 4 - 0.2 / 4)
+    assert out["nutrition"] == pytest.approx((0.5 + 0.9 + 0.6 + 0.4) / 4)
+    assert out["overall"] == pytest.approx(
+        out["confidence"] * 0.3 + out["sustainability"] * 0.4 + out["nutrition"] * 0.3
+    )
+    assert get_overall_health_score([])["overall"] == 0.0
@@ -0,0 +1,54 @@
+# backend/app/tests/test_data_bundle.py
+import json
+from dataclasses import astuple
+import numpy as np
+import pytest
+from backend.app.services import data_bundle
+from backend.app.services.carbon_table import CarbonTable
+from backend.app.utils.swap_table import build_swap_table
+
+
+class TinyModel:
+    """Deterministic stand-in for the sentence-transformer at build time"""
+
+    def encode(self, texts, normalize_embeddings=False):
+        rng = np.random.default_rng(0)
+        out = rng.normal(size=(len(texts), 8)).astype(np.float32)
+        return out / np.linalg.norm(out, axis=1, keepdims=True)
+
+
+@pytest.fixture(scope="module")
+def bundle(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("bundle") / "test.bundle")
+    data_bundle.compile_bundle(path, model=TinyModel())
+    return data_bundle.DataBundle(path)
+
+
+def test_bundle_round_trips_carbon_columns(bundle):
+    expected = CarbonTable.from_json(data_bundle.CARBON_JSON)
+    table = bundle.carbon_table()
+    assert table.keys == expected.keys
+    assert table.categories == expected.categories
+    np.testing.assert_array_equal(table.co2e_100g, expected.co2e_100g)
+    np.testing.assert_array_equal(table.tag_codes, expected.tag_codes)
+    assert not table.co2e_100g.flags.writeable  # a view onto the read-only mapping
+
+
+def test_bundle_aliases_and_swap_table(bundle):
+    with open(data_bundle.ALIASES_JSON) as f:
+        assert bundle.aliases == json.load(f)
+
+    table = bundle.carbon_table()
+    def rows(swaps):
+        return {k: [astuple(c) for c in v] for k, v in swaps.items()}
+
+    assert rows(bundle.swap_table()) == rows(build_swap_table(table, bundle.embeddings))
+    assert bundle.embeddings.shape == (len(table), 8)
+    assert bundle.is_fresh()
+
+
+def test_rejects_foreign_files(tmp_path):
+    p = tmp_path / "junk.bundle"
+    p.write_bytes(b"not a bundle at all")
+    with pytest.raises(ValueError):
+        data_bundle.DataBundle(str(p))
@@ -0,0 +1,175 @@
+# backend/app/tests/test_deadline.py
+import sys
+import time
+import pytest
+from botocore.exceptions import ClientError
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.app.routes import analyze, plan
+from backend.app.services import recipes_llm, rekog
+from backend.app.shared.models.recipe import LLMContext
+
+
+def deadline_of(fn):
+    """The deadline module a module under test actually imported (app.* or backend.app.*)"""
+    return sys.modules[fn.__module__]
+
+
+def test_request_budget():
+    deadline = deadline_of(rekog.degrade)
+    assert deadline.request_budget(None, default=8.0) == 8.0
+    assert deadline.request_budget("2500", default=8.0) == 2.5
+    assert deadline.request_budget("60000", default=8.0) == 8.0
+    assert deadline.request_budget("soon", default=8.0) == 8.0
+    assert deadline.request_budget("-5", default=8.0) == 8.0
+
+
+def test_scope_tracks_remaining_and_degraded():
+    deadline = deadline_of(rekog.degrade)
+    assert deadline.remaining() is None and deadline.has_budget(1e9)
+    with deadline.deadline_scope(0.5) as degraded:
+        assert 0.4 < deadline.remaining() <= 0.5
+        assert deadline.has_budget(0.1) and not deadline.has_budget(1.0)
+        deadline.degrade("plan", "lexical")
+        deadline.degrade("plan", "lexical")
+    assert degraded == [{"stage": "plan", "reason": "lexical"}]
+    assert deadline.remaining() is None
+
+
+class SlowClient:
+    def __init__(self, slow_after: int):
+        self.calls = 0
+        self.slow_after = slow_after
+
+    def detect_labels(self, **kwargs):
+        self.calls += 1
+        if self.calls > self.slow_after:
+            time.sleep(1.0)
+        return {"Labels": [{"Name": "Tomato", "Confidence": 95.0}]}
+
+
+@pytest.mark.asyncio
+async def test_detection_stops_waiting_at_the_deadline(monkeypatch):
+    deadline = deadline_of(rekog.degrade)
+    monkeypatch.setattr(rekog, "DETECTION_RESERVE", 0.0)
+    service = rekog.RekognitionService()
+    service.rekognition = SlowClient(slow_after=1)
+    service.max_tokens = service.rate_limit_tokens = float("inf")
+
+    start = time.perf_counter()
+    with deadline.deadline_scope(0.3) as degraded:
+        results = await service.detect_food_items_from_bytes([("a.jpg", b"a"), ("b.jpg", b"b")])
+    assert time.perf_counter() - start < 0.8
+    assert [r.name for r in results] == ["tomato"]
+    assert degraded == [{"stage": "rekognition", "reason": "1 of 2 images timed out"}]
+
+
+@pytest.mark.asyncio
+async def test_budget_below_reserve_still_detects(monkeypatch):
+    deadline = deadline_of(rekog.degrade)
+    monkeypatch.setattr(rekog, "DETECTION_RESERVE", 2.0)
+    service = rekog.RekognitionService()
+
+    class FastClient:
+        def detect_labels(self, **kwargs):
+            time.sleep(0.05)
+            return {"Labels": [{"Name": "Tomato", "Confidence": 95.0}]}
+    service.rekognition = FastClient()
+    service.max_tokens = service.rate_limit_tokens = float("inf")
+
+    with deadline.deadline_scope(1.5) as degraded:
+        results = await service.detect_food_items_per_image(["a.jpg", "b.jpg"], bucket="b")
+    assert [[d.name for d in r] for r in results] == [["tomato"], ["tomato"]]
+    assert degraded == []
+
+
+@pytest.mark.asyncio
+async def test_retries_skipped_without_budget():
+    deadline = deadline_of(rekog.degrade)
+    calls = []
+
+    class Throttled:
+        def detect_labels(self, **kwargs):
+            calls.append(1)
+            raise ClientError({"Error": {"Code": "InternalServerError", "Message": "down"},
+                               "ResponseMetadata": {"HTTPStatusCode": 500}}, "DetectLabels")
+
+    service = rekog.RekognitionService()
+    service.rekognition = Throttled()
+    with deadline.deadline_scope(2.5) as degraded:
+        with pytest.raises(ClientError):
+            await service._detect_image_with_retry({"Bytes": b"x"}, "x.jpg")
+    assert len(calls) == 1
+    assert degraded[0]["stage"] == "rekognition"
+
+
+def test_plan_stays_lexical_when_out_of_budget(monkeypatch):
+    deadline = deadline_of(plan.degrade)
+
+    def no_embeddings(queries):
+        raise AssertionError("embedding tier used without budget")
+    monkeypatch.setattr(plan.carbon_matcher, "embed_lookup", no_embeddings)
+
+    with deadline.deadline_scope(0.01) as degraded:
+        time.sleep(0.02)
+        result = plan.plan(items=["tomato", "qwzx blorp"], people=2, flags=[], demo=False)
+    assert [i.name for i in result.inventory] == ["tomato", "qwzx blorp"]
+    assert degraded == [{"stage": "plan", "reason": "lexical lookups only, out of time budget"}]
+
+
+def test_plan_skips_unbuilt_swap_table_when_out_of_budget(monkeypatch):
+    deadline = deadline_of(plan.degrade)
+
+    def no_model():
+        raise AssertionError("swap table built without budget")
+    monkeypatch.setattr(plan, "_swap_table", None)
+    monkeypatch.setattr(plan, "_model", None)
+    monkeypatch.setattr(plan, "_load_embeddings", no_model)
+    monkeypatch.setattr(plan, "suggest_swap", lambda item, category, co2e: ("tofu", "Lower footprint"))
+
+    with deadline.deadline_scope(0.01) as degraded:
+        time.sleep(0.02)
+        result = plan.plan(items=["beef"], people=2, flags=[], demo=False)
+    assert [s.to for s in result.swaps] == ["tofu"]
+    assert {"stage": "plan", "reason": "precomputed swaps skipped, out of time budget"} in degraded
+
+
+def test_llm_skipped_and_not_cached_when_out_of_budget(monkeypatch):
+    deadline = deadline_of(recipes_llm.degrade)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    def should_not_call(ctx):
+        raise AssertionError("LLM called without budget")
+    monkeypatch.setattr(recipes_llm, "_call_llm_strict_json", should_not_call)
+
+    ctx = LLMContext(pantry=["kohlrabi", "quinoa", "leeks"], people=2, flags=[])
+    recipes_llm._cache_clear()
+    with deadline.deadline_scope(0.5) as degraded:
+        out = recipes_llm.generate(ctx)
+    assert out and all(r.source in ("fallback", "curated") for r in out)
+    assert degraded == [{"stage": "recipes", "reason": "llm skipped, out of time budget"}]
+    assert recipes_llm._cache_get(recipes_llm._key(ctx)) is None
+
+
+def test_analyze_reports_degraded_stages(monkeypatch):
+    deadline = deadline_of(analyze.deadline_scope)
+    seen = {}
+
+    async def fake_detect(s3_keys, bucket):
+        deadline.degrade("rekognition", "retry skipped, out of time budget")
+        return []
+
+    def fake_build_analysis(vision_response, people_count, manual_inventory, started):
+        seen["remaining"] = deadline.remaining()
+        return {"inventory": [], "recipes": [], "swapTips": [], "totalCarbonImpact": 100, "analysisTime": 0.0}
+
+    monkeypatch.setattr(analyze.rekognition_service, "detect_food_items", fake_detect)
+    monkeypatch.setattr(analyze, "build_analysis", fake_build_analysis)
+    app = FastAPI()
+    app.include_router(analyze.router, prefix="/api")
+    r = TestClient(app).post("/api/analyze", json={"imageKeys": ["a.jpg"], "peopleCount": 2},
+                             headers={"X-Deadline-Ms": "2000"})
+    assert r.status_code == 200
+    assert r.json()["degraded"] == [{"stage": "rekognition", "reason": "retry skipped, out of time budget"}]
+    # the deadline reached the worker thread
+    assert 0 < seen["remaining"] <= 2.0
@@ -0,0 +1,120 @@
+# backend/app/tests/test_households.py
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.app.routes import households
+from backend.app.services.inventory_store import InventoryStore, StoredItem
+from backend.app.services.rekog import DetectionResult
+
+app = FastAPI()
+app.include_router(households.router, prefix="/api")
+client = TestClient(app)
+
+LABELS = {
+    "a.jpg": ["tomato", "beef"],
+    "b.jpg": ["tomato"],
+    "c.jpg": ["milk"],
+}
+
+
+@pytest.fixture
+def env(monkeypatch, tmp_path):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr(households, "inventory_store", InventoryStore(str(tmp_path / "inventory.sqlite3")))
+    detected, planned = [], []
+
+    async def fake_per_image(keys, bucket):
+        detected.extend(keys)
+        return [[DetectionResult(name=name, count=1, confidence=0.95) for name in LABELS[k]] for k in keys]
+
+    real_plan = households.plan_logic
+
+    def recording_plan(items, **kwargs):
+        planned.append(list(items))
+        return real_plan(items=items, **kwargs)
+
+    monkeypatch.setattr(households.rekognition_service, "detect_food_items_per_image", fake_per_image)
+    monkeypatch.setattr(households, "plan_logic", recording_plan)
+    return detected, planned
+
+
+def analyze(keys, inventory=None):
+    r = client.post("/api/households/h1/analyze",
+                    json={"imageKeys": keys, "peopleCount": 2, "inventory": inventory or []})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_only_new_images_and_items_are_processed(env):
+    detected, planned = env
+    first = analyze(["a.jpg", "b.jpg"])
+    assert detected == ["a.jpg", "b.jpg"]
+    assert sorted(planned[0]) == ["beef", "tomatoes"]
+    assert first["version"] == 1 and first["newImages"] == 2
+    assert {i["name"] for i in first["inventory"]} == {"tomatoes", "beef"}
+    assert any(t["original"] == "beef" for t in first["swapTips"])
+
+    second = analyze(["a.jpg", "b.jpg", "c.jpg"], inventory=[{"name": "Tofu"}])
+    assert detected == ["a.jpg", "b.jpg", "c.jpg"]
+    assert sorted(planned[1]) == ["milk", "tofu"]
+    assert second["skippedImages"] == 2 and second["newImages"] == 1
+    assert sorted(second["changedItems"]) == ["milk", "tofu"]
+    assert second["version"] == 2
+    assert {i["name"] for i in second["inventory"]} == {"tomatoes", "beef", "milk", "tofu"}
+
+    # nothing new: no detection, no planning, no new version
+    third = analyze(["c.jpg"])
+    assert len(detected) == 3 and len(planned) == 2
+    assert third["version"] == 2 and third["changedItems"] == []
+    assert third["totalCarbonImpact"] == second["totalCarbonImpact"]
+
+
+def test_score_matches_full_plan_and_updates_on_removal(env):
+    analyze(["a.jpg", "c.jpg"], inventory=[{"name": "tofu"}])
+    full = households.plan_logic(items=["tomatoes", "beef", "milk", "tofu"], people=2, flags=[], demo=False)
+    inventory = client.get("/api/households/h1/inventory").json()
+    assert inventory["score"] == full.score
+
+    r = client.delete("/api/households/h1/items/beef")
+    assert r.status_code == 200
+    after = r.json()
+    beef_penalty = next(i for i in inventory["items"] if i["name"] == "beef")["penalty"]
+    assert after["score"] == full.score + beef_penalty
+    assert [(i["name"], i["removed"]) for i in after["items"]] == [("beef", True)]
+    assert client.delete("/api/households/h1/items/beef").status_code == 404
+
+    changes = client.get("/api/households/h1/inventory", params={"since": inventory["version"]}).json()
+    assert [i["name"] for i in changes["items"]] == ["beef"]
+
+
+@pytest.mark.parametrize("inventory", [
+    [{"qty": 1}], [{"name": 5}], [{"name": " "}], [{"name": "tofu", "confidence": "high"}],
+    [{"name": "tofu", "category": {"x": 1}}],
+])
+def test_bad_manual_inventory_is_422_and_not_stored(env, inventory):
+    r = client.post("/api/households/h1/analyze", json={"imageKeys": [], "peopleCount": 2, "inventory": inventory})
+    assert r.status_code == 422
+    assert client.get("/api/households/h1/inventory").json()["version"] == 0
+
+
+def test_manual_confidence_is_stored_as_float(env):
+    result = analyze([], inventory=[{"name": "tofu", "confidence": "0.8"}])
+    assert result["inventory"][0]["confidence"] == 0.8
+
+
+def test_store_merges_counts_without_double_counting(tmp_path):
+    store = InventoryStore(str(tmp_path / "inventory.sqlite3"))
+    household, changed = store.apply("h", upserts=[StoredItem("egg", 0, 2, 0.9, "detected", impact="medium", penalty=5)])
+    assert (household.version, household.score, changed) == (1, 95, ["egg"])
+
+    household, changed = store.apply("h", upserts=[StoredItem("egg", 0, 1, 0.8, "detected", impact="medium", penalty=5)])
+    assert (household.version, household.score, changed) == (1, 95, [])
+
+    household, changed = store.apply("h", upserts=[StoredItem("egg", 0, 6, 0.8, "detected", impact="medium", penalty=5)])
+    assert (household.version, household.score, changed) == (2, 95, ["egg"])
+    assert store.items("h")[0].count == 6
+
+    # planned later after being stored while the planner was down
+    store.apply("h", upserts=[StoredItem("beef", 0, 1, 0.9, "detected")])
+    household, _ = store.apply("h", upserts=[StoredItem("beef", 0, 1, 0.9, "detected", impact="high", penalty=10)])
+    assert household.score == 85
@@ -0,0 +1,61 @@
+# backend/app/tests/test_loop_monitor.py
+import asyncio
+import threading
+import time
+import pytest
+from backend.app.utils.loop_monitor import LoopLagMonitor, LOOP_LAG
+
+
+def blocking_call():
+    time.sleep(0.3)
+
+
+@pytest.mark.asyncio
+async def test_stall_is_captured_with_blocking_stack():
+    monitor = LoopLagMonitor(interval=0.02, threshold=0.1)
+    before = LOOP_LAG.count()
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        blocking_call()
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    assert len(monitor.stalls) == 1
+    stall = monitor.stalls[0]
+    assert stall["blocked_for"] >= 0.1
+    assert any("blocking_call" in line for line in stall["stack"])
+    assert monitor.max_lag >= 0.2
+    assert LOOP_LAG.count() > before
+
+
+@pytest.mark.asyncio
+async def test_idle_loop_records_no_stalls():
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.2)
+    monitor.start()
+    await asyncio.sleep(0.1)
+    await monitor.stop()
+    assert not monitor.running
+    assert list(monitor.stalls) == []
+
+
+@pytest.mark.asyncio
+async def test_stop_does_not_block_the_loop():
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.2)
+    monitor.start()
+    # a watchdog that is slow to finish, e.g. while logging a long stack
+    monitor._watchdog = threading.Thread(target=time.sleep, args=(0.3,), daemon=True)
+    monitor._watchdog.start()
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.get_running_loop().create_task(tick())
+    await monitor.stop()
+    ticker.cancel()
+    assert ticks >= 5
@@ -0,0 +1,35 @@
+# backend/app/tests/test_matcher.py
+from backend.app.services.matcher import TieredMatcher, carbon_vocabulary
+
+KEYS = ["eggs, chicken, free-range hens , raw", "tomato, ripe, raw, origin unknown", "carrot, raw"]
+ALIASES = {"eggs": ["egg", "chicken eggs"], "tomatoes": ["cherry tomatoes"], "lettuce": ["romaine"]}
+
+
+def test_carbon_vocabulary_covers_heads_plurals_and_aliases():
+    vocab = carbon_vocabulary(KEYS, ALIASES)
+    assert vocab["egg"] == vocab["chicken eggs"] == KEYS[0]
+    assert vocab["tomatoes"] == vocab["cherry tomatoes"] == KEYS[1]
+    assert vocab["carrots"] == KEYS[2]
+    assert "romaine" not in vocab
+
+
+def test_tiers_run_in_cost_order_and_are_counted():
+    calls = []
+
+    def embed(queries):
+        calls.append(list(queries))
+        return [(KEYS[2], 0.9) if q == "karotte" else (KEYS[0], 0.2) for q in queries]
+
+    matcher = TieredMatcher("test", carbon_vocabulary(KEYS, ALIASES), embed_lookup=embed)
+    results = matcher.match_many(["Eggs", "cherry tomato", "karotte", "dragonfruit"])
+
+    assert [r.tier for r in results] == ["exact", "ngram", "embedding", "none"]
+    assert [r.target for r in results] == [KEYS[0], KEYS[1], KEYS[2], None]
+    # one batched call for everything the cheap tiers could not place
+    assert calls == [["karotte", "dragonfruit"]]
+    assert matcher.stats() == {"exact": 1, "ngram": 1, "embedding": 1, "none": 1}
+
+
+def test_embedding_tier_can_be_skipped():
+    matcher = TieredMatcher("test", {"milk": "milk"}, embed_lookup=lambda qs: 1 / 0)
+    assert matcher.match("oat drink", use_embedding=False).tier == "none"
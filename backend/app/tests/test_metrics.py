@@ -0,0 +1,85 @@
+# backend/app/tests/test_metrics.py
+import json
+import os
+import sys
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.app.routes import metrics as metrics_routes
+
+# the metrics module the route renders from (imported as app.utils.metrics)
+metrics = sys.modules[metrics_routes.render_all.__module__]
+
+app = FastAPI()
+app.middleware("http")(metrics.timing_middleware)
+app.include_router(metrics_routes.router)
+
+
+@app.get("/work")
+def work():
+    with metrics.stage("normalize"):
+        pass
+    with metrics.stage("recipe_cache", cache="exact") as s:
+        s.labels["result"] = "hit"
+    return {"ok": True}
+
+
+client = TestClient(app)
+
+
+def test_stages_feed_server_timing_and_metrics():
+    before = metrics.STAGE_SECONDS.count(stage="recipe_cache", cache="exact", result="hit")
+    r = client.get("/work")
+    assert r.status_code == 200
+    timing = r.headers["server-timing"]
+    assert timing.startswith("normalize;dur=") and "recipe_cache;dur=" in timing and "total;dur=" in timing
+    assert metrics.STAGE_SECONDS.count(stage="recipe_cache", cache="exact", result="hit") == before + 1
+
+    text = client.get("/metrics").text
+    assert "# TYPE smart_fridge_stage_seconds histogram" in text
+    assert 'smart_fridge_stage_seconds_bucket{cache="exact",result="hit",stage="recipe_cache",le="+Inf"}' in text
+    assert 'smart_fridge_http_request_seconds_count{method="GET",route="/work",status="200"}' in text
+
+
+def test_histogram_render_is_cumulative():
+    h = metrics.Histogram("t_seconds", "test", buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.5, 5.0):
+        h.observe(v, k="a")
+    lines = h.render()
+    assert 't_seconds_bucket{k="a",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{k="a",le="1"} 3' in lines
+    assert 't_seconds_bucket{k="a",le="+Inf"} 4' in lines
+    assert 't_seconds_count{k="a"} 4' in lines
+
+
+def test_worker_snapshots_are_merged(tmp_path, monkeypatch):
+    dead_pid = 2 ** 22 + 1  # above Linux pid_max, never a live process
+
+    def worker(slot, pid, requests, lag):
+        reg = metrics.Registry()
+        reg.counter("t_requests_total", "requests").inc(requests, route="/a")
+        reg.gauge("t_lag_seconds", "lag").set(lag)
+        reg.histogram("t_seconds", "latency", buckets=(0.1, 1.0)).observe(0.05 * requests)
+        (tmp_path / f"worker-{slot}-{pid}.json").write_text(json.dumps(reg.snapshot()))
+
+    worker(0, os.getppid(), 3, 0.2)
+    worker(1, dead_pid, 4, 9.0)  # replaced worker: counters stay, gauges go
+    monkeypatch.setenv("METRICS_DIR", str(tmp_path))
+    monkeypatch.setenv("PREFORK_WORKER", "2")
+
+    text = metrics.render_all()
+    assert 't_requests_total{route="/a"} 7' in text
+    assert 't_lag_seconds{worker="0"} 0.2' in text
+    assert [line for line in text.splitlines() if line.startswith("t_lag_seconds")] == ['t_lag_seconds{worker="0"} 0.2']
+    assert 't_seconds_bucket{le="1"} 2' in text and "t_seconds_count 2" in text
+    # this process added its own snapshot too
+    assert (tmp_path / f"worker-2-{os.getpid()}.json").exists()
+
+    # the dead worker was folded into the retired totals, once
+    assert not (tmp_path / f"worker-1-{dead_pid}.json").exists()
+    assert 't_requests_total{route="/a"} 7' in metrics.render_all()
+    worker(3, dead_pid + 1, 5, 1.0)
+    text = metrics.render_all()
+    assert 't_requests_total{route="/a"} 12' in text and "t_seconds_count 3" in text
+    assert sorted(p.name for p in tmp_path.glob("worker-*.json")) == sorted(
+        [f"worker-0-{os.getppid()}.json", f"worker-2-{os.getpid()}.json"]
+    )
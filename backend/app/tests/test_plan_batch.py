@@ -0,0 +1,32 @@
+# backend/app/tests/test_plan_batch.py
+import json
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.app.routes import plan as plan_routes
+
+app = FastAPI()
+app.include_router(plan_routes.router)
+client = TestClient(app)
+
+HOUSEHOLDS = [
+    {"items": ["beef", "spinach", "cheese"], "people": 2, "flags": []},
+    {"items": [], "people": 1, "flags": []},
+    {"items": ["spinach", "beef", "beef", "tofu"], "people": 4, "flags": ["veg_ok"]},
+]
+
+
+def _single(h):
+    return plan_routes.plan(items=h["items"], people=h["people"], flags=h["flags"], demo=False).model_dump()
+
+
+def test_batch_matches_single_plans_in_order():
+    r = client.post("/plan/batch", json={"households": HOUSEHOLDS})
+    assert r.status_code == 200
+    assert r.json()["results"] == [_single(h) for h in HOUSEHOLDS]
+
+
+def test_batch_streams_ndjson():
+    r = client.post("/plan/batch?stream=true", json={"households": HOUSEHOLDS})
+    assert r.status_code == 200
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [l["score"] for l in lines] == [_single(h)["score"] for h in HOUSEHOLDS]
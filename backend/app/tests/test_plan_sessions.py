@@ -0,0 +1,78 @@
+# backend/app/tests/test_plan_sessions.py
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.app.routes import plan as plan_routes
+
+app = FastAPI()
+app.include_router(plan_routes.router)
+client = TestClient(app)
+
+
+def _full(items, people=2, flags=()):
+    return plan_routes.plan(items=items, people=people, flags=list(flags), demo=False).model_dump()
+
+
+def test_diffs_match_full_replans():
+    r = client.post("/plan/sessions", json={"items": ["beef", "spinach", "cheese"], "people": 2})
+    assert r.status_code == 200
+    first = r.json()
+    assert {k: v for k, v in first.items() if k != "plan_id"} == _full(["beef", "spinach", "cheese"])
+
+    r = client.patch(f"/plan/sessions/{first['plan_id']}", json={"add": ["tofu", "beef"], "remove": ["beef"]})
+    second = r.json()
+    items = ["spinach", "cheese", "tofu", "beef"]
+    assert {k: v for k, v in second.items() if k != "plan_id"} == _full(items)
+    assert second["plan_id"] != first["plan_id"]
+
+    r = client.patch(f"/plan/sessions/{second['plan_id']}", json={"remove": ["cheese", "beef"], "people": 4})
+    third = r.json()
+    assert {k: v for k, v in third.items() if k != "plan_id"} == _full(["spinach", "tofu"], people=4)
+    assert client.get(f"/plan/sessions/{third['plan_id']}").json() == third
+
+
+def test_only_the_diff_is_planned(monkeypatch):
+    plan_id = client.post("/plan/sessions", json={"items": ["beef", "spinach", "cheese", "milk"]}).json()["plan_id"]
+    planned = []
+    real_plan_item = plan_routes.plan_item
+
+    def recording(item, key):
+        planned.append(item)
+        return real_plan_item(item, key)
+    monkeypatch.setattr(plan_routes, "plan_item", recording)
+
+    client.patch(f"/plan/sessions/{plan_id}", json={"add": ["tofu"], "remove": ["milk"]})
+    assert planned == ["tofu"]
+
+
+def test_stale_ids_and_bad_removals_are_rejected():
+    plan_id = client.post("/plan/sessions", json={"items": ["beef"]}).json()["plan_id"]
+
+    r = client.patch(f"/plan/sessions/{plan_id}", json={"add": ["tofu"], "remove": ["beef", "beef"]})
+    assert r.status_code == 422
+    # nothing applied, the id still works
+    assert [i["name"] for i in client.get(f"/plan/sessions/{plan_id}").json()["inventory"]] == ["beef"]
+
+    new_id = client.patch(f"/plan/sessions/{plan_id}", json={"add": ["tofu"]}).json()["plan_id"]
+    assert client.patch(f"/plan/sessions/{plan_id}", json={"add": ["milk"]}).status_code == 404
+    assert client.get(f"/plan/sessions/{new_id}").status_code == 200
+
+
+def test_expired_sessions_are_evicted_and_reads_refresh():
+    sessions = plan_routes._SESSIONS
+    sessions.clear()
+    old_id = client.post("/plan/sessions", json={"items": ["beef"]}).json()["plan_id"]
+    read_id = client.post("/plan/sessions", json={"items": ["milk"]}).json()["plan_id"]
+    ttl = plan_routes.SESSION_TTL_SECONDS
+    ts, session = sessions[old_id]
+    sessions[old_id] = (ts - ttl - 1, session)
+    ts, session = sessions[read_id]
+    sessions[read_id] = (ts - ttl + 60, session)
+
+    # a GET counts as a use: the timestamp is refreshed
+    assert client.get(f"/plan/sessions/{read_id}").status_code == 200
+    assert sessions[read_id][0] >= ts
+
+    # storing any session drops the expired ones from the front
+    new_id = client.post("/plan/sessions", json={"items": ["tofu"]}).json()["plan_id"]
+    assert list(sessions) == [read_id, new_id]
+    assert client.get(f"/plan/sessions/{old_id}").status_code == 404
@@ -0,0 +1,37 @@
+# backend/app/tests/test_prefork.py
+import os
+import sys
+import time
+import pytest
+from backend.app.utils.prefork import PreforkServer, Worker, memory_usage
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="fork + /proc")
+
+
+def test_memory_usage_splits_shared_and_private():
+    m = memory_usage(os.getpid())
+    assert m["rss"] > 0
+    assert m["shared"] + m["private"] == pytest.approx(m["rss"], rel=0.05)
+
+
+def test_crashing_worker_is_restarted_with_backoff():
+    server = PreforkServer(workers=1)
+    pid = os.fork()
+    if pid == 0:
+        os._exit(3)
+    server.children[pid] = Worker(slot=0, pid=pid)
+    while server.children:
+        server._reap()
+        time.sleep(0.01)
+    assert server.restart_delay[0] >= 1.0
+    assert server.restart_at[0] > time.monotonic()
+
+    # a second quick death doubles the delay
+    pid = os.fork()
+    if pid == 0:
+        os._exit(3)
+    server.children[pid] = Worker(slot=0, pid=pid)
+    while server.children:
+        server._reap()
+        time.sleep(0.01)
+    assert server.restart_delay[0] >= 2.0
@@ -0,0 +1,68 @@
+# backend/app/tests/test_preprocess.py
+import io
+import numpy as np
+import pytest
+from backend.app.services.preprocess import ImagePreprocessor, downscale
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def photo(width: int, height: int, fmt: str = "JPEG", orientation: int = 0) -> bytes:
+    """Noisy image that compresses like a photo"""
+    pixels = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    img = Image.fromarray(pixels)
+    kwargs = {"quality": 95} if fmt == "JPEG" else {}
+    if orientation:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        kwargs["exif"] = exif
+    out = io.BytesIO()
+    img.save(out, fmt, **kwargs)
+    return out.getvalue()
+
+
+def test_downscale_shrinks_large_photo():
+    data = photo(3000, 2000)
+    encoded, info = downscale(data, max_dim=800, quality=80)
+    assert max(Image.open(io.BytesIO(encoded)).size) == 800
+    assert (info["width"], info["height"]) == (800, 533)
+    assert info["resized"] and len(encoded) < len(data) / 4
+    assert info["cpu_seconds"] > 0
+
+
+def test_downscale_applies_exif_orientation():
+    # orientation 6: stored landscape, displayed portrait
+    encoded, info = downscale(photo(1200, 600, orientation=6), max_dim=400, quality=80)
+    assert (info["width"], info["height"]) == (200, 400)
+    assert Image.open(io.BytesIO(encoded)).size == (200, 400)
+
+
+def test_small_image_kept_when_reencoding_does_not_help():
+    data = photo(64, 48)
+    small = io.BytesIO()
+    Image.open(io.BytesIO(data)).save(small, "JPEG", quality=20)
+    encoded, info = downscale(small.getvalue(), max_dim=800, quality=95)
+    assert encoded == small.getvalue() and not info["resized"]
+
+
+@pytest.mark.asyncio
+async def test_process_pool_reports_savings_and_falls_back():
+    preprocessor = ImagePreprocessor(max_dim=640, quality=80, workers=2, enabled=True)
+    try:
+        images = [("a.jpg", photo(2000, 1500)), ("b.png", photo(900, 900, fmt="PNG")), ("bad.jpg", b"not an image")]
+        out = await preprocessor.process(images)
+    finally:
+        preprocessor.shutdown()
+
+    assert [i.name for i in out] == ["a.jpg", "b.png", "bad.jpg"]
+    a, b, bad = out
+    assert (a.width, a.height) == (640, 480) and a.bytes_saved > 0 and a.cpu_seconds > 0
+    assert (b.width, b.height) == (640, 640) and b.data[:2] == b"\xff\xd8"
+    assert bad.data == b"not an image" and bad.bytes_saved == 0
+
+
+@pytest.mark.asyncio
+async def test_disabled_passes_through():
+    preprocessor = ImagePreprocessor(enabled=False)
+    out = await preprocessor.process([("a.jpg", b"abc")])
+    assert out[0].data == b"abc" and preprocessor._pool is None
@@ -0,0 +1,52 @@
+# backend/app/tests/test_presign_batch.py
+import sys
+from urllib.parse import urlparse, unquote
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.app.routes import presign
+
+# the s3 module the route uses (imported as app.utils.s3)
+s3 = sys.modules[presign.generate_presigned_urls.__module__]
+
+app = FastAPI()
+app.include_router(presign.router, prefix="/api")
+client = TestClient(app)
+
+FILES = [{"fileName": f"photo{i}.jpg", "fileType": "image/jpeg"} for i in range(6)]
+
+
+@pytest.fixture(autouse=True)
+def fake_credentials(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIDEXAMPLE")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret")
+    monkeypatch.setattr(s3, "_s3_client", None)
+    yield
+
+
+def test_batch_put_urls_in_request_order():
+    r = client.post("/api/presign/batch", json={"files": FILES})
+    assert r.status_code == 200
+    uploads = r.json()["uploads"]
+    assert [u["key"].rsplit("_", 1)[1] for u in uploads] == [f["fileName"] for f in FILES]
+    assert len({u["key"] for u in uploads}) == len(FILES)
+    for u in uploads:
+        assert unquote(urlparse(u["uploadUrl"]).path).endswith(u["key"])
+        assert "Signature=" in u["uploadUrl"] or "X-Amz-Signature=" in u["uploadUrl"]
+
+
+def test_batch_post_policy_covers_all_keys():
+    r = client.post("/api/presign/batch", json={"files": FILES[:3], "mode": "post"})
+    assert r.status_code == 200
+    body = r.json()
+    fields = body["post"]["fields"]
+    assert "policy" in fields
+    prefix = fields["key"].replace("${filename}", "")
+    assert prefix.startswith("uploads/") and prefix.endswith("/")
+    assert [u["key"].rsplit("_", 1)[1] for u in body["uploads"]] == [f["fileName"] for f in FILES[:3]]
+    assert all(u["key"].startswith(prefix) and u["uploadUrl"] == "" for u in body["uploads"])
+
+
+def test_batch_limits():
+    assert client.post("/api/presign/batch", json={"files": []}).status_code == 422
+    assert client.post("/api/presign/batch", json={"files": FILES * 4}).status_code == 422
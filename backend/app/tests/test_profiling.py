@@ -0,0 +1,95 @@
+# backend/app/tests/test_profiling.py
+import pstats
+import sys
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.app.routes import debug
+
+# the profiling module the debug routes use (imported as app.utils.profiling)
+profiling = sys.modules[debug.token_ok.__module__]
+
+app = FastAPI()
+app.middleware("http")(profiling.profiling_middleware)
+app.include_router(debug.router, prefix="/api")
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@app.get("/slow-sync")
+def slow_sync():
+    busy_wait(0.05)
+    return {"ok": True}
+
+
+@app.get("/slow-async")
+async def slow_async():
+    busy_wait(0.02)
+    return {"ok": True}
+
+
+client = TestClient(app)
+
+
+def test_unprofiled_without_token(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_TOKEN", "secret")
+    assert "x-profile-id" not in client.get("/slow-async").headers
+    assert "x-profile-id" not in client.get("/slow-async", headers={"X-Profile-Token": "wrong"}).headers
+    r = client.get("/slow-async", params={"profile": "sécret"})
+    assert r.status_code == 200 and "x-profile-id" not in r.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_sampled_profile_covers_threadpool_routes(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_TOKEN", "secret")
+    monkeypatch.setenv("PROFILE_INTERVAL", "0.001")
+    r = client.get("/slow-sync?profile=secret")
+    profile_id = r.headers["x-profile-id"]
+
+    listing = client.get("/api/debug/profiles", headers={"X-Profile-Token": "secret"}).json()
+    assert listing["profiles"][0]["id"] == profile_id
+    assert client.get(f"/api/debug/profiles/{profile_id}").status_code == 403
+
+    collapsed = client.get(f"/api/debug/profiles/{profile_id}?profile=secret").text
+    assert "busy_wait" in collapsed
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed.splitlines())
+
+
+def test_cprofile_mode_writes_pstats(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_TOKEN", "secret")
+    r = client.get("/slow-async", headers={"X-Profile-Token": "secret", "X-Profile-Mode": "cprofile"})
+    path = tmp_path / f"{r.headers['x-profile-id']}.pstats"
+    stats = pstats.Stats(str(path))
+    assert any(func[2] == "busy_wait" for func in stats.stats)
+    assert r.headers["x-profile-mode"] == "cprofile"
+
+
+def test_one_cprofile_session_at_a_time(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_TOKEN", "secret")
+    headers = {"X-Profile-Token": "secret", "X-Profile-Mode": "cprofile"}
+    # another request's cProfile session is active on the loop
+    with profiling._cprofile_active:
+        r = client.get("/slow-async", headers=headers)
+    assert r.headers["x-profile-mode"] == "sample"
+    assert (tmp_path / f"{r.headers['x-profile-id']}.collapsed").exists()
+
+    r = client.get("/slow-async", headers=headers)
+    assert r.headers["x-profile-mode"] == "cprofile"
+
+
+def test_continuous_sampling(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.delenv("PROFILE_TOKEN", raising=False)
+    monkeypatch.setenv("PROFILE_SAMPLE_RATE", "1")
+    monkeypatch.setenv("PROFILE_KEEP", "2")
+    for _ in range(3):
+        assert "x-profile-id" in client.get("/slow-async").headers
+    assert len(list(tmp_path.iterdir())) == 2
@@ -0,0 +1,42 @@
+# backend/app/tests/test_recipe_index.py
+from backend.app.services import recipes_llm
+from backend.app.services.recipe_index import recipe_index
+
+
+def test_search_ranks_full_coverage_by_carbon_score():
+    pantry = ["pasta", "tomato", "garlic", "herbs", "mushrooms", "milk", "cheddar"]
+    matches = recipe_index.search(pantry)
+    assert [m.recipe.id for m in matches] == ["curated-pasta-pomodoro", "curated-mushroom-pasta"]
+    assert all(m.coverage == 1.0 and not m.missing for m in matches)
+
+
+def test_search_partial_coverage_and_flags():
+    matches = recipe_index.search(["eggs", "spinach"], min_coverage=0.5, limit=10)
+    ids = [m.recipe.id for m in matches]
+    assert ids[0] == "curated-spinach-omelette"
+    assert matches[0].missing == ["cheese"]
+
+    vegan = recipe_index.search(["eggs", "spinach", "potatoes", "onions"], flags=["vegan"], min_coverage=0.5)
+    assert [m.recipe.id for m in vegan] == ["curated-potato-hash"]
+
+
+def test_generate_uses_curated_fast_path(monkeypatch):
+    recipes_llm._cache_clear()
+
+    def no_llm(ctx):
+        raise AssertionError("LLM should not be called")
+
+    monkeypatch.setattr(recipes_llm, "_call_llm_strict_json", no_llm)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    ctx = recipes_llm.LLMContext(
+        pantry=["lentils", "onion", "carrots", "garlic", "tomatoes", "chickpeas", "ginger", "spices"],
+        people=4,
+        flags=["vegan"],
+    )
+    out = recipes_llm.generate(ctx)
+    recipes_llm._cache_clear()
+
+    assert {r.source for r in out} == {"curated"}
+    assert {r.id for r in out} == {"curated-lentil-soup", "curated-chickpea-curry"}
+    assert all(r.servings == 4 for r in out)
@@ -0,0 +1,79 @@
+# backend/app/tests/test_recipes_near_cache.py
+import json
+import pytest
+from backend.app.services import recipes_llm
+
+
+@pytest.fixture(autouse=True)
+def clean_cache(monkeypatch):
+    recipes_llm._cache_clear()
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    yield
+    recipes_llm._cache_clear()
+
+
+def _fake_llm(calls):
+    def fake_call(ctx):
+        calls["n"] += 1
+        return json.dumps({"recipes": [{
+            "id": "stir-fry",
+            "title": "Tofu Stir-fry",
+            "servings": ctx.people,
+            "ingredients": [
+                {"name": "tofu", "quantity": 200, "unit": "g"},
+                {"name": "spinach", "quantity": 100, "unit": "g"},
+                {"name": "salt"},
+            ],
+            "steps": [{"number": 1, "text": "fry"}],
+            "source": "llm",
+        }]})
+    return fake_call
+
+
+def test_overlapping_pantry_reuses_and_rescales(monkeypatch):
+    calls = {"n": 0}
+    monkeypatch.setattr(recipes_llm, "_call_llm_strict_json", _fake_llm(calls))
+
+    first = recipes_llm.LLMContext(pantry=["tofu", "spinach", "rice"], people=2, flags=["vegan"])
+    recipes_llm.generate(first)
+
+    # extra spice, no vegan flag, more people: same recipes still apply
+    second = recipes_llm.LLMContext(pantry=["Tofu", "spinach", "cumin"], people=4, flags=[])
+    out = recipes_llm.generate(second)
+
+    assert calls["n"] == 1
+    assert out[0].source == "near-cache"
+    assert out[0].servings == 4
+    assert out[0].ingredients[0].quantity == 400
+    assert out[0].ingredients[2].quantity is None
+
+
+def test_missing_ingredient_or_stricter_flags_miss(monkeypatch):
+    calls = {"n": 0}
+    monkeypatch.setattr(recipes_llm, "_call_llm_strict_json", _fake_llm(calls))
+
+    recipes_llm.generate(recipes_llm.LLMContext(pantry=["tofu", "spinach"], people=2, flags=[]))
+    recipes_llm.generate(recipes_llm.LLMContext(pantry=["tofu", "rice"], people=2, flags=[]))
+    recipes_llm.generate(recipes_llm.LLMContext(pantry=["tofu", "spinach", "kale"], people=2, flags=["vegan"]))
+
+    assert calls["n"] == 3
+
+
+def test_expired_larger_entry_is_evicted_and_smaller_one_wins():
+    def recipe(rid, names):
+        return recipes_llm.Recipe.model_validate({
+            "id": rid, "title": rid, "servings": 2,
+            "ingredients": [{"name": n, "quantity": 100, "unit": "g"} for n in names],
+            "steps": [{"number": 1, "text": "cook"}], "source": "llm",
+        })
+
+    ctx = recipes_llm.LLMContext(pantry=["tofu", "spinach"], people=2, flags=[])
+    recipes_llm._cache_set("big", [recipe("big", ["tofu", "spinach"])], ctx)
+    recipes_llm._cache_set("small", [recipe("small", ["tofu"])], ctx)
+    ts, recipes = recipes_llm._CACHE["big"]
+    recipes_llm._CACHE["big"] = (ts - recipes_llm.TTL_SECONDS - 1, recipes)
+
+    out = recipes_llm._near_cache_get(ctx)
+
+    assert [r.id for r in out] == ["small"]
+    assert "big" not in recipes_llm._CACHE and "big" not in recipes_llm._NEAR_ENTRIES
@@ -0,0 +1,85 @@
+# backend/app/tests/test_recipes_parallel.py
+import json
+import sys
+import threading
+from backend.app.services import recipes_llm
+from backend.app.shared.models.recipe import LLMContext
+
+CTX = LLMContext(pantry=["kohlrabi", "quinoa", "leeks"], people=2, flags=[])
+
+
+def _reply(title, ingredients, servings=2):
+    return json.dumps({"recipes": [{
+        "id": "string",
+        "title": title,
+        "servings": servings,
+        "ingredients": [{"name": n} for n in ingredients],
+        "steps": [{"number": 1, "text": "Cook."}],
+        "source": "llm",
+    }]})
+
+
+REPLIES = {
+    recipes_llm.DIVERSITY_HINTS[0]: _reply("Kohlrabi Skillet", ["kohlrabi", "leeks"]),
+    recipes_llm.DIVERSITY_HINTS[1]: _reply("Leek Soup", ["leeks", "quinoa"]),
+    recipes_llm.DIVERSITY_HINTS[2]: _reply("kohlrabi  skillet", ["kohlrabi"]),        # same title
+    recipes_llm.DIVERSITY_HINTS[3]: _reply("Roast Leeks", ["Quinoa", "leeks"]),       # same ingredients
+}
+
+
+def _setup(monkeypatch, reply):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(recipes_llm, "LLM_PARALLEL_RECIPES", 4)
+    monkeypatch.setattr(recipes_llm, "_call_llm_strict_json", reply)
+    # a breaker of its own, so failures here cannot open the shared one
+    resilience = sys.modules[recipes_llm.dependency.__module__]
+    monkeypatch.setattr(recipes_llm, "OPENAI", resilience.Dependency("openai", hedge=False))
+    recipes_llm._cache_clear()
+
+
+def test_completions_run_concurrently_and_are_deduped(monkeypatch):
+    barrier = threading.Barrier(4, timeout=5)
+    hints = []
+
+    def reply(ctx, hint=None):
+        hints.append(hint)
+        barrier.wait()  # only passes if all four are in flight at once
+        return REPLIES[hint]
+    _setup(monkeypatch, reply)
+
+    out = recipes_llm.generate(CTX)
+    assert sorted(hints) == sorted(REPLIES)
+    assert [r.title for r in out] == ["Kohlrabi Skillet", "Leek Soup"]
+    assert len({r.id for r in out}) == 2
+    assert recipes_llm._cache_get(recipes_llm._key(CTX)) == out
+
+
+def test_failed_and_invalid_completions_keep_the_rest(monkeypatch):
+    def reply(ctx, hint=None):
+        if hint == recipes_llm.DIVERSITY_HINTS[0]:
+            raise TimeoutError("slow")
+        if hint == recipes_llm.DIVERSITY_HINTS[1]:
+            return _reply("Bad", ["leeks"], servings=0)
+        return REPLIES[hint]
+    _setup(monkeypatch, reply)
+
+    out = recipes_llm.generate(CTX)
+    assert [r.title for r in out] == ["kohlrabi  skillet", "Roast Leeks"]
+    assert all(r.source == "llm" for r in out)
+    # a partial answer is served but not cached
+    assert recipes_llm._cache_get(recipes_llm._key(CTX)) is None
+
+
+def test_all_completions_failing_falls_back(monkeypatch):
+    def reply(ctx, hint=None):
+        raise RuntimeError("down")
+    _setup(monkeypatch, reply)
+
+    out = recipes_llm.generate(CTX)
+    assert out and all(r.source in ("fallback", "curated") for r in out)
+
+
+def test_prompt_asks_for_one_recipe_per_hint():
+    prompt = recipes_llm._build_prompt(CTX, recipes_llm.DIVERSITY_HINTS[1])
+    assert "Exactly 1 recipe, a soup, stew or curry." in prompt
+    assert "Max 3 recipes." in recipes_llm._build_prompt(CTX)
@@ -0,0 +1,68 @@
+# backend/app/tests/test_recipes_stream.py
+import json
+from backend.app.services import recipes_llm
+
+
+def _recipe(i: int) -> dict:
+    return {
+        "id": f"r{i}",
+        "title": f"Recipe {i} {{with braces}} and \"quotes\"",
+        "servings": 2,
+        "ingredients": [{"name": "tofu"}],
+        "steps": [{"number": 1, "text": "cook [gently]"}],
+        "source": "llm",
+    }
+
+
+def _chunks(text: str, size: int = 7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_parser_emits_each_recipe_when_it_closes():
+    doc = json.dumps({"recipes": [_recipe(1), _recipe(2), _recipe(3)]})
+    first = json.dumps(_recipe(1))
+    cut = doc.index(first) + len(first)
+    parser = recipes_llm._RecipeStreamParser()
+    # the first recipe is available before the rest of the document arrives
+    assert [o["id"] for o in parser.feed(doc[:cut])] == ["r1"]
+
+    parser = recipes_llm._RecipeStreamParser()
+    all_ids = [o["id"] for c in _chunks(doc) for o in parser.feed(c)]
+    assert all_ids == ["r1", "r2", "r3"]
+
+
+def test_generate_stream_skips_invalid_and_caches(monkeypatch):
+    recipes_llm._cache_clear()
+    bad = dict(_recipe(2), servings=0)
+    doc = json.dumps({"recipes": [_recipe(1), bad, _recipe(3)]})
+    calls = {"n": 0}
+
+    def fake_stream(ctx):
+        calls["n"] += 1
+        return iter(_chunks(doc))
+
+    monkeypatch.setattr(recipes_llm, "_stream_llm_chunks", fake_stream)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    ctx = recipes_llm.LLMContext(pantry=["tofu"], people=2, flags=[])
+    first = [r.id for r in recipes_llm.generate_stream(ctx)]
+    second = [r.id for r in recipes_llm.generate(ctx)]
+
+    assert first == ["r1", "r3"]
+    assert second == first
+    assert calls["n"] == 1
+
+
+def test_generate_stream_falls_back_on_error(monkeypatch):
+    recipes_llm._cache_clear()
+
+    def broken_stream(ctx):
+        raise RuntimeError("boom")
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(recipes_llm, "_stream_llm_chunks", broken_stream)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    ctx = recipes_llm.LLMContext(pantry=["eggs"], people=1, flags=[])
+    out = list(recipes_llm.generate_stream(ctx))
+    assert [r.source for r in out] == ["fallback"] * 3
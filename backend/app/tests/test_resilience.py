@@ -0,0 +1,208 @@
+# backend/app/tests/test_resilience.py
+import asyncio
+import sys
+import threading
+import time
+import pytest
+from botocore.exceptions import ClientError
+from backend.app.services import recipes_llm
+from backend.app.services.rekog import RekognitionService
+from backend.app.shared.models.recipe import LLMContext
+from backend.app.utils import resilience
+from backend.app.utils.resilience import CircuitBreaker, CircuitOpenError, Dependency
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def warmed(name: str, **kwargs) -> Dependency:
+    """A dependency with enough fast samples to start hedging at its min delay"""
+    dep = Dependency(name, hedge_ratio=1.0, hedge_min_delay=0.05, **kwargs)
+    for _ in range(resilience.HEDGE_MIN_SAMPLES):
+        dep.latency.add(0.01)
+    dep.calls = 10
+    return dep
+
+
+def slow_then_fast():
+    calls = []
+    lock = threading.Lock()
+
+    def fn():
+        with lock:
+            calls.append(1)
+            n = len(calls)
+        if n == 1:
+            time.sleep(0.5)
+            return "slow"
+        return "fast"
+    return fn, calls
+
+
+def test_breaker_opens_probes_and_closes():
+    clock = Clock()
+    breaker = CircuitBreaker("t-breaker", failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now = 10.5
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()  # one probe at a time
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now = 21
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_open_circuit_fails_fast_and_client_errors_do_not_trip():
+    dep = Dependency("t-fail-fast", failure_threshold=1, hedge=False)
+
+    class BadRequest(Exception):
+        status_code = 400
+
+    def bad_request():
+        raise BadRequest()
+    with pytest.raises(BadRequest):
+        dep.call(bad_request)
+    assert dep.breaker.state == "closed"
+
+    def boom():
+        raise ConnectionError("down")
+    with pytest.raises(ConnectionError):
+        dep.call(boom)
+    called = []
+    with pytest.raises(CircuitOpenError):
+        dep.call(lambda: called.append(1))
+    assert not called
+    assert resilience.DEPENDENCY_CALLS.value(dependency="t-fail-fast", outcome="rejected") == 1
+
+
+def test_deadline_timeouts_do_not_trip_the_breaker():
+    deadline = sys.modules[resilience.expired.__module__]
+    dep = Dependency("t-deadline", failure_threshold=1, hedge=False)
+
+    def client_timeout():
+        time.sleep(0.06)
+        raise TimeoutError("Request timed out.")  # no status code, like openai.APITimeoutError
+    for _ in range(3):
+        with deadline.deadline_scope(0.05):
+            with pytest.raises(TimeoutError):
+                dep.call(client_timeout)
+    assert dep.breaker.state == "closed" and dep.breaker.failures == 0
+    assert resilience.DEPENDENCY_CALLS.value(dependency="t-deadline", outcome="deadline") == 3
+    assert len(dep.latency) == 0
+
+    # the same error with budget left is a real failure
+    with pytest.raises(TimeoutError):
+        dep.call(client_timeout)
+    assert dep.breaker.state == "open"
+
+
+def test_short_client_deadlines_leave_openai_breaker_closed(monkeypatch):
+    deadline = sys.modules[recipes_llm.degrade.__module__]
+    dep = Dependency("t-openai-deadline", failure_threshold=1, hedge=False)
+    monkeypatch.setattr(recipes_llm, "OPENAI", dep)
+    monkeypatch.setattr(recipes_llm, "LLM_MIN_BUDGET", 0.0)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    def slow_llm(ctx):
+        time.sleep(0.06)
+        raise TimeoutError("Request timed out.")
+    monkeypatch.setattr(recipes_llm, "_call_llm_strict_json", slow_llm)
+
+    recipes_llm._cache_clear()
+    with deadline.deadline_scope(0.05) as degraded:
+        out = recipes_llm.generate(LLMContext(pantry=["kohlrabi", "quinoa", "leeks"], people=2, flags=[]))
+    recipes_llm._cache_clear()
+    assert out and all(r.source in ("fallback", "curated") for r in out)
+    assert degraded == [{"stage": "recipes", "reason": "llm timed out"}]
+    assert dep.breaker.state == "closed"
+
+
+def test_environment_overrides_dependency_defaults(monkeypatch):
+    monkeypatch.setenv("T_ENV_HEDGE_MIN_DELAY", "0.75")
+    monkeypatch.setenv("T_ENV_BREAKER_FAILURES", "9")
+    dep = Dependency("t-env", hedge_min_delay=2.0, failure_threshold=3, hedge_ratio=0.2)
+    assert (dep.hedge_min_delay, dep.breaker.failure_threshold, dep.hedge_ratio) == (0.75, 9, 0.2)
+
+
+def test_no_hedging_without_latency_history():
+    dep = Dependency("t-cold", hedge_ratio=1.0)
+    assert dep.hedge_delay() is None
+    assert dep.call(lambda: 42) == 42
+
+
+def test_sync_hedge_first_reply_wins():
+    dep = warmed("t-sync")
+    fn, calls = slow_then_fast()
+    start = time.perf_counter()
+    assert dep.call(fn) == "fast"
+    assert time.perf_counter() - start < 0.4
+    assert len(calls) == 2
+    assert resilience.HEDGES.value(dependency="t-sync", result="won") == 1
+
+
+def test_hedges_are_capped_by_ratio():
+    dep = warmed("t-ratio")
+    dep.hedge_ratio = 0.0
+    fn, calls = slow_then_fast()
+    assert dep.call(fn) == "slow"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_hedge_first_reply_wins():
+    dep = warmed("t-async")
+    fn, calls = slow_then_fast()
+    start = time.perf_counter()
+    assert await dep.acall(fn) == "fast"
+    assert time.perf_counter() - start < 0.4
+    assert resilience.HEDGES.value(dependency="t-async", result="sent") == 1
+    await asyncio.sleep(0.5)  # the loser still finishes and is recorded
+    assert max(dep.latency._values) >= 0.5
+
+
+def test_generate_falls_back_when_openai_circuit_is_open(monkeypatch):
+    dep = Dependency("t-openai", failure_threshold=1, hedge=False)
+    dep.breaker.record_failure()
+    monkeypatch.setattr(recipes_llm, "OPENAI", dep)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    def should_not_call(ctx):
+        raise AssertionError("LLM called with the circuit open")
+    monkeypatch.setattr(recipes_llm, "_call_llm_strict_json", should_not_call)
+
+    recipes_llm._cache_clear()
+    out = recipes_llm.generate(LLMContext(pantry=["kohlrabi", "quinoa", "leeks"], people=2, flags=[]))
+    recipes_llm._cache_clear()
+    assert out and all(r.source in ("fallback", "curated") for r in out)
+
+
+@pytest.mark.asyncio
+async def test_rekognition_client_errors_are_not_retried():
+    calls = []
+
+    class BadImageClient:
+        def detect_labels(self, **kwargs):
+            calls.append(kwargs)
+            raise ClientError(
+                {"Error": {"Code": "InvalidImageFormatException", "Message": "bad"},
+                 "ResponseMetadata": {"HTTPStatusCode": 400}},
+                "DetectLabels",
+            )
+
+    service = RekognitionService()
+    service.rekognition = BadImageClient()
+    with pytest.raises(ClientError):
+        await service._detect_image_with_retry({"Bytes": b"x"}, "x.jpg")
+    assert len(calls) == 1
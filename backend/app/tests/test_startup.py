@@ -0,0 +1,16 @@
+# backend/app/tests/test_startup.py
+import os
+from backend.benchmarks.startup import measure_import
+
+# Cold `import app.main` in a fresh interpreter, in seconds
+IMPORT_BUDGET = float(os.getenv("STARTUP_IMPORT_BUDGET", "2.5"))
+
+
+def test_cold_import_of_app_main_stays_in_budget():
+    report = measure_import("app.main")
+    assert report["heavy"] == [], f"imported eagerly: {report['heavy']}"
+    slowest = sorted(report["modules"], key=lambda m: -m["self_ms"])[:5]
+    assert report["seconds"] <= IMPORT_BUDGET, (
+        f"import app.main took {report['seconds']:.2f}s (budget {IMPORT_BUDGET}s); slowest: "
+        + ", ".join(f"{m['module']} {m['self_ms']:.0f}ms" for m in slowest)
+    )
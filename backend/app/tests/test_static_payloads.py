@@ -0,0 +1,69 @@
+# backend/app/tests/test_static_payloads.py
+import hashlib
+import json
+import os
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from backend.app.routes import recipes
+from backend.app.services import recipes_llm
+from backend.app.utils.static_payloads import StaticPayload
+
+app = FastAPI()
+app.include_router(recipes.router)
+client = TestClient(app)
+
+
+def test_demo_recipe_etag_and_304():
+    r = client.get("/recipes")
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    assert r.json()["id"] == "demo-egg-spinach-wrap"
+
+    r2 = client.get("/recipes", headers={"If-None-Match": etag})
+    assert r2.status_code == 304
+    assert r2.headers["etag"] == etag
+    assert r2.content == b""
+
+
+def test_payload_reloads_when_file_changes(tmp_path):
+    p = tmp_path / "payload.json"
+    p.write_text(json.dumps({"v": 1}))
+    payload = StaticPayload(p, check_interval=0)
+    first = payload.get().etag
+    assert payload.value == {"v": 1}
+
+    p.write_text(json.dumps({"v": 22}))
+    os.utime(p, ns=(0, 10**18))
+    assert payload.get().value == {"v": 22}
+    assert payload.etag != first
+
+
+def test_demo_generate_returns_a_copy():
+    recipes_llm._cache_clear()
+    ctx = recipes_llm.LLMContext(pantry=["egg"], people=2, flags=[])
+    out = recipes_llm.generate(ctx, demo=True)
+    out[0].title = "changed"
+    out[0].ingredients.clear()
+
+    again = recipes_llm.generate(ctx, demo=True)
+    assert again[0].title != "changed" and again[0].ingredients
+    assert client.get("/recipes").json()["title"] != "changed"
+
+
+def test_response_etag_matches_body_across_reload(tmp_path, monkeypatch):
+    p = tmp_path / "payload.json"
+    p.write_text(json.dumps({"v": 1}))
+    payload = StaticPayload(p, check_interval=0)
+    real_matches = payload.matches
+
+    def reload_midway(*args):
+        # another request reloads the file while this response is being built
+        p.write_text(json.dumps({"v": 333}))
+        os.utime(p, ns=(0, 10**18))
+        payload.get()
+        return real_matches(*args)
+
+    monkeypatch.setattr(payload, "matches", reload_midway)
+    r = payload.response(Request({"type": "http", "headers": []}))
+    assert r.body == b'{"v":1}'
+    assert r.headers["etag"] == '"' + hashlib.sha256(r.body).hexdigest()[:32] + '"'
@@ -0,0 +1,54 @@
+# backend/app/tests/test_stub_server.py
+import threading
+import boto3
+import pytest
+from backend.benchmarks.stub_server import build_parser, latency_sampler, make_server
+from backend.app.services import recipes_llm
+from backend.app.shared.models.recipe import LLMContext
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    args = build_parser().parse_args(["--llm-latency", "fixed:0", "--rekognition-latency", "fixed:0"])
+    server = make_server(args, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setenv("OPENAI_API_KEY", "stub")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"{url}/v1")
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+def test_generate_goes_through_openai_compatible_stub(stub):
+    recipes_llm._cache_clear()
+    ctx = LLMContext(pantry=["kohlrabi", "quinoa", "leeks"], people=3, flags=[])
+    out = recipes_llm.generate(ctx)
+    recipes_llm._cache_clear()
+    assert len(out) == 3
+    assert all(r.source == "llm" and r.servings == 3 for r in out)
+    assert all({i.name for i in r.ingredients} <= set(ctx.pantry) for r in out)
+
+
+def test_streamed_completion(stub):
+    ctx = LLMContext(pantry=["kohlrabi", "quinoa", "leeks"], people=2, flags=[])
+    recipes = list(recipes_llm._iter_stream_recipes(recipes_llm._stream_llm_chunks(ctx)))
+    assert len(recipes) == 3
+
+
+def test_rekognition_protocol(stub):
+    client = boto3.client(
+        "rekognition", endpoint_url=stub, region_name="us-east-2",
+        aws_access_key_id="stub", aws_secret_access_key="stub",
+    )
+    labels = client.detect_labels(Image={"S3Object": {"Bucket": "smart-fridge", "Name": "k.jpg"}})["Labels"]
+    assert labels and all(80 <= label["Confidence"] <= 100 for label in labels)
+
+
+def test_latency_specs():
+    assert latency_sampler("fixed:0.25")() == 0.25
+    assert 0.1 <= latency_sampler("uniform:0.1,0.2")() <= 0.2
+    assert latency_sampler("lognormal:1.0,0.5")() > 0
+    with pytest.raises(ValueError):
+        latency_sampler("weibull:1")
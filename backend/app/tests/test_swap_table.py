@@ -0,0 +1,53 @@
+# backend/app/tests/test_swap_table.py
+import numpy as np
+import pytest
+from backend.app.services.carbon_table import CarbonTable
+from backend.app.utils.swap_table import build_swap_table
+
+
+TABLE = CarbonTable([
+    {"name": "beef, mince", "co2e_kg_per_kg": 60.0, "category": "meat/poultry", "tag": "high"},
+    {"name": "pork, chop", "co2e_kg_per_kg": 12.0, "category": "meat/poultry", "tag": "medium"},
+    {"name": "chicken, breast", "co2e_kg_per_kg": 9.0, "category": "meat/poultry", "tag": "medium"},
+    {"name": "lamb, leg", "co2e_kg_per_kg": 55.0, "category": "meat/poultry", "tag": "high"},
+    {"name": "tofu, firm", "co2e_kg_per_kg": 1.0, "category": "prepared/preserved foods", "tag": "low"},
+    {"name": "mystery", "co2e_kg_per_kg": 0.0, "category": "other", "tag": "unknown"},
+])
+# beef is embedded close to pork, far from chicken
+EMB = np.array([
+    [1.0, 0.0, 0.0],
+    [0.9, 0.1, 0.0],
+    [0.0, 1.0, 0.0],
+    [0.7, 0.3, 0.0],
+    [0.0, 0.0, 1.0],
+    [0.3, 0.3, 0.3],
+])
+
+
+def test_swaps_stay_in_category_and_rank_by_similarity_and_delta():
+    table = build_swap_table(TABLE, EMB)
+
+    beef = table["beef, mince"]
+    assert [s.to_key for s in beef] == ["pork, chop", "chicken, breast"]
+    assert beef[0].to_item == "pork"
+    assert round(beef[0].reduction) == 80
+    assert "80% lower" in beef[0].why
+
+    # lamb -> beef is not a reduction, and tofu is in another category
+    assert "beef, mince" not in [s.to_key for s in table["lamb, leg"]]
+    assert "tofu, firm" not in table
+    assert "mystery" not in table
+
+
+def test_fallback_swaps_keep_their_reduction(monkeypatch):
+    from backend.app.routes import plan as plan_routes
+    # no precomputed swap, so plan_item falls back to suggest_swap
+    monkeypatch.setattr(plan_routes, "get_swap_table", lambda: {})
+    # "tofu" has an exact row, so the reduction does not depend on the embedding tier
+    monkeypatch.setattr(plan_routes, "suggest_swap", lambda item, category, co2e: ("tofu", "Lower footprint"))
+    key = plan_routes.lookup_key("beef")
+    _, swap = plan_routes.plan_item("beef", key)
+    tofu = plan_routes.CARBON_TABLE.co2e(plan_routes.CARBON_TABLE.row(plan_routes.lookup_keys(["tofu"], use_embedding=False)[0]))
+    beef = plan_routes.CARBON_TABLE.co2e(plan_routes.CARBON_TABLE.row(key))
+    assert swap.to == "tofu"
+    assert swap.reduction == pytest.approx(100 * (1 - tofu / beef))
@@ -0,0 +1,50 @@
+# backend/app/tests/test_vision_detect.py
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.app.routes import analyze
+from backend.app.models.analyze import AnalyzeResponse, VisionDetectResponse
+
+app = FastAPI()
+app.include_router(analyze.router)
+client = TestClient(app)
+
+
+def test_vision_detect_fast_response_matches_model(monkeypatch):
+    async def fake_detect(s3_keys, bucket):
+        return [
+            analyze.DetectionResult(name="egg", count=2, confidence=0.97),
+            analyze.DetectionResult(name="baby spinach", count=1, confidence=0.91),
+        ]
+
+    monkeypatch.setattr(analyze.rekognition_service, "detect_food_items", fake_detect)
+    r = client.post("/vision/detect", json={"keys": ["a.jpg"]})
+    assert r.status_code == 200
+
+    body = VisionDetectResponse(**r.json())
+    assert [i.name for i in body.items] == ["eggs", "spinach"]
+    assert body.processing_stats.images_processed == 1
+
+
+def test_analyze_fast_response_matches_model(monkeypatch):
+    async def fake_detect(s3_keys, bucket):
+        return [analyze.DetectionResult(name="egg", count=2, confidence=0.97)]
+
+    def fake_cards(names, people):
+        return [{
+            "id": "omelette", "title": "Omelette", "description": "Eggs, folded",
+            "ingredients": names, "instructions": ["cook"], "carbonImpact": "low",
+            "prepTime": 10, "servings": people, "imageUrl": "/api/placeholder/400/300",
+        }]
+
+    monkeypatch.setattr(analyze.rekognition_service, "detect_food_items", fake_detect)
+    monkeypatch.setattr(analyze, "recipe_cards", fake_cards)
+    r = client.post("/analyze", json={
+        "imageKeys": ["a.jpg"], "peopleCount": 3, "inventory": [{"name": "rice"}],
+    })
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/json"
+
+    body = AnalyzeResponse(**r.json())
+    assert [i.name for i in body.inventory] == ["eggs", "rice"]
+    assert body.recipes[0].servings == 3
+    assert body.degraded == []
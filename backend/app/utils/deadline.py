@@ -0,0 +1,84 @@
+"""
+Per-request latency budget.
+
+The analyze endpoints open a `deadline_scope` covering the whole request.
+The budget is ANALYZE_DEADLINE seconds, or the client's `X-Deadline-Ms`
+header if that is sooner. The deadline lives in a contextvar, so it
+follows the request through awaits, asyncio tasks and `asyncio.to_thread`
+without being passed down explicitly:
+
+    if not has_budget(expected_seconds):
+        degrade("recipes", "llm skipped, out of time budget")
+        ...take the cheaper path...
+
+`remaining()` is the time left (None outside a scope). `degrade` records
+that a stage took its cheaper path, and the recorded stages are returned in
+the response's `degraded` field.
+"""
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from app.utils.metrics import registry
+
+ANALYZE_DEADLINE = float(os.getenv("ANALYZE_DEADLINE", "8.0"))
+
+DEGRADED = registry.counter(
+    "smart_fridge_degraded_total", "Pipeline stages that took a cheaper path to stay within the deadline"
+)
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+_degraded: contextvars.ContextVar[Optional[List[Dict[str, str]]]] = contextvars.ContextVar(
+    "degraded", default=None
+)
+
+
+def request_budget(header_ms: Optional[str], default: float = ANALYZE_DEADLINE) -> float:
+    """Seconds allowed for a request: the configured default, shortened by a valid X-Deadline-Ms"""
+    try:
+        client = float(header_ms) / 1000 if header_ms else None
+    except ValueError:
+        client = None
+    if client is not None and client > 0:
+        return min(client, default) if default > 0 else client
+    return default
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[List[Dict[str, str]]]:
+    """Run the block with a deadline `seconds` from now (none if falsy); yields the degraded list"""
+    degraded: List[Dict[str, str]] = []
+    deadline_token = _deadline.set(time.perf_counter() + seconds if seconds else None)
+    degraded_token = _degraded.set(degraded)
+    try:
+        yield degraded
+    finally:
+        _deadline.reset(deadline_token)
+        _degraded.reset(degraded_token)
+
+
+def remaining(reserve: float = 0.0) -> Optional[float]:
+    """Seconds left before the deadline minus `reserve` (never negative), or None without a deadline"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(deadline - time.perf_counter() - reserve, 0.0)
+
+
+def has_budget(seconds: float) -> bool:
+    left = remaining()
+    return left is None or left >= seconds
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def degrade(stage: str, reason: str) -> None:
+    """Record that `stage` took a cheaper path to stay within the deadline"""
+    degraded = _degraded.get()
+    DEGRADED.inc(stage=stage)
+    if degraded is not None and not any(d["stage"] == stage and d["reason"] == reason for d in degraded):
+        degraded.append({"stage": stage, "reason": reason})
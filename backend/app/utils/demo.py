@@ -1,6 +1,11 @@
 # backend/app/utils/demo.py
 from pathlib import Path
 import json
+from app.shared.models.recipe import Recipe
+from app.utils.static_payloads import StaticPayload
+
+# Served by GET /recipes and the demo branch of recipes_llm.generate
+demo_recipe = StaticPayload(Path(__file__).parents[1] / "dev" / "fixtures" / "recipe_demo.json", Recipe)
 
 def read_fixture(rel_path: str):
     p = Path(__file__).parents[1] / rel_path
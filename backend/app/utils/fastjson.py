@@ -0,0 +1,30 @@
+import json
+from typing import Any
+from fastapi.responses import JSONResponse
+from app.utils.metrics import stage
+
+try:
+    import orjson  # optional, much faster for large dict payloads
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize plain JSON-compatible data to bytes"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response for trusted internal payloads.
+
+    Returning it from a route skips FastAPI's response_model validation and
+    jsonable_encoder pass; the dicts are written straight out with orjson
+    when it is installed. Keep `response_model=` on the route for the docs.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with stage("serialize"):
+            return dumps(content)
@@ -5,7 +5,7 @@ def suggest_swap(item: str, category: str, co2e_100g: float | None) -> tuple[str
     """
     
     # High-impact protein swaps
-    if category == "protein" and co2e_100g and co2e_100g > 5.0:
+    if category in ("protein", "meat/poultry") and co2e_100g and co2e_100g > 5.0:
         if "beef" in item.lower():
             return "lentils", "Lentils have ~95% lower carbon footprint than beef"
         elif "lamb" in item.lower():
@@ -16,7 +16,7 @@ def suggest_swap(item: str, category: str, co2e_100g: float | None) -> tuple[str
             return "nuts", "Nuts have ~70% lower carbon footprint than cheese"
     
     # Dairy swaps
-    elif category == "dairy" and co2e_100g and co2e_100g > 3.0:
+    elif category in ("dairy", "milk/eggs/substitute products") and co2e_100g and co2e_100g > 3.0:
         if "milk" in item.lower():
             return "oat milk", "Oat milk has ~60% lower carbon footprint than dairy milk"
         elif "butter" in item.lower():
@@ -0,0 +1,138 @@
+"""
+Event-loop lag monitor.
+
+A heartbeat task sleeps LOOP_LAG_INTERVAL seconds at a time and records how
+late it wakes up in `smart_fridge_event_loop_lag_seconds`; late wake-ups
+mean something ran on the loop without awaiting (boto3, sync service
+calls, file reads inside `async def`).
+
+The heartbeat alone can only report a stall after it is over, so a
+watchdog thread also watches it: once the loop has not ticked for
+LOOP_LAG_THRESHOLD seconds, the watchdog grabs the loop thread's current
+stack, i.e. the code doing the blocking, logs it and keeps the most recent
+ones for /api/debug/loop. Disable with LOOP_MONITOR=0.
+"""
+import asyncio
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Deque, Dict, Optional
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG = registry.histogram(
+    "smart_fridge_event_loop_lag_seconds",
+    "Event loop scheduling delay",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_LAG_MAX = registry.gauge(
+    "smart_fridge_event_loop_lag_max_seconds", "Largest event loop delay seen since startup"
+)
+LOOP_BLOCKED = registry.counter(
+    "smart_fridge_event_loop_blocked_total", "Event loop stalls longer than the lag threshold"
+)
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25, keep: int = 20):
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls: Deque[Dict[str, object]] = collections.deque(maxlen=keep)
+        self.max_lag = 0.0
+        self._beat = time.perf_counter()
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start monitoring the running loop; call from inside it"""
+        if self.running:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog is not None:
+            # joined off the loop, and bounded: the watchdog may be mid-capture
+            await asyncio.to_thread(self._watchdog.join, max(self.interval, self.threshold) * 2)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self._beat = now
+            lag = max(now - start - self.interval, 0.0)
+            LOOP_LAG.observe(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+                LOOP_LAG_MAX.set(lag)
+
+    def _watch(self) -> None:
+        # one capture per stall: re-armed when the heartbeat moves again
+        captured_beat = None
+        while not self._stop.wait(min(self.interval, self.threshold) / 2):
+            beat = self._beat
+            blocked_for = time.perf_counter() - beat - self.interval
+            if blocked_for < self.threshold or beat == captured_beat:
+                continue
+            captured_beat = beat
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = traceback.format_stack(frame)
+            self.stalls.append({
+                "at": time.time(),
+                "blocked_for": round(blocked_for, 3),
+                "stack": [line.rstrip() for line in stack],
+            })
+            LOOP_BLOCKED.inc()
+            logger.warning(
+                f"Event loop blocked for {blocked_for:.3f}s, loop thread is at:\n{''.join(stack[-8:])}"
+            )
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "threshold": self.threshold,
+            "max_lag": round(self.max_lag, 4),
+            "stalls": list(self.stalls),
+        }
+
+
+# Global instance
+loop_monitor = LoopLagMonitor(
+    interval=float(os.getenv("LOOP_LAG_INTERVAL", 0.1)),
+    threshold=float(os.getenv("LOOP_LAG_THRESHOLD", 0.25)),
+)
+
+
+async def start_loop_monitor() -> None:
+    if os.getenv("LOOP_MONITOR", "1") != "0":
+        loop_monitor.start()
+
+
+async def stop_loop_monitor() -> None:
+    await loop_monitor.stop()
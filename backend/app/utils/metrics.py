@@ -0,0 +1,380 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+    with stage("rekognition"):
+        ...
+
+records the block in the `smart_fridge_stage_seconds` histogram and, when
+inside an HTTP request, appends it to that response's `Server-Timing`
+header. Labels can be added while the block runs (`s.labels["result"] =
+"hit"`), which is how cache hit/miss and fallback usage are tagged.
+
+Under the prefork server every worker has its own registry. The parent sets
+METRICS_DIR, each worker writes a snapshot of its registry there every
+METRICS_FLUSH_INTERVAL seconds (and when it exits), and `/metrics` merges
+all snapshots, so a scrape sees the whole server whichever worker answers
+it. Counters and histograms are summed, including those of workers that
+have exited, so totals never go backwards when a worker is replaced.
+Gauges are per process: they get a `worker` label and only live workers
+report them. A dead worker's counters and histograms are folded into one
+retired.json on the next scrape and its own file is deleted, so restarts do
+not pile up files that every scrape has to read.
+"""
+import bisect
+import contextvars
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            values = [[list(map(list, k)), v] for k, v in self._values.items()]
+        return {"kind": self.kind, "help": self.help, "values": values}
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_fmt_labels(k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(super().snapshot(), buckets=list(self.buckets))
+
+    def add_row(self, row: List[float], **labels) -> None:
+        """Add another process's bucket counts and sum for these labels"""
+        key = _label_key(labels)
+        with self._lock:
+            mine = self._values.get(key)
+            if mine is None:
+                mine = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, v in enumerate(row):
+                mine[i] += v
+
+    def count(self, **labels) -> int:
+        row = self._values.get(_label_key(labels))
+        return int(sum(row[:-1])) if row else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = self.header()
+        for key, row in items:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets + (float("inf"),), row[:-1]):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, (('le', _fmt_value(bound)),))} {_fmt_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {_fmt_value(row[-1])}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {_fmt_value(cumulative)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, **kwargs)
+            return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get_or_create(Counter, name, help)
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._get_or_create(Gauge, name, help)
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Plain-data copy of every metric, for merging across processes"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {m.name: m.snapshot() for m in metrics}
+
+    def merge(self, snapshot: Dict[str, Dict[str, Any]], worker: str, live: bool = True) -> None:
+        """Add a worker's snapshot: counters and histograms sum, gauges are labelled by worker"""
+        for name, m in snapshot.items():
+            if m["kind"] == "gauge":
+                if not live:
+                    continue
+                gauge = self.gauge(name, m["help"])
+                for key, v in m["values"]:
+                    gauge.set(v, **dict(key), worker=worker)
+            elif m["kind"] == "counter":
+                counter = self.counter(name, m["help"])
+                for key, v in m["values"]:
+                    counter.inc(v, **dict(key))
+            elif m["kind"] == "histogram":
+                histogram = self.histogram(name, m["help"], buckets=m["buckets"])
+                for key, row in m["values"]:
+                    histogram.add_row(row, **dict(key))
+
+
+# Global instance
+registry = Registry()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read_snapshot(path: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, data: Any) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _retire(directory: str, dead: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Fold dead workers' snapshots into retired.json, delete them and return the retired totals"""
+    retired_path = os.path.join(directory, "retired.json")
+    if not dead:
+        return _read_snapshot(retired_path)
+    # every worker scrapes, so two could otherwise fold the same file twice
+    with open(os.path.join(directory, "retired.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        retired = Registry()
+        previous = _read_snapshot(retired_path)
+        if previous is not None:
+            retired.merge(previous, worker="retired", live=False)
+        folded = []
+        for path in dead:
+            snapshot = _read_snapshot(path)
+            if snapshot is None and not os.path.exists(path):
+                continue  # already folded by another worker
+            if snapshot is not None:
+                retired.merge(snapshot, worker="retired", live=False)
+            folded.append(path)
+        totals = retired.snapshot()
+        if folded:
+            _write_json(retired_path, totals)
+            for path in folded:
+                os.unlink(path)
+    return totals
+
+
+def write_snapshot(directory: str, source: Optional[Registry] = None) -> None:
+    """Write this process's registry to `directory` as worker-<slot>-<pid>.json (atomically)"""
+    slot = os.getenv("PREFORK_WORKER", "0")
+    _write_json(os.path.join(directory, f"worker-{slot}-{os.getpid()}.json"), (source or registry).snapshot())
+
+
+def render_all(directory: Optional[str] = None) -> str:
+    """Prometheus text for the whole server: this registry alone, or every worker's merged"""
+    directory = directory or os.getenv("METRICS_DIR")
+    if not directory:
+        return registry.render()
+    write_snapshot(directory)
+    merged = Registry()
+    dead = []
+    for path in sorted(glob.glob(os.path.join(directory, "worker-*-*.json"))):
+        _, slot, pid = os.path.basename(path)[:-len(".json")].split("-")
+        if not _pid_alive(int(pid)):
+            dead.append(path)
+            continue
+        snapshot = _read_snapshot(path)
+        if snapshot is not None:
+            merged.merge(snapshot, worker=slot)
+    retired = _retire(directory, dead)
+    if retired is not None:
+        merged.merge(retired, worker="retired", live=False)
+    return merged.render()
+
+
+def start_snapshot_writer(directory: str, interval: float) -> threading.Thread:
+    """Keep this worker's snapshot in `directory` fresh for the other workers' scrapes"""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                write_snapshot(directory)
+            except OSError as e:
+                print("metrics: could not write snapshot:", repr(e))
+
+    thread = threading.Thread(target=run, name="metrics-snapshot", daemon=True)
+    thread.start()
+    return thread
+
+STAGE_SECONDS = registry.histogram(
+    "smart_fridge_stage_seconds", "Time spent in each pipeline stage"
+)
+HTTP_SECONDS = registry.histogram(
+    "smart_fridge_http_request_seconds", "HTTP request latency by route"
+)
+RECIPE_SOURCES = registry.counter(
+    "smart_fridge_recipe_answers_total", "Recipe answers by source (cache, llm, fallback, curated, ...)"
+)
+FALLBACKS = registry.counter(
+    "smart_fridge_fallbacks_total", "Pipeline components that fell back to defaults"
+)
+
+# Server-Timing entries for the current request: [(name, seconds)]
+_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "server_timings", default=None
+)
+
+
+class _Stage:
+    __slots__ = ("name", "labels")
+
+    def __init__(self, name: str, labels: Dict[str, str]):
+        self.name = name
+        self.labels = labels
+
+
+@contextmanager
+def stage(name: str, **labels) -> Iterator[_Stage]:
+    """Time a pipeline stage; see module docstring"""
+    s = _Stage(name, labels)
+    start = time.perf_counter()
+    try:
+        yield s
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name, **s.labels)
+        timings = _timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: float) -> str:
+    merged: Dict[str, float] = {}
+    for name, seconds in timings:
+        merged[name] = merged.get(name, 0.0) + seconds
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in merged.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+async def timing_middleware(request, call_next):
+    """Per-request latency histogram and Server-Timing header"""
+    timings: List[Tuple[str, float]] = []
+    token = _timings.set(timings)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        _timings.reset(token)
+        route = request.scope.get("route")
+        HTTP_SECONDS.observe(
+            elapsed,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status,
+        )
+    response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    return response
@@ -0,0 +1,259 @@
+"""
+Preforking production server.
+
+The parent imports the app and loads everything read-mostly and expensive
+(the sentence-transformer, carbon embeddings, swap table, alias and recipe
+indexes) once. It then runs `gc.collect(); gc.freeze()` and forks
+`workers` children that serve one shared listening socket with uvicorn.
+Frozen objects are moved to a permanent GC generation that the collector
+never traverses, so the children do not write GC headers into the
+inherited pages and they stay shared copy-on-write.
+
+The parent supervises: a worker that exits is replaced (with backoff when
+it dies right after starting), SIGTERM/SIGINT drains all workers and
+stops, and every `rss_interval` seconds it logs each worker's RSS with the
+shared/private split from /proc/<pid>/smaps_rollup.
+
+Each worker has its own metrics registry, so the parent gives them a shared
+METRICS_DIR for registry snapshots and `/metrics` on any worker reports the
+merged totals (see app.utils.metrics). In-memory caches (recipes, near
+matches, plan sessions) are per worker and are not shared.
+"""
+import gc
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# a worker that dies sooner than this after starting is crash-looping
+MIN_HEALTHY_UPTIME = 5.0
+MAX_RESTART_DELAY = 30.0
+
+
+@dataclass
+class Worker:
+    slot: int
+    pid: int
+    started: float = field(default_factory=time.monotonic)
+
+
+def memory_usage(pid: int) -> Dict[str, int]:
+    """RSS/PSS and shared/private bytes for a process (Linux /proc), {} elsewhere"""
+    out: Dict[str, int] = {}
+    fields = {"Rss": "rss", "Pss": "pss", "Shared_Clean": "shared_clean", "Shared_Dirty": "shared_dirty",
+              "Private_Clean": "private_clean", "Private_Dirty": "private_dirty"}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in fields:
+                    out[fields[name]] = int(rest.split()[0]) * 1024
+    except OSError:
+        return out
+    out["shared"] = out.get("shared_clean", 0) + out.get("shared_dirty", 0)
+    out["private"] = out.get("private_clean", 0) + out.get("private_dirty", 0)
+    return out
+
+
+def _mb(n: int) -> str:
+    return f"{n / 2**20:.0f}MB"
+
+
+def preload() -> None:
+    """Import the app and load everything workers should share"""
+    import app.main  # noqa: F401  (routers, carbon table, normalizer, recipe index)
+    from app.routes import plan
+    plan.warm_up()
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class PreforkServer:
+    def __init__(self, app: str = "app.main:app", host: str = "0.0.0.0", port: int = 8000,
+                 workers: int = 2, rss_interval: float = 60.0, graceful_timeout: float = 30.0,
+                 log_level: str = "info"):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.rss_interval = rss_interval
+        self.graceful_timeout = graceful_timeout
+        self.log_level = log_level
+        self.sock: Optional[socket.socket] = None
+        self.children: Dict[int, Worker] = {}  # pid -> worker
+        self.restart_at: Dict[int, float] = {}  # slot -> monotonic time
+        self.restart_delay: Dict[int, float] = {}  # slot -> current backoff
+        self.stopping = False
+
+    # -- worker side -------------------------------------------------------
+
+    def _run_worker(self, slot: int) -> None:
+        import uvicorn
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        os.environ["PREFORK_WORKER"] = str(slot)
+        if "torch" in sys.modules:
+            # intra-op thread pools do not survive fork; one thread per worker
+            sys.modules["torch"].set_num_threads(int(os.getenv("PREFORK_TORCH_THREADS", "1")))
+        from app.utils.metrics import start_snapshot_writer, write_snapshot
+        metrics_dir = os.environ["METRICS_DIR"]
+        start_snapshot_writer(metrics_dir, float(os.getenv("METRICS_FLUSH_INTERVAL", "5")))
+        config = uvicorn.Config(self.app, log_level=self.log_level, lifespan="on")
+        try:
+            uvicorn.Server(config).run(sockets=[self.sock])
+        finally:
+            # counters of an exiting worker still count towards the totals
+            write_snapshot(metrics_dir)
+
+    def _spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._run_worker(slot)
+            except BaseException:
+                logger.exception(f"worker {slot} crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = Worker(slot=slot, pid=pid)
+        logger.info(f"started worker {slot} (pid {pid})")
+
+    # -- parent side -------------------------------------------------------
+
+    def _on_signal(self, signum, frame) -> None:
+        self.stopping = True
+
+    def _reap(self) -> None:
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.children.pop(pid, None)
+            if worker is None or self.stopping:
+                continue
+            uptime = time.monotonic() - worker.started
+            delay = 0.0
+            if uptime < MIN_HEALTHY_UPTIME:
+                delay = min(max(self.restart_delay.get(worker.slot, 0.5) * 2, 1.0), MAX_RESTART_DELAY)
+            self.restart_delay[worker.slot] = delay
+            self.restart_at[worker.slot] = time.monotonic() + delay
+            logger.warning(
+                f"worker {worker.slot} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)} "
+                f"after {uptime:.1f}s, restarting in {delay:.1f}s"
+            )
+
+    def _respawn_due(self) -> None:
+        now = time.monotonic()
+        for slot, at in list(self.restart_at.items()):
+            if at <= now:
+                del self.restart_at[slot]
+                self._spawn(slot)
+
+    def report_memory(self) -> Dict[int, Dict[str, int]]:
+        usage = {w.pid: memory_usage(w.pid) for w in self.children.values()}
+        for w in sorted(self.children.values(), key=lambda w: w.slot):
+            m = usage[w.pid]
+            if m:
+                logger.info(
+                    f"worker {w.slot} pid {w.pid}: rss {_mb(m['rss'])} pss {_mb(m.get('pss', 0))} "
+                    f"shared {_mb(m['shared'])} private {_mb(m['private'])}"
+                )
+        return usage
+
+    def _shutdown(self) -> None:
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self.children.pop(pid, None)
+            else:
+                time.sleep(0.1)
+        for pid in list(self.children):
+            logger.warning(f"worker pid {pid} did not stop in {self.graceful_timeout}s, killing")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.children.clear()
+
+    def serve(self) -> None:
+        # no fork-unsafe tokenizer thread pools in the children
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+        started = time.perf_counter()
+        preload()
+        self.sock = bind_socket(self.host, self.port)
+        gc.collect()
+        gc.freeze()
+        parent = memory_usage(os.getpid())
+        logger.info(
+            f"preloaded in {time.perf_counter() - started:.1f}s, parent rss {_mb(parent.get('rss', 0))}, "
+            f"{gc.get_freeze_count()} objects frozen; forking {self.workers} workers on {self.host}:{self.port}"
+        )
+
+        metrics_dir = self._metrics_dir()
+
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        for slot in range(self.workers):
+            self._spawn(slot)
+
+        next_report = time.monotonic() + self.rss_interval
+        try:
+            while not self.stopping:
+                self._reap()
+                self._respawn_due()
+                if self.rss_interval > 0 and time.monotonic() >= next_report:
+                    self.report_memory()
+                    next_report = time.monotonic() + self.rss_interval
+                time.sleep(0.2)
+        finally:
+            logger.info("stopping workers")
+            self._shutdown()
+            self.sock.close()
+            if metrics_dir is not None:
+                shutil.rmtree(metrics_dir, ignore_errors=True)
+
+    def _metrics_dir(self) -> Optional[str]:
+        """Point workers at an empty METRICS_DIR; returns it if we created it (to remove on exit)"""
+        directory = os.environ.get("METRICS_DIR")
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            for name in os.listdir(directory):
+                if name.startswith("worker-"):
+                    os.remove(os.path.join(directory, name))
+            return None
+        directory = os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="smart_fridge_metrics_")
+        return directory
+
+
+def serve(host: str = "0.0.0.0", port: int = 8000, workers: int = 2, **kwargs) -> None:
+    PreforkServer(host=host, port=port, workers=workers, **kwargs).serve()
@@ -0,0 +1,195 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it carries the admin token, either as the
+`X-Profile-Token` header or the `?profile=<token>` query flag (token from
+PROFILE_TOKEN; unset disables on-demand profiling). `X-Profile-Mode` /
+`?profile_mode=` picks the profiler:
+
+- sample (default): a background thread snapshots every thread's stack
+  each PROFILE_INTERVAL seconds and stores collapsed stacks, ready for
+  flamegraph.pl or speedscope. Covers sync routes in the threadpool and
+  shows the event loop idling in select() while awaiting I/O.
+- cprofile: deterministic cProfile around the handler, stored as pstats.
+  cProfile only sees the calling thread, so use it for async routes. That
+  thread is the event loop, so the profile also covers every other
+  request's coroutines that ran on the loop meanwhile. A thread has one
+  profile hook, so only one cProfile session runs at a time; a cprofile
+  request that arrives while one is active is sampled instead (the
+  response's `X-Profile-Mode` says which profiler ran).
+
+PROFILE_SAMPLE_RATE (default 0) additionally samples that fraction of all
+traffic continuously. Profiles are written to PROFILE_DIR, the newest
+PROFILE_KEEP are kept, and the response carries `X-Profile-Id`. Requests
+that are not profiled only pay for a header lookup (and one random() when
+a sample rate is set).
+"""
+import asyncio
+import cProfile
+import hmac
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter as StackCounter
+from typing import Dict, List, Optional
+from app.utils.metrics import registry
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("sample", "cprofile")
+EXTENSIONS = {"sample": "collapsed", "cprofile": "pstats"}
+
+PROFILES = registry.counter("smart_fridge_profiles_total", "Profiled requests by trigger and mode")
+
+# held while a cProfile session is enabled on the event loop thread
+_cprofile_active = threading.Lock()
+
+
+def profile_dir() -> str:
+    return os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "smart_fridge_profiles"))
+
+
+def token_ok(token: Optional[str]) -> bool:
+    # compared as bytes: compare_digest rejects non-ASCII str
+    expected = os.getenv("PROFILE_TOKEN")
+    return bool(expected) and token is not None and hmac.compare_digest(token.encode(), expected.encode())
+
+
+class StackSampler:
+    """Wall-clock sampling profiler producing collapsed stacks"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: StackCounter = StackCounter()
+        self.samples = 0
+        self._home = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "StackSampler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                frames = []
+                in_app = False
+                while frame is not None:
+                    code = frame.f_code
+                    in_app = in_app or code.co_filename.startswith(APP_DIR)
+                    frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                # idle pool workers are noise; the requesting thread is kept
+                # even when parked, since that is time spent waiting on I/O
+                if ident != self._home and not in_app:
+                    continue
+                frames.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(frames))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+def save_profile(data, mode: str) -> str:
+    """Store a finished profile; returns its id"""
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    profile_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    path = os.path.join(directory, f"{profile_id}.{EXTENSIONS[mode]}")
+    if mode == "cprofile":
+        data.dump_stats(path)
+    else:
+        with open(path, "w") as f:
+            f.write(data.collapsed())
+    _prune(directory, int(os.getenv("PROFILE_KEEP", 200)))
+    return profile_id
+
+
+def _prune(directory: str, keep: int) -> None:
+    paths = [os.path.join(directory, name) for name in os.listdir(directory)]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def list_profiles() -> List[Dict[str, object]]:
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    out = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        profile_id, _, ext = name.partition(".")
+        path = os.path.join(directory, name)
+        out.append({"id": profile_id, "format": ext, "bytes": os.path.getsize(path)})
+    return out
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    directory = profile_dir()
+    for ext in EXTENSIONS.values():
+        path = os.path.join(directory, f"{os.path.basename(profile_id)}.{ext}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _requested_mode(request) -> Optional[str]:
+    token = request.headers.get("x-profile-token") or request.query_params.get("profile")
+    if token is None or not token_ok(token):
+        return None
+    mode = request.headers.get("x-profile-mode") or request.query_params.get("profile_mode") or "sample"
+    return mode if mode in MODES else "sample"
+
+
+async def profiling_middleware(request, call_next):
+    """Profile requests that ask for it, plus PROFILE_SAMPLE_RATE of traffic"""
+    mode = _requested_mode(request)
+    trigger = "on-demand"
+    if mode is None:
+        rate = float(os.getenv("PROFILE_SAMPLE_RATE", 0) or 0)
+        if rate <= 0 or random.random() >= rate:
+            return await call_next(request)
+        mode, trigger = "sample", "sampled"
+
+    if mode == "cprofile" and not _cprofile_active.acquire(blocking=False):
+        mode = "sample"
+
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.disable()
+            _cprofile_active.release()
+    else:
+        profiler = StackSampler(float(os.getenv("PROFILE_INTERVAL", 0.005))).start()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.stop()
+
+    profile_id = await asyncio.to_thread(save_profile, profiler, mode)
+    PROFILES.inc(trigger=trigger, mode=mode)
+    response.headers["X-Profile-Id"] = profile_id
+    response.headers["X-Profile-Mode"] = mode
+    return response
@@ -0,0 +1,356 @@
+"""
+Hedged requests and circuit breakers for external dependencies.
+
+Each dependency (Rekognition, OpenAI) gets a `Dependency` that wraps its
+calls:
+
+* Hedging: when a call has not answered after the recent p95 latency of
+  that dependency (`<NAME>_HEDGE_QUANTILE`, floored at
+  `<NAME>_HEDGE_MIN_DELAY`), one duplicate is sent and whichever answers
+  first wins. Hedges are capped at `<NAME>_HEDGE_RATIO` of calls so a slow
+  dependency does not get double the load, and no hedging happens until
+  `HEDGE_MIN_SAMPLES` latencies have been seen.
+* Circuit breaker: after `<NAME>_BREAKER_FAILURES` consecutive failures the
+  breaker opens and calls fail immediately with `CircuitOpenError` (callers
+  go to their cache/fallback) for `<NAME>_BREAKER_RESET` seconds; then one
+  probe call is let through and its outcome closes or re-opens it. Client
+  errors (4xx other than 429) do not count as failures, and neither do
+  errors once the request's own deadline has run out (a short
+  `X-Deadline-Ms` says nothing about the dependency's health).
+
+`<NAME>_HEDGE=0` turns hedging off for a dependency. Everything is exported
+as metrics (`smart_fridge_dependency_*`, `smart_fridge_hedges_total`,
+`smart_fridge_circuit_*`).
+"""
+import asyncio
+import collections
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, TypeVar
+from app.utils.metrics import registry
+from app.utils.deadline import expired
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+DEPENDENCY_CALLS = registry.counter(
+    "smart_fridge_dependency_calls_total", "External dependency calls by outcome (ok, error, rejected)"
+)
+DEPENDENCY_SECONDS = registry.histogram(
+    "smart_fridge_dependency_attempt_seconds", "Latency of individual dependency attempts, hedges included"
+)
+HEDGES = registry.counter(
+    "smart_fridge_hedges_total", "Hedged duplicate requests sent, and how many answered first"
+)
+HEDGE_DELAY = registry.gauge(
+    "smart_fridge_hedge_delay_seconds", "Current hedge delay per dependency"
+)
+CIRCUIT_STATE = registry.gauge(
+    "smart_fridge_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)"
+)
+CIRCUIT_TRANSITIONS = registry.counter(
+    "smart_fridge_circuit_transitions_total", "Circuit breaker state changes"
+)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# hedged attempts of sync calls run here; async callers use asyncio.to_thread
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("HEDGE_THREADS", "32")), thread_name_prefix="hedge")
+
+
+class CircuitOpenError(RuntimeError):
+    """The dependency's circuit breaker is open; fail fast"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit open, retry in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def _env(name: str, key: str, default: Any) -> str:
+    return os.getenv(f"{name.upper().replace('-', '_')}_{key}", str(default))
+
+
+def is_failure(exc: BaseException) -> bool:
+    """Whether an exception says the dependency is unhealthy (not that our request was bad)"""
+    status = getattr(exc, "status_code", None)  # openai
+    response = getattr(exc, "response", None)
+    if status is None and isinstance(response, dict):  # botocore ClientError
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    if isinstance(status, int) and 400 <= status < 500 and status != 429:
+        return False
+    return True
+
+
+class LatencyWindow:
+    """The most recent `size` latencies, for quantiles"""
+
+    def __init__(self, size: int = 200):
+        self._values: Deque[float] = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._values.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def quantile(self, q: float) -> float:
+        with self._lock:
+            values = sorted(self._values)
+        if not values:
+            return 0.0
+        return values[min(int(q * len(values)), len(values) - 1)]
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(0, dependency=name)
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            logger.warning(f"{self.name} circuit {self.state} -> {state}")
+            self.state = state
+            CIRCUIT_STATE.set(_STATE_VALUES[state], dependency=self.name)
+            CIRCUIT_TRANSITIONS.inc(dependency=self.name, state=state)
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; in half-open only one probe at a time"""
+        with self._lock:
+            if self.state == OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    return False
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def retry_in(self) -> float:
+        return max(self.reset_timeout - (self.clock() - self.opened_at), 0.0)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+                self._transition(OPEN)
+
+    def release(self) -> None:
+        """Give back a half-open probe slot without an outcome (e.g. the caller went away)"""
+        with self._lock:
+            self._probing = False
+
+
+class Dependency:
+    def __init__(self, name: str, hedge: Optional[bool] = None, hedge_quantile: Optional[float] = None,
+                 hedge_min_delay: Optional[float] = None, hedge_ratio: Optional[float] = None,
+                 failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        """Keyword arguments are this dependency's defaults; `<NAME>_*` environment variables override them"""
+        self.name = name
+        self.hedge = _env(name, "HEDGE", "0" if hedge is False else "1") == "1"
+        self.hedge_quantile = float(_env(name, "HEDGE_QUANTILE", 0.95 if hedge_quantile is None else hedge_quantile))
+        self.hedge_min_delay = float(_env(name, "HEDGE_MIN_DELAY", 0.05 if hedge_min_delay is None else hedge_min_delay))
+        self.hedge_ratio = float(_env(name, "HEDGE_RATIO", 0.1 if hedge_ratio is None else hedge_ratio))
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=int(_env(name, "BREAKER_FAILURES", 5 if failure_threshold is None else failure_threshold)),
+            reset_timeout=float(_env(name, "BREAKER_RESET", 30.0 if reset_timeout is None else reset_timeout)),
+        )
+        self.latency = LatencyWindow()
+        self.calls = 0
+        self.hedges = 0
+
+    # -- policy ------------------------------------------------------------
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before sending a duplicate, or None to not hedge"""
+        if not self.hedge or len(self.latency) < HEDGE_MIN_SAMPLES:
+            return None
+        delay = max(self.latency.quantile(self.hedge_quantile), self.hedge_min_delay)
+        HEDGE_DELAY.set(delay, dependency=self.name)
+        return delay
+
+    def _may_hedge(self) -> bool:
+        if self.hedges + 1 > self.hedge_ratio * self.calls:
+            return False
+        self.hedges += 1
+        HEDGES.inc(dependency=self.name, result="sent")
+        return True
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            DEPENDENCY_CALLS.inc(dependency=self.name, outcome="rejected")
+            raise CircuitOpenError(self.name, self.breaker.retry_in())
+        self.calls += 1
+
+    def _record(self, exc: Optional[BaseException]) -> None:
+        if exc is None:
+            DEPENDENCY_CALLS.inc(dependency=self.name, outcome="ok")
+            self.breaker.record_success()
+        elif isinstance(exc, Exception) and expired():
+            # cut short by the caller's deadline (client timeout); no verdict either way
+            DEPENDENCY_CALLS.inc(dependency=self.name, outcome="deadline")
+            self.breaker.release()
+        elif isinstance(exc, Exception) and is_failure(exc):
+            DEPENDENCY_CALLS.inc(dependency=self.name, outcome="error")
+            self.breaker.record_failure()
+        elif isinstance(exc, Exception):
+            DEPENDENCY_CALLS.inc(dependency=self.name, outcome="client_error")
+            self.breaker.record_success()
+        else:
+            self.breaker.release()
+
+    def _attempt(self, fn: Callable[[], T]) -> T:
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        # losers are recorded too, so hedging does not hide the real tail;
+        # failed attempts (deadline timeouts included) are not
+        self.latency.add(elapsed)
+        DEPENDENCY_SECONDS.observe(elapsed, dependency=self.name)
+        return result
+
+    def _won(self, hedged: bool) -> None:
+        if hedged:
+            HEDGES.inc(dependency=self.name, result="won")
+
+    # -- sync --------------------------------------------------------------
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """Run a blocking call through the breaker, hedging it when it is slow"""
+        self._admit()
+        try:
+            result = self._call_hedged(fn)
+        except BaseException as e:
+            self._record(e)
+            raise
+        self._record(None)
+        return result
+
+    def _call_hedged(self, fn: Callable[[], T]) -> T:
+        delay = self.hedge_delay()
+        if delay is None:
+            return self._attempt(fn)
+        first = _executor.submit(contextvars.copy_context().run, self._attempt, fn)
+        done, _ = wait([first], timeout=delay)
+        if done or not self._may_hedge():
+            return first.result()
+        second = _executor.submit(contextvars.copy_context().run, self._attempt, fn)
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._won(future is second)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    # -- async -------------------------------------------------------------
+
+    async def acall(self, fn: Callable[[], T]) -> T:
+        """Like `call`, but the blocking call runs in a thread so the event loop stays free"""
+        self._admit()
+        try:
+            result = await self._acall_hedged(fn)
+        except BaseException as e:
+            self._record(e)
+            raise
+        self._record(None)
+        return result
+
+    async def _acall_hedged(self, fn: Callable[[], T]) -> T:
+        first = asyncio.ensure_future(asyncio.to_thread(self._attempt, fn))
+        delay = self.hedge_delay()
+        if delay is None:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done or not self._may_hedge():
+            return await first
+        second = asyncio.ensure_future(asyncio.to_thread(self._attempt, fn))
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._won(task is second)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # -- unhedged ----------------------------------------------------------
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """Breaker accounting for calls that cannot be hedged (e.g. streams)"""
+        self._admit()
+        try:
+            yield
+        except BaseException as e:
+            self._record(e)
+            raise
+        self._record(None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "p50_seconds": round(self.latency.quantile(0.5), 4),
+            "p95_seconds": round(self.latency.quantile(0.95), 4),
+            "hedge_delay_seconds": self.hedge_delay(),
+        }
+
+
+_dependencies: Dict[str, Dependency] = {}
+_dependencies_lock = threading.Lock()
+
+
+def dependency(name: str, **kwargs) -> Dependency:
+    """The process-wide Dependency for `name`, created on first use"""
+    with _dependencies_lock:
+        dep = _dependencies.get(name)
+        if dep is None:
+            dep = _dependencies[name] = Dependency(name, **kwargs)
+        return dep
+
+
+def dependencies() -> Dict[str, Dependency]:
+    with _dependencies_lock:
+        return dict(_dependencies)
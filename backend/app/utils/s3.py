@@ -1,29 +1,50 @@
-import boto3
+import logging
 import os
-from botocore.exceptions import ClientError
-from typing import Optional
+import threading
+import uuid
+from datetime import datetime
+from botocore.exceptions import ClientError, BotoCoreError
+from typing import Any, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Check if we're in demo mode (no AWS credentials)
 DEMO_MODE = not os.getenv('AWS_ACCESS_KEY_ID') and not os.getenv('AWS_PROFILE')
 
-# Initialize S3 client using environment variables
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-    region_name='us-east-2'
-)
+_s3_client = None
+_client_lock = threading.Lock()
+
+def get_s3_client():
+    """S3 client from environment variables, created on first use (from any thread)"""
+    global _s3_client
+    if _s3_client is None:
+        with _client_lock:
+            if _s3_client is None:
+                import boto3
+                _s3_client = boto3.client(
+                    's3',
+                    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+                    region_name='us-east-2'
+                )
+    return _s3_client
 
 BUCKET_NAME = os.getenv('S3_BUCKET_NAME', 'smart-fridge-images-nayana')
 
+def upload_key(file_name: str, timestamp: str = None, prefix: str = "uploads/") -> str:
+    """Unique object key for an uploaded image"""
+    timestamp = timestamp or datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    unique_id = str(uuid.uuid4())[:8]
+    return f"{prefix}{timestamp}_{unique_id}_{file_name}"
+
 def generate_presigned_url(key: str, content_type: str, expiration: int = 3600) -> str:
     """Generate a presigned URL for S3 upload"""
     try:
-        response = s3_client.generate_presigned_url(
+        response = get_s3_client().generate_presigned_url(
             'put_object',
             Params={
                 'Bucket': BUCKET_NAME,
@@ -37,6 +58,51 @@ def generate_presigned_url(key: str, content_type: str, expiration: int = 3600)
         print(f"Error generating presigned URL: {e}")
         raise e
 
+def generate_presigned_urls(files: List[Tuple[str, str]], expiration: int = 3600) -> List[str]:
+    """
+    Presigned PUT URLs for (key, content_type) pairs, in input order. One
+    client, and so one credential resolution and request signer, covers the
+    whole batch; signing is local, no request is made per file.
+    """
+    client = get_s3_client()
+    try:
+        return [
+            client.generate_presigned_url(
+                'put_object',
+                Params={'Bucket': BUCKET_NAME, 'Key': key, 'ContentType': content_type},
+                ExpiresIn=expiration
+            )
+            for key, content_type in files
+        ]
+    except ClientError as e:
+        print(f"Error generating presigned URLs: {e}")
+        raise e
+
+def generate_presigned_post(
+    prefix: str,
+    content_type_prefix: str = "image/",
+    max_bytes: int = 10 * 1024 * 1024,
+    expiration: int = 3600,
+) -> Dict[str, Any]:
+    """
+    One presigned POST policy for any key under `prefix`: returns the form
+    `url` and `fields`; each upload adds its own `key` field.
+    """
+    try:
+        return get_s3_client().generate_presigned_post(
+            Bucket=BUCKET_NAME,
+            Key=prefix + "${filename}",
+            Conditions=[
+                ["starts-with", "$key", prefix],
+                ["starts-with", "$Content-Type", content_type_prefix],
+                ["content-length-range", 1, max_bytes],
+            ],
+            ExpiresIn=expiration
+        )
+    except ClientError as e:
+        print(f"Error generating presigned POST: {e}")
+        raise e
+
 def get_object_url(key: str) -> str:
     """Get the public URL for an S3 object"""
     return f"https://{BUCKET_NAME}.s3.amazonaws.com/{key}"
@@ -44,8 +110,25 @@ def get_object_url(key: str) -> str:
 def delete_object(key: str) -> bool:
     """Delete an object from S3"""
     try:
-        s3_client.delete_object(Bucket=BUCKET_NAME, Key=key)
+        get_s3_client().delete_object(Bucket=BUCKET_NAME, Key=key)
         return True
     except ClientError as e:
         print(f"Error deleting object: {e}")
         return False
+
+def archive_uploads(objects: List[Tuple[str, bytes, str]]) -> int:
+    """
+    Store (key, data, content_type) objects; meant to run as a background
+    task after the response is sent. Returns how many were stored.
+    """
+    stored = 0
+    for key, data, content_type in objects:
+        try:
+            get_s3_client().put_object(Bucket=BUCKET_NAME, Key=key, Body=data, ContentType=content_type)
+            stored += 1
+        except (ClientError, BotoCoreError) as e:
+            # one bad object must not stop the rest of the batch
+            logger.warning(f"Error archiving {key}: {e}")
+    if stored < len(objects):
+        logger.warning(f"Archived {stored} of {len(objects)} uploads")
+    return stored
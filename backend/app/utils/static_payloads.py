@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Tuple, Type
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+
+class StaticPayload:
+    """
+    A JSON fixture that is loaded, validated and serialized once.
+
+    The serialized bytes and their ETag are kept in memory and served as-is;
+    the file is re-stat'ed at most every `check_interval` seconds and
+    reloaded when its mtime or size changes.
+    """
+
+    def __init__(self, path: Path, model: Optional[Type[BaseModel]] = None, check_interval: float = 1.0):
+        self.path = Path(path)
+        self.model = model
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._checked_at = 0.0
+        # (value, body, etag), replaced as one tuple so readers never mix two versions
+        self._current: Tuple[Any, bytes, str] = (None, b"", "")
+
+    @property
+    def value(self) -> Any:
+        return self._current[0]
+
+    @property
+    def body(self) -> bytes:
+        return self._current[1]
+
+    @property
+    def etag(self) -> str:
+        return self._current[2]
+
+    def _load(self, stamp) -> None:
+        data = json.loads(self.path.read_text())
+        if self.model is not None:
+            value = self.model(**data)
+            body = value.model_dump_json().encode()
+        else:
+            value = data
+            body = json.dumps(data, separators=(",", ":")).encode()
+        self._current = (value, body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+        self._stamp = stamp
+
+    def get(self) -> "StaticPayload":
+        """Return self, reloading first if the file changed on disk"""
+        now = time.monotonic()
+        if self._stamp is not None and now - self._checked_at < self.check_interval:
+            return self
+        with self._lock:
+            self._checked_at = now
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size)
+            if stamp != self._stamp:
+                self._load(stamp)
+        return self
+
+    def matches(self, if_none_match: Optional[str], etag: Optional[str] = None) -> bool:
+        if not if_none_match:
+            return False
+        etag = etag or self.etag
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+    def response(self, request: Request) -> Response:
+        """Serve the cached bytes, or 304 when the client's ETag is current"""
+        _, body, etag = self.get()._current
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if self.matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from typing import Dict, List
+import numpy as np
+from app.services.carbon_table import CarbonTable
+
+
+@dataclass(frozen=True)
+class SwapCandidate:
+    to_key: str        # carbon table key of the substitute
+    to_item: str       # display name ("tofu" for "tofu, soy bean curd")
+    why: str
+    reduction: float   # % lower co2e than the original
+
+
+def display_name(key: str) -> str:
+    """Short name for a carbon table entry: the text before the first comma"""
+    return key.split(",")[0].strip()
+
+
+def swap_candidate(keys, i: int, j: int, reduction: float) -> SwapCandidate:
+    """Swap from table row i to row j, `reduction` percent lower co2e"""
+    to_item = display_name(keys[j])
+    return SwapCandidate(
+        to_key=keys[j],
+        to_item=to_item,
+        why=f"{to_item.capitalize()} has ~{reduction:.0f}% lower carbon footprint than {display_name(keys[i])}",
+        reduction=float(reduction),
+    )
+
+
+def build_swap_table(
+    table: CarbonTable,
+    embeddings: np.ndarray,
+    top_k: int = 3,
+    min_reduction: float = 20.0,
+    similarity_weight: float = 0.5,
+) -> Dict[str, List[SwapCandidate]]:
+    """
+    Precompute the best lower-carbon substitutes for every carbon entry.
+
+    Candidates share the entry's dataset category and cut co2e by at least
+    `min_reduction` percent. They are ranked by a blend of embedding cosine
+    similarity (closest culinary substitute) and relative co2e reduction.
+    `embeddings` is one row per table key, in table order.
+    """
+    emb = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(emb, axis=1, keepdims=True)
+    emb = emb / np.where(norms == 0, 1, norms)
+    sim = emb @ emb.T
+
+    keys = table.keys
+    n = len(keys)
+    co2e = table.co2e_100g[:n]
+    categories = table.category_codes[:n]
+
+    out: Dict[str, List[SwapCandidate]] = {}
+    for i, key in enumerate(keys):
+        if not co2e[i] > 0:
+            continue
+        with np.errstate(invalid="ignore"):
+            reduction = 100 * (1 - co2e / co2e[i])
+        ok = (categories == categories[i]) & (reduction >= min_reduction)
+        ok[i] = False
+        idx = np.flatnonzero(ok)
+        if idx.size == 0:
+            continue
+        score = similarity_weight * sim[i, idx] + (1 - similarity_weight) * reduction[idx] / 100
+        ranked = idx[np.argsort(-score, kind="stable")][:top_k]
+        out[key] = [swap_candidate(keys, i, j, reduction[j]) for j in ranked]
+    return out
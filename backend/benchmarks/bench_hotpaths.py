@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Backend hot-path benchmarks.
+
+Covers FoodNormalizer.normalize_items, semantic_lookup and plan, recipe
+generation (cache hit, LLM miss, fallback), image downscaling,
+RekognitionService against a stubbed client and POST /api/analyze through an in-process client, over
+parameterized pantry and alias sizes. Runs offline: AWS and OpenAI are
+replaced by canned in-process stubs, and the sentence-transformer must
+already be in the local model cache (the plan and analyze benchmarks are
+skipped otherwise).
+
+    cd backend && python -m benchmarks.bench_hotpaths --out results.json
+    python -m benchmarks.bench_hotpaths --out new.json --compare results.json
+
+Results are JSON (metadata + one record per benchmark/parameter set), so
+runs from different commits can be diffed with --compare.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# offline before anything imports huggingface / openai
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+os.environ.setdefault("LOOP_MONITOR", "0")
+
+from app.services.normalize import FoodNormalizer, food_normalizer
+from app.services import recipes_llm
+from app.services.rekog import RekognitionService
+from app.shared.models.recipe import LLMContext
+
+DATA_LABELS = [
+    "Egg", "Tomato", "Broccoli", "Cheese", "Milk", "Bread", "Banana", "Apple",
+    "Carrot", "Chicken", "Lettuce", "Pepper", "Onion", "Potato", "Yogurt", "Butter",
+]
+
+
+def timed(fn, repeat: int, warmup: int = 2) -> dict:
+    """Per-call wall time statistics in microseconds"""
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            fn()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "repeat": repeat,
+        "mean_us": round(statistics.fmean(samples), 1),
+        "p50_us": round(samples[len(samples) // 2], 1),
+        "p95_us": round(samples[min(int(len(samples) * 0.95), len(samples) - 1)], 1),
+        "min_us": round(samples[0], 1),
+    }
+
+
+def pantry_names(n: int, seed: int = 0) -> list:
+    """Realistic query mix: exact aliases, near-misses and unknown names"""
+    rng = random.Random(seed)
+    aliases = [a for names in food_normalizer.aliases.values() for a in names]
+    out = []
+    for i in range(n):
+        kind = i % 4
+        name = rng.choice(aliases)
+        if kind == 2 and len(name) > 4:
+            j = rng.randrange(1, len(name) - 1)
+            name = name[:j] + name[j + 1:]  # drop a letter
+        elif kind == 3:
+            name = f"mystery item {i}"
+        out.append(name)
+    return out
+
+
+def synthetic_aliases(size: int) -> dict:
+    """The shipped alias table padded with synthetic canonicals to `size` entries"""
+    aliases = dict(food_normalizer.aliases)
+    rng = random.Random(size)
+    i = 0
+    while len(aliases) < size:
+        stem = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(7))
+        aliases[f"{stem} {i}"] = [f"{stem} {i}", f"{stem}s {i}", f"fresh {stem} {i}"]
+        i += 1
+    return aliases
+
+
+def bench_normalize(pantry_sizes, alias_sizes, repeat):
+    for a in alias_sizes:
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump(synthetic_aliases(a), f)
+        normalizer = FoodNormalizer(f.name)
+        os.unlink(f.name)
+        for p in sorted(set(pantry_sizes)):
+            raw = [{"name": n, "confidence": 0.9, "count": 1} for n in pantry_names(p)]
+            yield "normalize_items", {"pantry": p, "aliases": len(normalizer.aliases)}, \
+                timed(lambda: normalizer.normalize_items(raw), repeat)
+
+
+def load_planner():
+    """The plan module with its model loaded, or None when the model cannot be loaded (e.g. offline, not cached)"""
+    try:
+        from app.routes import plan as plan_module
+        # the model loads lazily, so importing the module alone proves nothing
+        plan_module.get_model()
+        return plan_module
+    except Exception as e:  # OSError from the model hub when offline
+        print(f"skipping plan/analyze benchmarks, planner unavailable offline: {e!r}", file=sys.stderr)
+        return None
+
+
+def bench_plan(plan_module, pantry_sizes, repeat):
+    for p in sorted(set(pantry_sizes)):
+        names = pantry_names(p, seed=1)
+        yield "semantic_lookup", {"pantry": p}, \
+            timed(lambda: [plan_module.semantic_lookup(n) for n in names], repeat)
+        yield "plan", {"pantry": p}, \
+            timed(lambda: plan_module.plan(items=names, people=2, flags=[], demo=False), repeat)
+
+
+def _canned_llm(ctx):
+    return json.dumps({"recipes": [
+        {
+            "id": f"bench-{i}", "title": f"Bench Recipe {i}", "servings": ctx.people,
+            "ingredients": [{"name": n} for n in ctx.pantry[:6]],
+            "steps": [{"number": 1, "text": "Prep."}, {"number": 2, "text": "Cook."}],
+            "sustainability_notes": {"summary": "Uses what you have."},
+        } for i in range(3)
+    ]})
+
+
+def bench_recipes(pantry_sizes, repeat):
+    real_llm = recipes_llm._call_llm_strict_json
+    real_key = os.environ.get("OPENAI_API_KEY")
+    try:
+        for p in sorted(set(pantry_sizes)):
+            ctx = LLMContext(pantry=pantry_names(p, seed=2), people=2, flags=[])
+
+            # the warmup calls fill the cache
+            recipes_llm._cache_clear()
+            yield "recipes_generate", {"pantry": p, "path": "cache_hit"}, \
+                timed(lambda: recipes_llm.generate(ctx), repeat)
+
+            os.environ["OPENAI_API_KEY"] = "bench"
+            recipes_llm._call_llm_strict_json = _canned_llm
+
+            def miss():
+                recipes_llm._cache_clear()
+                recipes_llm.generate(ctx)
+            yield "recipes_generate", {"pantry": p, "path": "llm_miss"}, timed(miss, repeat)
+
+            recipes_llm._call_llm_strict_json = real_llm
+            os.environ.pop("OPENAI_API_KEY", None)
+            yield "recipes_generate", {"pantry": p, "path": "fallback"}, timed(miss, repeat)
+    finally:
+        recipes_llm._call_llm_strict_json = real_llm
+        if real_key is None:
+            os.environ.pop("OPENAI_API_KEY", None)
+        else:
+            os.environ["OPENAI_API_KEY"] = real_key
+        recipes_llm._cache_clear()
+
+
+class StubRekognition:
+    """detect_labels with canned labels and no network"""
+
+    def __init__(self, labels_per_image: int = 10):
+        self.labels_per_image = labels_per_image
+
+    def detect_labels(self, Image, MaxLabels, MinConfidence):
+        name = Image["S3Object"]["Name"]
+        rng = random.Random(name)
+        labels = rng.sample(DATA_LABELS, min(self.labels_per_image, len(DATA_LABELS)))
+        return {"Labels": [{"Name": label, "Confidence": rng.uniform(80, 99.9)} for label in labels]}
+
+
+def stub_rekognition(service: RekognitionService) -> RekognitionService:
+    service.rekognition = StubRekognition()
+    service.max_tokens = service.rate_limit_tokens = float("inf")
+    return service
+
+
+def bench_rekognition(image_counts, repeat):
+    service = stub_rekognition(RekognitionService())
+    loop = asyncio.new_event_loop()
+    try:
+        for n in sorted(set(image_counts)):
+            keys = [f"uploads/bench_{i}.jpg" for i in range(n)]
+            yield "rekognition_detect", {"images": n}, \
+                timed(lambda: loop.run_until_complete(service.detect_food_items(keys)), repeat)
+    finally:
+        loop.close()
+
+
+def bench_preprocess(repeat):
+    try:
+        import numpy as np
+        from PIL import Image
+    except ImportError:
+        print("Pillow not installed, skipping preprocess benchmarks")
+        return
+    from app.services.preprocess import IMAGE_MAX_DIM, IMAGE_JPEG_QUALITY, downscale
+
+    rng = np.random.default_rng(0)
+    for width, height in [(1600, 1200), (4032, 3024)]:
+        out = io.BytesIO()
+        Image.fromarray(rng.integers(0, 255, (height, width, 3), dtype=np.uint8)).save(out, "JPEG", quality=92)
+        data = out.getvalue()
+        params = {"size": f"{width}x{height}", "max_dim": IMAGE_MAX_DIM, "input_kb": len(data) // 1024}
+        yield "image_downscale", params, \
+            timed(lambda: downscale(data, IMAGE_MAX_DIM, IMAGE_JPEG_QUALITY), max(repeat // 5, 5))
+
+
+def bench_analyze(image_counts, repeat):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.rekog import rekognition_service
+
+    stub_rekognition(rekognition_service)
+    os.environ.pop("OPENAI_API_KEY", None)
+    with TestClient(app) as client:
+        for n in sorted(set(image_counts)):
+            body = {"imageKeys": [f"uploads/bench_{i}.jpg" for i in range(n)], "peopleCount": 2}
+
+            def call():
+                recipes_llm._cache_clear()
+                r = client.post("/api/analyze", json=body)
+                assert r.status_code == 200, r.text
+            yield "analyze_e2e", {"images": n}, timed(call, repeat)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(results: list, baseline_path: str, tolerance: float) -> int:
+    """Print the change against a previous run; returns the number of regressions"""
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    old = {(r["bench"], json.dumps(r["params"], sort_keys=True)): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\ncompared with {baseline['meta'].get('commit')} (p50, tolerance {tolerance:.0%})")
+    for r in results:
+        prev = old.get((r["bench"], json.dumps(r["params"], sort_keys=True)))
+        if prev is None:
+            continue
+        change = r["p50_us"] / prev["p50_us"] - 1 if prev["p50_us"] else 0.0
+        flag = ""
+        if change > tolerance:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{r['bench']:<20}{json.dumps(r['params']):<40}{prev['p50_us']:>12}{r['p50_us']:>12}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pantry", type=int, nargs="+", default=[5, 20, 80])
+    parser.add_argument("--aliases", type=int, nargs="+", default=[60, 500, 2000])
+    parser.add_argument("--images", type=int, nargs="+", default=[1, 6])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--only", nargs="+", help="run only these benchmark groups",
+                        choices=["normalize", "plan", "recipes", "preprocess", "rekognition", "analyze"])
+    parser.add_argument("--out", help="write JSON results to this file")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="p50 slowdown counted as a regression (default 0.2 = 20%%)")
+    args = parser.parse_args()
+    groups = set(args.only or ["normalize", "plan", "recipes", "preprocess", "rekognition", "analyze"])
+
+    runs = []
+    if "normalize" in groups:
+        runs.append(bench_normalize(args.pantry, args.aliases, args.repeat))
+    if "recipes" in groups:
+        runs.append(bench_recipes(args.pantry, args.repeat))
+    if "preprocess" in groups:
+        runs.append(bench_preprocess(args.repeat))
+    if "rekognition" in groups:
+        runs.append(bench_rekognition(args.images, args.repeat))
+    if groups & {"plan", "analyze"}:
+        plan_module = load_planner()
+        if plan_module is not None and "plan" in groups:
+            runs.append(bench_plan(plan_module, args.pantry, args.repeat))
+        if plan_module is not None and "analyze" in groups:
+            runs.append(bench_analyze(args.images, max(args.repeat // 5, 5)))
+
+    results = []
+    print(f"{'benchmark':<20}{'params':<40}{'p50 us':>12}{'p95 us':>12}")
+    for run in runs:
+        for bench, params, stats in run:
+            results.append({"bench": bench, "params": params, **stats})
+            print(f"{bench:<20}{json.dumps(params):<40}{stats['p50_us']:>12}{stats['p95_us']:>12}")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": int(time.time()),
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        sys.exit(1 if compare(results, args.compare, args.tolerance) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Serialization cost per /analyze and /vision/detect response.
+
+Compares the default FastAPI path (validate against the response_model,
+jsonable_encoder, stdlib json) with FastJSONResponse (trusted dicts,
+orjson when installed).
+
+    cd backend && python -m benchmarks.bench_serialization --items 50 200
+"""
+import argparse
+import json
+import time
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.models.analyze import AnalyzeResponse, VisionDetectResponse
+from app.utils.fastjson import FastJSONResponse, orjson
+
+
+def analyze_payload(n: int) -> dict:
+    return {
+        "inventory": [{
+            "id": f"detected-item{i}-1700000000", "name": f"item{i}", "category": "vegetables",
+            "quantity": "1 piece(s)", "carbonImpact": "low", "confidence": 0.9123,
+        } for i in range(n)],
+        "recipes": [{
+            "id": f"recipe-{i}", "title": f"Recipe {i}", "description": "Generated recipe",
+            "ingredients": [f"item{j}" for j in range(8)],
+            "instructions": [f"Step {j} of the recipe" for j in range(6)],
+            "carbonImpact": "medium", "prepTime": 30, "servings": 2,
+            "imageUrl": "/api/placeholder/400/300",
+        } for i in range(3)],
+        "swapTips": [{
+            "id": f"swap-item{i}", "original": f"item{i}", "suggestion": "tofu",
+            "reason": "Lower footprint", "carbonSavings": 82.5,
+        } for i in range(n // 4)],
+        "totalCarbonImpact": 70.0,
+        "analysisTime": 1700000000.0,
+    }
+
+
+def vision_payload(n: int) -> dict:
+    return {
+        "items": [{"name": f"item{i}", "count": 1, "confidence": 0.912, "raw_name": f"raw{i}"} for i in range(n)],
+        "raw_detections": [{"name": f"raw{i}", "confidence": 0.912, "count": 1} for i in range(n)],
+        "processing_stats": {
+            "images_processed": 6, "raw_detections": n, "normalized_items": n,
+            "normalization_rate": 100.0, "avg_confidence": 0.912,
+        },
+    }
+
+
+def default_path(model, payload: dict) -> bytes:
+    # what FastAPI does for a route declared with response_model=...
+    validated = model.model_validate(payload).model_dump(mode="json")
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def fast_path(model, payload: dict) -> bytes:
+    return FastJSONResponse(payload).body
+
+
+def per_call_us(fn, *args, repeat: int) -> float:
+    fn(*args)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(*args)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def run(sizes, repeat: int) -> list:
+    results = []
+    for name, model, build in (
+        ("analyze", AnalyzeResponse, analyze_payload),
+        ("vision_detect", VisionDetectResponse, vision_payload),
+    ):
+        for n in sizes:
+            payload = build(n)
+            assert json.loads(default_path(model, payload)) == json.loads(fast_path(model, payload))
+            before = per_call_us(default_path, model, payload, repeat=repeat)
+            after = per_call_us(fast_path, model, payload, repeat=repeat)
+            results.append({
+                "endpoint": name, "items": n,
+                "default_us": round(before, 1), "fast_us": round(after, 1),
+                "speedup": round(before / after, 1),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=300)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.items, args.repeat)
+    print(f"orjson: {'yes' if orjson is not None else 'no (stdlib json fallback)'}")
+    print(f"{'endpoint':<14}{'items':>7}{'default us':>12}{'fast us':>10}{'speedup':>9}")
+    for r in results:
+        print(f"{r['endpoint']:<14}{r['items']:>7}{r['default_us']:>12}{r['fast_us']:>10}{r['speedup']:>8}x")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
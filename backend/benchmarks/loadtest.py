@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Sustained-load test for /api/analyze and /api/recipes.
+
+Closed-loop workers (one in-flight request each) send a weighted mix of
+requests with realistic, partly repeating pantries for `--duration`
+seconds at each `--concurrency` level. The report has throughput and
+p50/p95/p99 latency per endpoint and level.
+
+Self-contained offline run: start the stub OpenAI/Rekognition server and
+a uvicorn backend wired to it, then drive the backend:
+
+    cd backend && python -m benchmarks.loadtest --spawn --concurrency 1 8 32 \\
+        --duration 20 --mix analyze=1,recipes=3 --out load.json \\
+        --stub-args "--llm-latency lognormal:1.2,0.4 --error-rate 0.02"
+
+Against a backend that is already running:
+
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALIASES_JSON = os.path.join(BACKEND_DIR, "..", "data", "ingredient_aliases.json")
+FLAG_CHOICES = [[], [], [], ["vegetarian"], ["vegan"], ["gluten-free"]]
+
+
+class PantryPool:
+    """
+    A fixed pool of household pantries drawn from the alias table. Requests
+    pick from the pool with a Zipf-like skew, so popular pantries repeat
+    (and can hit the recipe cache) while the long tail keeps missing.
+    """
+
+    def __init__(self, size: int = 200, seed: int = 7):
+        with open(ALIASES_JSON, "r") as f:
+            names = list(json.load(f))
+        rng = random.Random(seed)
+        self.pantries = [rng.sample(names, rng.randint(3, 12)) for _ in range(size)]
+        self.weights = [1 / (i + 1) for i in range(size)]
+
+    def pick(self, rng: random.Random) -> List[str]:
+        return rng.choices(self.pantries, weights=self.weights)[0]
+
+
+def recipes_request(pool: PantryPool, rng: random.Random) -> Tuple[str, dict]:
+    return "/api/recipes", {
+        "pantry": pool.pick(rng),
+        "people": rng.choice([1, 2, 2, 4]),
+        "flags": rng.choice(FLAG_CHOICES),
+    }
+
+
+def analyze_request(pool: PantryPool, rng: random.Random) -> Tuple[str, dict]:
+    pantry = pool.pick(rng)
+    return "/api/analyze", {
+        "imageKeys": [f"uploads/load_{rng.randrange(10_000)}.jpg" for _ in range(rng.randint(1, 4))],
+        "peopleCount": rng.choice([1, 2, 2, 4]),
+        "inventory": [{"name": name, "category": "Manual"} for name in pantry[:rng.randint(0, 4)]],
+    }
+
+
+BUILDERS = {"recipes": recipes_request, "analyze": analyze_request}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in BUILDERS:
+            raise SystemExit(f"unknown endpoint {name!r} in --mix (choose from {', '.join(BUILDERS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    i = min(int(round(q / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[i]
+
+
+async def run_level(base_url: str, mix: Dict[str, float], concurrency: int, duration: float,
+                    pool: PantryPool, timeout: float, seed: int) -> Dict[str, dict]:
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    samples: Dict[str, List[float]] = {n: [] for n in names}
+    errors: Dict[str, int] = {n: 0 for n in names}
+    deadline = time.perf_counter() + duration
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def worker(wid: int):
+            rng = random.Random(seed * 1000 + wid)
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights=weights)[0]
+                path, body = BUILDERS[name](pool, rng)
+                start = time.perf_counter()
+                try:
+                    r = await client.post(path, json=body)
+                    ok = r.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                elapsed = time.perf_counter() - start
+                if ok:
+                    samples[name].append(elapsed)
+                else:
+                    errors[name] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        wall = time.perf_counter() - started
+
+    report = {}
+    for name in names:
+        lat = sorted(samples[name])
+        report[name] = {
+            "requests": len(lat) + errors[name],
+            "errors": errors[name],
+            "throughput_rps": round(len(lat) / wall, 2),
+            "p50_ms": round(percentile(lat, 50) * 1000, 1),
+            "p95_ms": round(percentile(lat, 95) * 1000, 1),
+            "p99_ms": round(percentile(lat, 99) * 1000, 1),
+        }
+    return report
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 180.0) -> None:
+    end = time.time() + timeout
+    while time.time() < end:
+        if proc.poll() is not None:
+            raise SystemExit(f"{url} exited with {proc.returncode} before becoming ready")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise SystemExit(f"timed out waiting for {url}")
+
+
+def spawn(stub_port: int, app_port: int, stub_args: str, workers: int) -> List[subprocess.Popen]:
+    """Start the stub server and a uvicorn backend pointed at it"""
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_server", "--port", str(stub_port)] + shlex.split(stub_args),
+        cwd=BACKEND_DIR,
+    )
+    _wait_ready(f"http://127.0.0.1:{stub_port}/stats", stub)
+
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="stub",
+        OPENAI_BASE_URL=f"{stub_url}/v1",
+        AWS_ENDPOINT_URL_REKOGNITION=stub_url,
+        AWS_ENDPOINT_URL_S3=stub_url,
+        AWS_ACCESS_KEY_ID="stub",
+        AWS_SECRET_ACCESS_KEY="stub",
+    )
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(app_port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        _wait_ready(f"http://127.0.0.1:{app_port}/api/health", app)
+    except SystemExit:
+        stub.terminate()
+        raise
+    return [stub, app]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="backend base URL")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per concurrency level")
+    parser.add_argument("--mix", default="analyze=1,recipes=3", help="endpoint weights")
+    parser.add_argument("--pantries", type=int, default=200, help="distinct household pantries")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write JSON results to this file")
+    parser.add_argument("--spawn", action="store_true", help="start the stub server and a backend")
+    parser.add_argument("--stub-port", type=int, default=8900)
+    parser.add_argument("--app-port", type=int, default=8001)
+    parser.add_argument("--app-workers", type=int, default=1)
+    parser.add_argument("--stub-args", default="", help="extra benchmarks.stub_server arguments")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    pool = PantryPool(args.pantries, seed=args.seed)
+    procs: List[subprocess.Popen] = []
+    base_url = args.url
+    if args.spawn:
+        procs = spawn(args.stub_port, args.app_port, args.stub_args, args.app_workers)
+        base_url = f"http://127.0.0.1:{args.app_port}"
+
+    results = []
+    try:
+        print(f"{'conc':>5} {'endpoint':<9}{'reqs':>7}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for level in args.concurrency:
+            report = asyncio.run(run_level(base_url, mix, level, args.duration, pool, args.timeout, args.seed))
+            for endpoint, r in report.items():
+                results.append({"concurrency": level, "endpoint": endpoint, **r})
+                print(f"{level:>5} {endpoint:<9}{r['requests']:>7}{r['errors']:>8}{r['throughput_rps']:>9}"
+                      f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}")
+    finally:
+        for proc in reversed(procs):
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({
+                "meta": {"url": base_url, "mix": mix, "duration": args.duration,
+                         "pantries": args.pantries, "stub_args": args.stub_args if args.spawn else None,
+                         "timestamp": int(time.time())},
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
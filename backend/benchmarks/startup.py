@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Startup import-time report.
+
+Imports a module (default `app.main`) in a fresh interpreter under
+`python -X importtime` and prints the slowest modules by cumulative and
+self time, plus the total per top-level package, so slow imports that
+creep into the startup path are easy to spot.
+
+    cd backend && python -m benchmarks.startup --top 25
+    python -m benchmarks.startup --module app.routes.plan --json startup.json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+# importing app.main must not pull these in; they load on first use
+HEAVY_MODULES = ("sentence_transformers", "torch", "transformers", "openai", "boto3")
+
+
+def measure_import(module: str = "app.main") -> Dict[str, object]:
+    """Cold-import `module` in a subprocess; wall time, per-module timings and heavy modules loaded"""
+    code = (
+        "import json, sys, time\n"
+        "t = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - t\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'seconds': elapsed, 'heavy': heavy}))\n"
+    )
+    env = dict(os.environ, LOOP_MONITOR="0")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    modules: List[Dict[str, object]] = []
+    for line in proc.stderr.splitlines():
+        m = LINE.match(line)
+        if m:
+            modules.append({
+                "module": m.group(4),
+                "self_ms": int(m.group(1)) / 1000,
+                "cumulative_ms": int(m.group(2)) / 1000,
+                "depth": len(m.group(3)) // 2,
+            })
+    result["modules"] = modules
+    return result
+
+
+def package_totals(modules: List[Dict[str, object]]) -> Dict[str, float]:
+    totals: Dict[str, float] = defaultdict(float)
+    for m in modules:
+        totals[m["module"].split(".")[0]] += m["self_ms"]
+    return dict(sorted(totals.items(), key=lambda kv: -kv[1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    report = measure_import(args.module)
+    wall = time.perf_counter() - started
+
+    modules = report["modules"]
+    print(f"import {args.module}: {report['seconds'] * 1000:.0f} ms "
+          f"(interpreter + import: {wall * 1000:.0f} ms, {len(modules)} modules)")
+    if report["heavy"]:
+        print(f"heavy modules imported eagerly: {', '.join(report['heavy'])}")
+
+    print(f"\n{'cumulative ms':>14}{'self ms':>10}  module")
+    for m in sorted(modules, key=lambda m: -m["cumulative_ms"])[:args.top]:
+        print(f"{m['cumulative_ms']:>14.1f}{m['self_ms']:>10.1f}  {'  ' * m['depth']}{m['module']}")
+
+    print(f"\n{'self ms':>14}  package")
+    for package, ms in list(package_totals(modules).items())[:args.top]:
+        print(f"{ms:>14.1f}  {package}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"module": args.module, **report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for OpenAI, AWS Rekognition and S3, for offline load tests.
+
+Serves `POST /v1/chat/completions` (plain and `stream=true` SSE) with
+recipe JSON built from the pantry in the prompt, Rekognition's
+`DetectLabels` JSON protocol with canned food labels (S3Object or inline
+Bytes), and path-style S3 `PutObject` into memory. Latency, error rate
+and response size are configurable, so the backend can be driven the way
+production drives it without network access or API spend:
+
+    cd backend && python -m benchmarks.stub_server --port 8900 \\
+        --llm-latency lognormal:1.2,0.4 --error-rate 0.02 --recipes 3 --steps 6
+
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=stub \\
+    AWS_ENDPOINT_URL_REKOGNITION=http://127.0.0.1:8900 AWS_ENDPOINT_URL_S3=http://127.0.0.1:8900 \\
+    AWS_ACCESS_KEY_ID=stub AWS_SECRET_ACCESS_KEY=stub python run_server.py
+
+Latency specs: `fixed:S`, `uniform:LO,HI`, `normal:MEAN,SD` or
+`lognormal:MEDIAN,SIGMA` (seconds).
+"""
+import argparse
+import ast
+import base64
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List
+
+FOOD_LABELS = [
+    "Egg", "Tomato", "Broccoli", "Cheese", "Milk", "Bread", "Banana", "Apple", "Carrot",
+    "Chicken", "Lettuce", "Pepper", "Onion", "Potato", "Yogurt", "Butter", "Spinach", "Rice",
+]
+
+
+def latency_sampler(spec: str) -> Callable[[], float]:
+    """Parse a latency spec into a function returning seconds"""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(random.gauss(values[0], values[1]), 0.0)
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1])
+    raise ValueError(f"unknown latency spec {spec!r}")
+
+
+def _pantry_from_prompt(prompt: str) -> List[str]:
+    match = re.search(r"pantry items \(plus water/salt/pepper/oil\): (\[.*?\])", prompt)
+    if match:
+        try:
+            return [str(x) for x in ast.literal_eval(match.group(1))]
+        except (ValueError, SyntaxError):
+            pass
+    return ["rice", "beans"]
+
+
+def _people_from_prompt(prompt: str) -> int:
+    match = re.search(r"People to serve: (\d+)", prompt)
+    return int(match.group(1)) if match else 2
+
+
+def _max_recipes_from_prompt(prompt: str, default: int) -> int:
+    match = re.search(r"(?:Max|Exactly) (\d+) recipe", prompt)
+    return min(default, int(match.group(1))) if match else default
+
+
+def recipe_reply(prompt: str, recipes: int, steps: int, pad_bytes: int) -> str:
+    """Strict-JSON recipe reply in the shape recipes_llm asks for"""
+    pantry = _pantry_from_prompt(prompt)
+    people = _people_from_prompt(prompt)
+    recipes = _max_recipes_from_prompt(prompt, recipes)
+    out = []
+    for i in range(recipes):
+        picks = random.sample(pantry, min(len(pantry), random.randint(2, 6)))
+        out.append({
+            "id": f"stub-{uuid.uuid4().hex[:8]}",
+            "title": f"Stub {' & '.join(p.title() for p in picks[:2])} #{i + 1}",
+            "servings": people,
+            "ingredients": [{"name": p} for p in picks],
+            "steps": [{"number": n + 1, "text": f"Step {n + 1}: work with the {picks[n % len(picks)]}."}
+                      for n in range(steps)],
+            "sustainability_notes": {
+                "carbon_score_0_100": random.randint(20, 90),
+                "summary": "x" * pad_bytes if pad_bytes else "Uses what you have.",
+                "swaps": [],
+            },
+            "source": "llm",
+        })
+    return json.dumps({"recipes": out})
+
+
+class StubState:
+    def __init__(self, args):
+        self.llm_latency = latency_sampler(args.llm_latency)
+        self.rekognition_latency = latency_sampler(args.rekognition_latency)
+        self.error_rate = args.error_rate
+        self.error_status = args.error_status
+        self.recipes = args.recipes
+        self.steps = args.steps
+        self.pad_bytes = args.pad_bytes
+        self.stream_chunks = args.stream_chunks
+        self.labels = args.labels
+        self.counts: Dict[str, int] = {}
+        self.objects: Dict[str, bytes] = {}  # "bucket/key" -> body
+        self._lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: StubState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b"{}"
+        return json.loads(body or b"{}")
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _maybe_fail(self, name: str) -> bool:
+        if random.random() >= self.state.error_rate:
+            return False
+        self.state.count(f"{name}_error")
+        body = json.dumps({"error": {"message": "stub injected error", "type": "server_error"}}).encode()
+        self._send(self.state.error_status, body)
+        return True
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            stats = dict(self.state.counts, objects={k: len(v) for k, v in self.state.objects.items()})
+            self._send(200, json.dumps(stats).encode())
+        else:
+            self._send(404, b'{"error":"not found"}')
+
+    def do_POST(self):
+        target = self.headers.get("X-Amz-Target", "")
+        if target.endswith("DetectLabels"):
+            return self._detect_labels()
+        if self.path.rstrip("/").endswith("/chat/completions"):
+            return self._chat_completions()
+        self._send(404, b'{"error":"not found"}')
+
+    def do_PUT(self):
+        # S3 PutObject, path-style: /<bucket>/<key>
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        self.state.count("put_object")
+        if self._maybe_fail("put_object"):
+            return
+        with self.state._lock:
+            self.state.objects[self.path.lstrip("/").split("?", 1)[0]] = body
+        self.send_response(200)
+        self.send_header("ETag", f'"{uuid.uuid4().hex}"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _detect_labels(self):
+        image = self._read_json().get("Image", {})
+        self.state.count("detect_labels")
+        if "Bytes" in image:
+            self.state.count("detect_labels_bytes")
+            if not base64.b64decode(image["Bytes"]):
+                self._send(400, b'{"__type":"InvalidImageFormatException","message":"empty image"}',
+                           "application/x-amz-json-1.1")
+                return
+        time.sleep(self.state.rekognition_latency())
+        if self._maybe_fail("detect_labels"):
+            return
+        labels = random.sample(FOOD_LABELS, min(self.state.labels, len(FOOD_LABELS)))
+        body = {"Labels": [{"Name": name, "Confidence": round(random.uniform(80, 99.9), 3)} for name in labels]}
+        self._send(200, json.dumps(body).encode(), "application/x-amz-json-1.1")
+
+    def _chat_completions(self):
+        request = self._read_json()
+        self.state.count("chat_completions")
+        prompt = " ".join(m.get("content", "") for m in request.get("messages", []))
+        delay = self.state.llm_latency()
+        if self._maybe_fail("chat_completions"):
+            return
+        content = recipe_reply(prompt, self.state.recipes, self.state.steps, self.state.pad_bytes)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", "stub")
+
+        if not request.get("stream"):
+            time.sleep(delay)
+            body = {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                          "total_tokens": (len(prompt) + len(content)) // 4},
+            }
+            return self._send(200, json.dumps(body).encode())
+
+        # SSE: the total latency is spread over the chunks
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        n = max(self.state.stream_chunks, 1)
+        size = math.ceil(len(content) / n)
+        for i in range(0, len(content), size):
+            time.sleep(delay / n)
+            self._write_event({
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": content[i:i + size]}, "finish_reason": None}],
+            })
+        self._write_event({
+            "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        })
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_event(self, obj: dict) -> None:
+        self._write_chunk(f"data: {json.dumps(obj)}\n\n".encode())
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def make_server(args, host: str = "127.0.0.1", port: int = 8900) -> ThreadingHTTPServer:
+    handler = type("BoundStubHandler", (StubHandler,), {"state": StubState(args)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--llm-latency", default="lognormal:1.0,0.4", help="chat completion latency spec")
+    parser.add_argument("--rekognition-latency", default="lognormal:0.25,0.3", help="DetectLabels latency spec")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="status of injected failures (e.g. 429)")
+    parser.add_argument("--recipes", type=int, default=3, help="recipes per completion")
+    parser.add_argument("--steps", type=int, default=6, help="steps per recipe")
+    parser.add_argument("--pad-bytes", type=int, default=0, help="extra bytes per recipe summary")
+    parser.add_argument("--stream-chunks", type=int, default=40, help="SSE chunks per streamed completion")
+    parser.add_argument("--labels", type=int, default=8, help="labels per DetectLabels call")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    server = make_server(args, args.host, args.port)
+    print(f"stub OpenAI + Rekognition + S3 on http://{args.host}:{args.port} (OpenAI base URL: /v1)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,23 @@ def main():
     port = int(os.getenv("PORT", 8000))
     reload = os.getenv("RELOAD", "true").lower() == "true"
     
+    workers = int(os.getenv("WORKERS", 1))
+
+    if workers > 1:
+        # Production mode: load models once, fork workers that share them
+        import logging
+        from app.utils.prefork import serve
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+        print(f"🌐 Server will run on http://{host}:{port} with {workers} preforked workers")
+        print("=" * 50)
+        serve(
+            host=host,
+            port=port,
+            workers=workers,
+            rss_interval=float(os.getenv("RSS_REPORT_INTERVAL", 60)),
+        )
+        return
+
     print(f"🌐 Server will run on http://{host}:{port}")
     print(f"🔄 Auto-reload: {'enabled' if reload else 'disabled'}")
     print(f"📝 API docs available at http://{host}:{port}/docs")
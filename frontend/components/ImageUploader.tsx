@@ -6,7 +6,7 @@ import { Upload, X, Camera, CheckCircle, AlertCircle } from 'lucide-react'
 import { UploadedImage } from '@/app/page'
 import { motion, AnimatePresence } from 'framer-motion'
 import toast from 'react-hot-toast'
-import { getPresignedUploadUrl, uploadToS3, getMockAnalysisResults } from '@/lib/api'
+import { getPresignedUploadUrls, uploadToS3, getMockAnalysisResults } from '@/lib/api'
 
 interface ImageUploaderProps {
   onImagesUploaded: (images: UploadedImage[]) => void
@@ -35,6 +35,16 @@ export function ImageUploader({ onImagesUploaded, isDemoMode }: ImageUploaderPro
     setUploadedImages(prev => [...prev, ...newImages])
 
     try {
+      // Presign every upload in one round trip (all files are sent as JPEG)
+      const presigned = await getPresignedUploadUrls(
+        newImages.map(img => ({
+          fileName: img.file.type === 'image/jpeg'
+            ? img.file.name
+            : img.file.name.replace(/\.[^/.]+$/, '.jpg'),
+          fileType: 'image/jpeg',
+        }))
+      )
+
       // Upload each file
       for (let i = 0; i < newImages.length; i++) {
         const imageId = newImages[i].id
@@ -68,11 +78,8 @@ export function ImageUploader({ onImagesUploaded, isDemoMode }: ImageUploaderPro
             })
           }
           
-          // Get presigned URL
-          const { uploadUrl, key } = await getPresignedUploadUrl(
-            fileName,
-            'image/jpeg'
-          )
+          // Presigned URL from the batch above
+          const { uploadUrl, key } = presigned[i]
           
           // Update progress to 50%
           setUploadedImages(prev => 
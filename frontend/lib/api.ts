@@ -59,6 +59,28 @@ export async function getPresignedUploadUrl(
   }
 }
 
+// Get presigned upload URLs for several files in one request (keys in input order)
+export async function getPresignedUploadUrls(
+  files: { fileName: string; fileType: string }[]
+): Promise<PresignedUploadResponse[]> {
+  const response = await fetch(`${API_BASE_URL}/api/presign/batch`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ files }),
+  })
+
+  if (!response.ok) {
+    const errorText = await response.text()
+    console.error('Batch presign failed:', response.status, errorText)
+    throw new Error(`Failed to get presigned URLs: ${response.status} ${response.statusText} - ${errorText}`)
+  }
+
+  const result = await response.json()
+  return result.uploads
+}
+
 // Upload file directly to S3 using presigned URL
 export async function uploadToS3(
   file: File,